@@ -0,0 +1,122 @@
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+from app.domain.exceptions import DeadlineExceededError
+from app.infrastructure.monitoring.memory import JobMemory, memory
+
+@dataclass(frozen=True)
+class Deadline:
+    """An absolute point in time (monotonic clock) by which work must be done."""
+    expires_at: float
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        return cls(time.monotonic() + seconds)
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def share(self, fraction: float) -> "Deadline":
+        """A sub-deadline that uses `fraction` of the time left on this one."""
+        return Deadline(time.monotonic() + max(0.0, self.remaining()) * fraction)
+
+@dataclass
+class JobContext:
+    """
+    Per-job state shared by the pipeline stages of one generation job.
+    It travels implicitly with the job through a ContextVar, so tasks spawned
+    by the job (task groups copy the context) see the same instance.
+    """
+    job_id: str
+    kind: str = "adhoc"
+    stage: str = "queued"
+    cancelled: bool = False
+    # Interrupted by a worker shutdown (its checkpoint can be resumed on another worker)
+    drained: bool = False
+    # Scheduling rank: lower runs first (0 = interactive, 1 = batch)
+    priority: int = 1
+
+    # Upstream call accounting (planned counts are best-effort estimates)
+    llm_calls: int = 0
+    llm_calls_planned: int = 0
+    tts_calls: int = 0
+    tts_calls_planned: int = 0
+    # LLM tokens as reported by the provider (cached: prompt tokens served from its prompt cache),
+    # including those of checkpointed batches replayed on resume
+    llm_prompt_tokens: int = 0
+    llm_completion_tokens: int = 0
+    llm_cached_tokens: int = 0
+
+    # Time budget: the job deadline is split into stage deadlines, which cap every upstream call.
+    # The clock starts in start(), i.e. once the job is admitted, not while it is queued.
+    budget_seconds: Optional[float] = None
+    deadline: Optional[Deadline] = None
+    stage_shares: Dict[str, float] = field(default_factory=dict)
+    stage_deadline: Optional[Deadline] = None
+
+    # Worker RSS peak while the job ran, per-stage baselines (sampled on stage changes, throttled on progress)
+    memory: JobMemory = field(default_factory=JobMemory, repr=False)
+
+    # Progress listener (the API's event broker); must not block, the pipeline calls it inline
+    on_progress: Optional[Callable[[str, Dict[str, Any]], None]] = field(default=None, repr=False)
+
+    def start(self):
+        if self.budget_seconds:
+            self.deadline = Deadline.after(self.budget_seconds)
+        self.enter_stage("running")
+
+    def enter_stage(self, stage: str):
+        previous, self.stage = self.stage, stage
+        memory.stage_changed(self, previous)
+        share = self.stage_shares.get(stage)
+        if self.deadline and share is not None:
+            self.stage_deadline = self.deadline.share(share)
+        else:
+            self.stage_deadline = self.deadline
+        self.report("stage", stage=stage)
+
+    def report(self, event: str, **data):
+        """Publishes a progress event (stage, script, segments, upload) to whoever follows the job."""
+        memory.progress(self)
+        if self.on_progress:
+            self.on_progress(event, data)
+
+    def call_timeout(self, default: float) -> float:
+        """Timeout for one upstream call: the per-call default, clamped to the stage budget left."""
+        if not self.stage_deadline:
+            return default
+        remaining = self.stage_deadline.remaining()
+        if remaining <= 0:
+            raise DeadlineExceededError(f"Job {self.job_id} ran out of time in stage '{self.stage}'.")
+        return min(default, remaining)
+
+    def add_llm_usage(self, prompt: int = 0, completion: int = 0, cached: int = 0):
+        self.llm_prompt_tokens += prompt
+        self.llm_completion_tokens += completion
+        self.llm_cached_tokens += cached
+
+    def llm_usage(self) -> Dict[str, int]:
+        """Token totals of the job, as stored in SimulationRecord.configuration["tokens"]."""
+        return {"prompt": self.llm_prompt_tokens, "completion": self.llm_completion_tokens, "cached": self.llm_cached_tokens}
+
+    @property
+    def llm_calls_remaining(self) -> int:
+        return max(0, self.llm_calls_planned - self.llm_calls)
+
+    @property
+    def tts_calls_remaining(self) -> int:
+        return max(0, self.tts_calls_planned - self.tts_calls)
+
+_current_job: ContextVar[Optional[JobContext]] = ContextVar("vanaheim_current_job", default=None)
+
+def job_context() -> JobContext:
+    """Returns the running job's context, or a detached one when called outside a job (e.g. tests)."""
+    return _current_job.get() or JobContext(job_id="detached")
+
+def bind_job(job: JobContext):
+    """Makes `job` the current job for this context. Returns a token for `unbind_job`."""
+    return _current_job.set(job)
+
+def unbind_job(token):
+    _current_job.reset(token)
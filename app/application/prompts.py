@@ -1,21 +1,49 @@
-from app.domain.models import ScenarioType
+import textwrap
+from functools import lru_cache
+from typing import List, Optional, Tuple
+from app.domain.models import ScenarioType, VoiceInfo
+
+# Offered to the LLM when no voice catalog is given
+DEFAULT_VOICES = [
+    VoiceInfo(short_name="es-AR-ElenaNeural", locale="es-AR", gender="Female"),
+    VoiceInfo(short_name="es-ES-AlvaroNeural", locale="es-ES", gender="Male"),
+    VoiceInfo(short_name="es-VE-SebastianNeural", locale="es-VE", gender="Male"),
+    VoiceInfo(short_name="es-MX-DaliaNeural", locale="es-MX", gender="Female"),
+    VoiceInfo(short_name="es-CO-GonzaloNeural", locale="es-CO", gender="Male"),
+    VoiceInfo(short_name="es-US-PalomaNeural", locale="es-US", gender="Female"),
+]
+_GENDER_LABELS = {"Female": "Mujer", "Male": "Hombre"}
 
 class ScenarioPrompts:
     """
     Central repository for LLM prompts based on simulation scenario.
     Returns a tuple of (System Prompt, User Prompt Template).
+
+    System prompts hold everything that does not depend on the request and always come
+    first, so every conversation of a scenario starts with the same bytes and upstream
+    prompt caching (OpenAI caches prefixes of 1024+ tokens) can serve them. They are
+    rendered once per scenario and voice list.
     """
 
     @staticmethod
-    def get_prompt(scenario: ScenarioType) -> tuple[str, str]:
-        if scenario == ScenarioType.CORPORATE:
-            return ScenarioPrompts._corporate_prompts()
-        elif scenario == ScenarioType.STORY:
-            return ScenarioPrompts._story_prompts()
-        elif scenario == ScenarioType.PODCAST:
-            return ScenarioPrompts._podcast_prompts()
-        else:
-            return ScenarioPrompts._corporate_prompts() # Fallback
+    def get_prompt(scenario: ScenarioType, voices: Optional[List[VoiceInfo]] = None) -> tuple[str, str]:
+        """With `voices` (from the voice catalog), the system prompt offers those instead of the defaults."""
+        return _render_scenario(scenario, _voice_key(voices or DEFAULT_VOICES))
+
+    @staticmethod
+    def prompt_mode_system(voices: Optional[List[VoiceInfo]] = None) -> str:
+        """System prompt of Developer Mode (free-form prompt to script)."""
+        return _render_prompt_mode(_voice_key(voices) if voices else ())
+
+    @staticmethod
+    def cache_key(scenario: Optional[ScenarioType] = None) -> str:
+        """Routes requests sharing a system prompt to the same upstream prompt cache."""
+        return f"vanaheim-{scenario.value.lower() if scenario else 'prompt'}"
+
+    @staticmethod
+    def voice_list(voices: List[VoiceInfo]) -> str:
+        """Prompt lines such as `- es-MX-DaliaNeural (Mujer)`."""
+        return _voice_lines(_voice_key(voices))
 
     @staticmethod
     def _corporate_prompts():
@@ -37,12 +65,7 @@ class ScenarioPrompts:
         }
 
         Voces Disponibles (Asigna apropiadamente para variedad de género/rol):
-        - es-AR-ElenaNeural (Mujer)
-        - es-ES-AlvaroNeural (Hombre)
-        - es-VE-SebastianNeural (Hombre)
-        - es-MX-DaliaNeural (Mujer)
-        - es-CO-GonzaloNeural (Hombre)
-        - es-US-PalomaNeural (Mujer)
+        {voice_list}
 
         REGLAS CRÍTICAS:
         1. Contexto: Los participantes son un equipo profesional discutiendo un tema laboral.
@@ -84,11 +107,8 @@ class ScenarioPrompts:
           ]
         }
         
-        Voces Disponibles:
-        - es-AR-ElenaNeural (Mujer - Serena, buena para narración)
-        - es-ES-AlvaroNeural (Hombre - Profundo, bueno para narración)
-        - es-VE-SebastianNeural (Hombre - Joven)
-        - es-MX-DaliaNeural (Mujer - Joven)
+        Voces Disponibles (Para el Narrador, elige una voz serena y profunda):
+        {voice_list}
 
         REGLAS CRÍTICAS:
         1. Estilo: Narrativo y Dramático. Incluye un "Narrador" que describa acciones y ambiente.
@@ -130,6 +150,9 @@ class ScenarioPrompts:
           ]
         }
 
+        Voces Disponibles (Usa SOLO estas, con voces distintas para el Host y cada Invitado):
+        {voice_list}
+
         REGLAS CRÍTICAS:
         1. Estilo: Conversacional, dinámico, tipo entrevista o debate.
         2. Estructura: Intro con música (simulada por el Host), presentación de invitado, desarrollo del tema, cierre.
@@ -146,4 +169,42 @@ class ScenarioPrompts:
         
         Haz que la conversación sea enganchante, con preguntas interesantes del Host y respuestas profundas de los invitados.
         """
-        return system, user
\ No newline at end of file
+        return system, user
+
+def _voice_key(voices: List[VoiceInfo]) -> Tuple[Tuple[str, str], ...]:
+    return tuple((v.short_name, v.gender) for v in voices)
+
+def _voice_lines(voices: Tuple[Tuple[str, str], ...]) -> str:
+    return "\n".join(f"- {name} ({_GENDER_LABELS.get(gender, gender)})" for name, gender in voices)
+
+@lru_cache(maxsize=64)
+def _render_scenario(scenario: ScenarioType, voices: Tuple[Tuple[str, str], ...]) -> Tuple[str, str]:
+    if scenario == ScenarioType.CORPORATE:
+        system, user = ScenarioPrompts._corporate_prompts()
+    elif scenario == ScenarioType.STORY:
+        system, user = ScenarioPrompts._story_prompts()
+    elif scenario == ScenarioType.PODCAST:
+        system, user = ScenarioPrompts._podcast_prompts()
+    else:
+        system, user = ScenarioPrompts._corporate_prompts() # Fallback
+    # Source indentation would cost tokens on every call. Not str.format: the prompts contain JSON braces.
+    system = textwrap.dedent(system).strip().replace("{voice_list}", _voice_lines(voices))
+    return system, textwrap.dedent(user).strip()
+
+@lru_cache(maxsize=8)
+def _render_prompt_mode(voices: Tuple[Tuple[str, str], ...]) -> str:
+    system = (
+        "You are an expert scriptwriter/director. "
+        "Convert the user's request into a structured audio script JSON.\n"
+        "STRICT OUTPUT FORMAT:\n"
+        "{\n"
+        "  \"segments\": [\n"
+        "    {\"role\": \"Narrator\", \"name\": \"Narrator\", \"text\": \"...\", \"voice\": \"en-US-AriaNeural\"},\n"
+        "    {\"role\": \"Character\", \"name\": \"Bob\", \"text\": \"...\", \"voice\": \"en-US-GuyNeural\"}\n"
+        "  ]\n"
+        "}\n"
+        "Choose appropriate voices (en-US-*) for the characters/roles implied."
+    )
+    if voices:
+        system += "\nAvailable voices: " + ", ".join(f"{name} ({gender})" for name, gender in voices)
+    return system
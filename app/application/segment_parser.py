@@ -0,0 +1,106 @@
+"""
+Tolerant parsing of the LLM's script replies.
+
+Most replies are valid JSON and take the fast path (one json.loads). A broken reply
+(cut off by a length limit or a dropped stream, wrapped in markdown fences, with
+trailing commas or an unterminated array) is repaired if it can be, or else
+salvaged: every complete object of the segments array is recovered on its own. The
+salvage scan only visits quotes, backslashes and brackets, so it stays cheap on
+multi-kilobyte replies.
+"""
+import json
+import re
+from typing import List, NamedTuple, Optional, Tuple
+from app.infrastructure.monitoring.metrics import metrics
+
+metrics.describe("llm_replies_parsed_total", "LLM script replies by parse outcome (ok, repaired, salvaged, failed).")
+metrics.describe("llm_segments_salvaged_total", "Segments recovered from LLM replies that were not valid JSON.")
+
+_FENCE = re.compile(r"```(?:json)?")
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_SEGMENTS_ARRAY = re.compile(r'"(?:segments|script)"\s*:\s*\[')
+_STRUCTURE = re.compile(r'[\\"{}\[\]]')
+
+class ParsedReply(NamedTuple):
+    items: List[dict]
+    # ok: valid JSON; repaired: valid once fences/trailing commas were fixed;
+    # salvaged: complete segment objects recovered from broken JSON; failed: nothing usable
+    outcome: str
+
+def _segment_list(data) -> Optional[list]:
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        for key in ("segments", "script"):
+            if isinstance(data.get(key), list):
+                return data[key]
+        return next((value for value in data.values() if isinstance(value, list)), None)
+    return None
+
+def _loads(text: str):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+def _object_spans(text: str, array_start: int) -> List[Tuple[int, int]]:
+    """Spans of the complete objects directly inside the array opening at text[array_start]."""
+    spans = []
+    depth, in_string, escaped_at, object_start = 0, False, -1, None
+    for match in _STRUCTURE.finditer(text, array_start):
+        i, char = match.start(), match.group()
+        if i == escaped_at:
+            continue
+        if in_string:
+            if char == "\\":
+                escaped_at = i + 1
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            depth += 1
+            if depth == 2 and char == "{":
+                object_start = i
+        elif char in "}]":
+            if depth == 2 and char == "}" and object_start is not None:
+                spans.append((object_start, i + 1))
+                object_start = None
+            depth -= 1
+            if depth == 0:
+                break
+    return spans
+
+def _salvage(text: str) -> List[dict]:
+    found = _SEGMENTS_ARRAY.search(text)
+    array_start = found.end() - 1 if found else text.find("[")
+    if array_start < 0:
+        return []
+    items = []
+    for start, end in _object_spans(text, array_start):
+        chunk = text[start:end]
+        item = _loads(chunk)
+        if item is None:
+            item = _loads(_TRAILING_COMMA.sub(r"\1", chunk))
+        if isinstance(item, dict):
+            items.append(item)
+    return items
+
+def parse_segment_reply(content: str) -> ParsedReply:
+    """The raw segment objects of an LLM reply, recovering what it can from broken JSON."""
+    items = _segment_list(_loads(content))
+    if items is not None:
+        outcome = "ok"
+    else:
+        text = _FENCE.sub("", content).strip()
+        items = _segment_list(_loads(text)) if text != content else None
+        if items is None:
+            items = _segment_list(_loads(_TRAILING_COMMA.sub(r"\1", text)))
+        if items is not None:
+            outcome = "repaired"
+        else:
+            items = _salvage(text)
+            outcome = "salvaged" if items else "failed"
+            metrics.inc("llm_segments_salvaged_total", len(items))
+    metrics.inc("llm_replies_parsed_total", outcome=outcome)
+    return ParsedReply(items, outcome)
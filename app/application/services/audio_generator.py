@@ -1,46 +1,69 @@
+import hashlib
 import os
-from typing import List
-from app.domain.models import Script, ScriptSegment
-from app.domain.ports import TTSProvider, StorageProvider
+import uuid
+from typing import Dict, List
+import anyio
+from app.domain.models import Script, ScriptSegment, BatchItemResult, AudioEncoding
+from app.domain.ports import TTSProvider, StorageProvider, CheckpointStore, ArtifactIndex, VoiceCatalog
+from app.application.job_context import job_context
+from app.application.services.voice_preflight import VoicePreflight
 from app.infrastructure.monitoring.logger import logger
 from app.infrastructure.config.settings import settings
 
 from typing import Optional
 
 class AudioGenerationService:
-    def __init__(self, tts_provider: TTSProvider, storage_provider: StorageProvider, cloud_storage: Optional[StorageProvider] = None):
+    def __init__(self, tts_provider: TTSProvider, storage_provider: StorageProvider, cloud_storage: Optional[StorageProvider] = None, checkpoints: Optional[CheckpointStore] = None, max_parallel_segments: Optional[int] = None,
+                 artifacts: Optional[ArtifactIndex] = None, voices: Optional[VoiceCatalog] = None):
         self.tts = tts_provider
         self.storage = storage_provider
         self.cloud_storage = cloud_storage
+        self.checkpoints = checkpoints
+        self.artifacts = artifacts
+        self.preflight = VoicePreflight(voices) if voices else None
+        self.max_parallel_segments = max_parallel_segments or settings.TTS_MAX_PARALLEL_SEGMENTS
 
-    async def generate_script_audio(self, script: Script, output_filename: str, upload_to_cloud: bool = True) -> str:
+    async def generate_script_audio(self, script: Script, output_filename: str, upload_to_cloud: bool = True, job_id: Optional[str] = None,
+                                    output_dir: Optional[str] = None, encoding: Optional[AudioEncoding] = None,
+                                    artifact_id: Optional[str] = None, scenario: Optional[str] = None) -> str:
         """
         Orchestrates the generation of audio for a full script.
+        When a job_id is given (and a checkpoint store is configured), every synthesized
+        segment is kept in the job checkpoint, and segments already present are reused.
+        Segments are synthesized directly in `encoding` (default: standard MP3), so
+        output_filename should carry its extension. With an artifact_id, the final file
+        is recorded in the artifact index under that id. With a voice catalog, the script's
+        voices are checked (and fixed, or rejected with InvalidVoiceError) before any TTS call.
+        Segments are separated by pauses (see `pauses`; `scenario` picks the turn length).
         Returns: Path to the generated file (Local or Cloud signed URL).
         """
+        encoding = encoding or AudioEncoding()
+        if self.preflight:
+            script = self.preflight.check(script)
+        checkpointed = bool(self.checkpoints and job_id)
+        job = job_context()
+        job.enter_stage("audio")
+        job.tts_calls_planned = job.tts_calls + len(script.segments)
         # Create temp dir
-        safe_name = output_filename.replace(".mp3", "")
+        safe_name = os.path.splitext(output_filename)[0]
         temp_dir = self.storage.create_temp_dir(safe_name)
         # Local final destination (always required for concatenation)
-        local_output_path = os.path.join(settings.OUTPUT_DIR, output_filename)
+        local_output_path = self.storage.artifact_path(output_dir or settings.OUTPUT_DIR, output_filename)
 
-        generated_files = []
         try:
-            for i, segment in enumerate(script.segments):
-                filename = f"segment_{i:03d}.mp3"
-                filepath = os.path.join(temp_dir, filename)
-                
-                logger.debug(f"Generating segment {i}: {segment.role}")
-                path = await self.tts.generate_audio(segment.text, segment.voice, filepath)
-                generated_files.append(path)
+            generated_files = await self._generate_segments(script, temp_dir, job_id if checkpointed else None, encoding)
 
             # Concatenate
             if generated_files:
-                await self.storage.concatenate_files(generated_files, local_output_path)
+                job.enter_stage("concatenate")
+                await self.storage.concatenate_files(generated_files, local_output_path, pauses=self.pauses(script, scenario))
                 logger.info(f"Final audio assembled locally: {local_output_path}")
 
                 # --- Cloud Persistence (Resilient) ---
+                cloud_path = None
                 if self.cloud_storage and upload_to_cloud:
+                    job.enter_stage("upload")
+                    job.report("upload", status="started")
                     try:
                         with open(local_output_path, "rb") as f:
                             file_content = f.read()
@@ -50,10 +73,20 @@ class AudioGenerationService:
                         
                         if cloud_path:
                             logger.info(f"Cloud Backup Successful: {cloud_path}")
+                        job.report("upload", status="done" if cloud_path else "failed")
                                  
                     except Exception as e:
                         logger.warning(f"⚠️ CLOUD UPLOAD FAILED (Quota?): {e}. Returning local file.")
+                        job.report("upload", status="failed")
                         # Do not raise! Fallback to local.
+
+                if self.artifacts and artifact_id:
+                    try:
+                        await anyio.to_thread.run_sync(
+                            self.artifacts.record_file, artifact_id, "audio", local_output_path, cloud_path or None, not upload_to_cloud
+                        )
+                    except Exception as e:
+                        logger.warning(f"Could not index {local_output_path}: {e}")
                 
                 return local_output_path
             else:
@@ -63,4 +96,157 @@ class AudioGenerationService:
             logger.error(f"Audio generation failed: {e}")
             raise
         finally:
-            self.storage.cleanup_temp_dir(temp_dir)
\ No newline at end of file
+            self.storage.cleanup_temp_dir(temp_dir)
+
+    @staticmethod
+    def apply_voice_overrides(script: Script, overrides: Dict[str, str]) -> Script:
+        """Copy of the script with voices replaced; keys match a speaker name, a role or an original voice."""
+        if not overrides:
+            return script
+        segments = [
+            segment.model_copy(update={"voice": overrides.get(segment.name) or overrides.get(segment.role) or overrides.get(segment.voice) or segment.voice})
+            for segment in script.segments
+        ]
+        return script.model_copy(update={"segments": segments})
+
+    @staticmethod
+    def pauses(script: Script, scenario: Optional[str] = None) -> List[float]:
+        """Silence (seconds) after each segment but the last: a turn pause when the speaker changes."""
+        turn = settings.PAUSE_SCENARIO_TURN_MS.get(scenario, settings.PAUSE_TURN_MS) if scenario else settings.PAUSE_TURN_MS
+        return [
+            (turn if (current.name, current.role) != (following.name, following.role) else settings.PAUSE_SAME_SPEAKER_MS) / 1000
+            for current, following in zip(script.segments, script.segments[1:])
+        ]
+
+    @staticmethod
+    def script_digest(script: Script) -> str:
+        """Identity of a script's audio: same voices and texts in the same order give the same file."""
+        h = hashlib.sha1()
+        for segment in script.segments:
+            h.update(f"{segment.voice}\n{segment.text}\0".encode("utf-8"))
+        return h.hexdigest()
+
+    async def generate_batch(self, scripts: List[Script], batch_id: str, output_dir: str,
+                             filenames: Optional[List[Optional[str]]] = None, max_parallel_items: Optional[int] = None,
+                             encoding: Optional[AudioEncoding] = None, index_artifacts: bool = False) -> List[BatchItemResult]:
+        """
+        Synthesizes many scripts in one job. Identical scripts are synthesized once (later
+        copies are reported as duplicates of the first), at most max_parallel_items at a
+        time; segments still share the TTS adapter's limiter with every other job.
+        A failed item is reported in its result instead of failing the whole batch.
+        With index_artifacts, item files are recorded in the artifact index by item id.
+        """
+        encoding = encoding or AudioEncoding()
+        first_index: Dict[str, int] = {}
+        results: List[BatchItemResult] = []
+        for index, script in enumerate(scripts):
+            item_id = f"{batch_id}_{index:04d}"
+            original = first_index.setdefault(self.script_digest(script), index)
+            if original != index:
+                results.append(BatchItemResult(index=index, item_id=results[original].item_id, status="ok", duplicate_of=original))
+                continue
+            requested = filenames[index] if filenames else None
+            filename = os.path.basename(requested) if requested else f"{item_id}.{encoding.extension}"
+            results.append(BatchItemResult(index=index, item_id=item_id, status="ok", filename=filename))
+
+        unique = [r for r in results if r.duplicate_of is None]
+        logger.info(f"Batch {batch_id}: {len(scripts)} items, {len(unique)} unique")
+        slots = anyio.Semaphore(max_parallel_items or settings.BATCH_MAX_PARALLEL_ITEMS)
+        job = job_context()
+        done = 0
+
+        async def _one(result: BatchItemResult):
+            nonlocal done
+            async with slots:
+                try:
+                    result.path = await self.generate_script_audio(
+                        scripts[result.index], f"{result.item_id}.{encoding.extension}", upload_to_cloud=False,
+                        output_dir=output_dir, encoding=encoding, artifact_id=result.item_id if index_artifacts else None
+                    )
+                    result.bytes = os.path.getsize(result.path)
+                except Exception as e:
+                    logger.warning(f"Batch {batch_id}: item {result.index} failed: {e}")
+                    result.status, result.error = "error", str(e)
+                done += 1
+                job.report("items", done=done, total=len(unique))
+
+        async with anyio.create_task_group() as tg:
+            for result in unique:
+                tg.start_soon(_one, result)
+
+        # Duplicates share the outcome of the item they copy
+        for result in results:
+            if result.duplicate_of is not None:
+                original = results[result.duplicate_of]
+                result.status, result.error = original.status, original.error
+        return results
+
+    async def _generate_segments(self, script: Script, temp_dir: str, job_id: Optional[str], encoding: AudioEncoding) -> List[str]:
+        """
+        Synthesizes all segments concurrently (at most max_parallel_segments per job; the
+        TTS adapter's shared limiter decides the real upstream concurrency).
+        Returns the segment files in script order. The first failure cancels the rest.
+        """
+        paths: List[Optional[str]] = [None] * len(script.segments)
+        slots = anyio.Semaphore(self.max_parallel_segments)
+        failures = []
+        job = job_context()
+        done = 0
+
+        async with anyio.create_task_group() as tg:
+            async def _one(i: int, segment: ScriptSegment):
+                nonlocal done
+                try:
+                    async with slots:
+                        if job_id:
+                            paths[i] = await self._generate_checkpointed_segment(job_id, i, segment, encoding)
+                        else:
+                            paths[i] = await self._generate_temp_segment(temp_dir, i, segment, encoding)
+                    done += 1
+                    job.report("segments", done=done, total=len(paths))
+                except Exception as e:
+                    # Keep the original exception (not an ExceptionGroup) for callers
+                    failures.append(e)
+                    tg.cancel_scope.cancel()
+
+            for i, segment in enumerate(script.segments):
+                tg.start_soon(_one, i, segment)
+
+        if failures:
+            raise failures[0]
+        return paths
+
+    async def _generate_temp_segment(self, temp_dir: str, index: int, segment: ScriptSegment, encoding: AudioEncoding) -> str:
+        filename = f"segment_{index:03d}.{encoding.extension}"
+        filepath = os.path.join(temp_dir, filename)
+
+        logger.debug(f"Generating segment {index}: {segment.role}")
+        path = await self.tts.generate_audio(segment.text, segment.voice, filepath, encoding=encoding)
+        job_context().tts_calls += 1
+        return path
+
+    async def _generate_checkpointed_segment(self, job_id: str, index: int, segment: ScriptSegment, encoding: AudioEncoding) -> str:
+        """Synthesizes one segment into the job checkpoint, or reuses it if already there."""
+        job = job_context()
+        filepath = self.checkpoints.segment_path(job_id, index, segment, encoding.extension)
+        if os.path.exists(filepath):
+            logger.debug(f"Reusing checkpointed segment {index}: {segment.role}")
+            # Counts as activity, so retention does not purge segments that are still being reused
+            os.utime(filepath)
+            job.tts_calls_planned -= 1
+            return filepath
+
+        logger.debug(f"Generating segment {index}: {segment.role}")
+        # Write aside and rename, so a crash never leaves a truncated segment that looks complete. The
+        # name is unique: concurrent renders of one script share the cache and may write the same segment.
+        partial_path = f"{filepath}.{uuid.uuid4().hex[:8]}.part"
+        try:
+            await self.tts.generate_audio(segment.text, segment.voice, partial_path, encoding=encoding)
+        except BaseException:
+            # Includes cancellation: drop the half-written file
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+        job.tts_calls += 1
+        os.replace(partial_path, filepath)
+        return filepath
@@ -1,62 +1,103 @@
 import json
-from typing import List
-from app.domain.models import SimulationRequest, ScriptSegment, Script
-from app.domain.ports import LLMProvider
+from typing import Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from app.domain.models import SimulationRequest, ScriptSegment, Script, ScriptBatch, VoiceInfo
+from app.domain.ports import LLMProvider, CheckpointStore, VoiceCatalog
+from app.domain.exceptions import DeadlineExceededError
 from app.application.prompts import ScenarioPrompts
+from app.application.job_context import job_context
+from app.application.segment_parser import parse_segment_reply
+from app.application.services.voice_preflight import VoicePreflight
+from app.infrastructure.config.settings import settings
 from app.infrastructure.monitoring.logger import logger
 
 class ScriptGenerationService:
-    def __init__(self, llm_provider: LLMProvider):
+    def __init__(self, llm_provider: LLMProvider, checkpoints: Optional[CheckpointStore] = None, voices: Optional[VoiceCatalog] = None):
         self.llm = llm_provider
+        self.checkpoints = checkpoints
+        # With a catalog, prompts offer its voices and finished scripts get their voices checked
+        self.voices = voices
+        self.preflight = VoicePreflight(voices) if voices else None
 
-    def _parse_segments(self, content: str) -> List[ScriptSegment]:
-        """Parses the raw LLM response string into ScriptSegment objects."""
-        try:
-            # Clean content 
-            content = content.replace("```json", "").replace("```", "").strip()
-            data = json.loads(content)
-            
-            raw_segments = []
-            if isinstance(data, dict):
-                 if "segments" in data:
-                     raw_segments = data["segments"]
-                 elif "script" in data:
-                     raw_segments = data["script"]
-                 else:
-                     for val in data.values():
-                         if isinstance(val, list):
-                             raw_segments = val
-                             break
-            elif isinstance(data, list):
-                raw_segments = data
-                
-            if not raw_segments and isinstance(data, dict):
-                 # Fallback, maybe empty
-                 logger.warning(f"Could not find 'segments' list in response keys: {data.keys()}")
-                 return []
-    
-            return [ScriptSegment(**seg) for seg in raw_segments]
-
-        except json.JSONDecodeError:
-            logger.error(f"JSON Decode Error. Raw Content: {content}")
-            return []
-        except Exception as e:
-            logger.error(f"Error parsing segments: {e}")
+    def _prompt_voices(self, locales: List[str]) -> Optional[List[VoiceInfo]]:
+        if not self.voices:
+            return None
+        return [voice for locale in locales for voice in self.voices.voices(locale=locale)] or None
+
+    def _checked(self, script: Script) -> Script:
+        return self.preflight.check(script) if self.preflight else script
+
+    def _load_batches(self, job_id: Optional[str]) -> List[ScriptBatch]:
+        if not (self.checkpoints and job_id):
             return []
+        return self.checkpoints.load_batches(job_id)
+
+    def _save_batch(self, job_id: Optional[str], content: str, segments: List[ScriptSegment], usage: Dict[str, int]):
+        if self.checkpoints and job_id:
+            self.checkpoints.save_batch(job_id, ScriptBatch(content=content, segments=segments, usage=usage))
+
+    async def _call_llm(self, messages: List[Dict[str, str]], model, api_key: Optional[str], cache_key: str) -> Tuple[str, Dict[str, int]]:
+        """One LLM call: the reply and the tokens it used."""
+        job = job_context()
+        before = job.llm_usage()
+        content = await self.llm.generate_text(messages, response_format="json", api_key=api_key, model=model, cache_key=cache_key)
+        job.llm_calls += 1
+        return content, {kind: tokens - before[kind] for kind, tokens in job.llm_usage().items()}
+
+    @staticmethod
+    def _continuation_message(current_word_count: int, target_word_count: int) -> str:
+        remaining_words = target_word_count - current_word_count
+        remaining_minutes = max(1, round(remaining_words / 150))
+
+        return (
+            f"¡Excelente! Pero aún necesitamos más contenido para cumplir con el tiempo objetivo.\n"
+            f"Faltan aproximadamente {remaining_words} palabras ({remaining_minutes} minutos).\n"
+            f"Continúa la simulación exactamente donde quedó. Introduce un nuevo punto de discusión, "
+            f"profundiza en un detalle técnico o genera un conflicto/resolución.\n"
+            f"MANTÉN EL FORMATO JSON. NO repitas introducciones."
+        )
 
-    async def generate_script(self, request: SimulationRequest, api_key: str = None) -> Script:
+    def _parse_segments(self, content: str) -> Tuple[List[ScriptSegment], str]:
+        """
+        Parses the raw LLM response string into ScriptSegment objects. Also returns the reply as it
+        should stay in the conversation: a repaired or salvaged reply is replaced by its segments as
+        valid JSON, so the next continuation picks up after the last complete segment.
+        """
+        reply = parse_segment_reply(content)
+        segments = []
+        for item in reply.items:
+            try:
+                segments.append(ScriptSegment(**item))
+            except (TypeError, ValidationError) as e:
+                logger.warning(f"Dropping invalid segment {item!r}: {e}")
+
+        if reply.outcome == "failed":
+            logger.error(f"Could not parse any segment from the LLM reply. Raw Content: {content}")
+        elif reply.outcome != "ok":
+            logger.warning(f"LLM reply was not valid JSON ({reply.outcome}); kept {len(segments)} segments.")
+            if segments:
+                content = json.dumps({"segments": [s.model_dump() for s in segments]}, ensure_ascii=False)
+        return segments, content
+
+    async def generate_script(self, request: SimulationRequest, api_key: str = None, job_id: Optional[str] = None) -> Script:
         """
         Generates a script for the simulation using an LLM iteratively to meet duration goals.
+        With a job_id, each batch is checkpointed and previously checkpointed batches are
+        replayed into the conversation instead of being requested again.
         """
         logger.info(f"Generating script for ({request.scenario}) topic: {request.topic}")
+        job = job_context()
+        job.enter_stage("script")
         
         # Calculate target based on 150 words per minute
         target_word_count = request.duration_minutes * 150
         current_word_count = 0
         all_segments = []
         
-        # Get Prompt Strategy
-        system_prompt, user_prompt_template = ScenarioPrompts.get_prompt(request.scenario)
+        # Get Prompt Strategy. The system prompt is the static prefix shared by every job of the scenario;
+        # request details follow it, and each iteration only appends, so every call extends a cached prefix.
+        system_prompt, user_prompt_template = ScenarioPrompts.get_prompt(request.scenario, self._prompt_voices(settings.PROMPT_VOICE_LOCALES))
+        cache_key = ScenarioPrompts.cache_key(request.scenario)
 
         # Initial User Prompt
         user_prompt = user_prompt_template.format(
@@ -74,45 +115,57 @@ class ScriptGenerationService:
         iteration = 0
         MAX_ITERATIONS = max(2, request.duration_minutes // 2 + 2)
 
+        # Resume: replay already paid-for batches exactly as they were exchanged
+        for batch in self._load_batches(job_id):
+            iteration += 1
+            job.add_llm_usage(**batch.usage)
+            all_segments.extend(batch.segments)
+            current_word_count += sum(len(s.text.split()) for s in batch.segments)
+            if current_word_count < target_word_count:
+                messages.append({"role": "assistant", "content": batch.content})
+                messages.append({"role": "user", "content": self._continuation_message(current_word_count, target_word_count)})
+        if iteration:
+            logger.info(f"Resumed {iteration} checkpointed batches ({current_word_count} words) for job {job_id}.")
+            job.report("script", iteration=iteration, words=current_word_count, target_words=target_word_count)
+        job.llm_calls_planned = job.llm_calls + max(0, MAX_ITERATIONS - iteration)
+
         while current_word_count < target_word_count and iteration < MAX_ITERATIONS:
             iteration += 1
             logger.info(f"Generation Iteration {iteration}. Progress: {current_word_count}/{target_word_count} words.")
             
             try:
-                content = await self.llm.generate_text(messages, response_format="json", api_key=api_key, model=request.model)
+                content, usage = await self._call_llm(messages, request.model, api_key, cache_key)
                 
                 if not content:
                     logger.warning("Empty content from LLM.")
                     break
 
-                new_segments = self._parse_segments(content)
+                new_segments, content = self._parse_segments(content)
                 
                 if not new_segments:
+                    # Nothing salvageable: ask again from the same point (bounded by MAX_ITERATIONS)
                     logger.warning("No valid segments found in current iteration.")
-                    break 
+                    continue
 
                 all_segments.extend(new_segments)
+                self._save_batch(job_id, content, new_segments, usage)
                 
                 # Update counts
                 batch_words = sum(len(s.text.split()) for s in new_segments)
                 current_word_count += batch_words
+                job.report("script", iteration=iteration, words=current_word_count, target_words=target_word_count)
+                # Extrapolate how many TTS calls the finished script will need
+                job.tts_calls_planned = max(len(all_segments), round(len(all_segments) * target_word_count / max(1, current_word_count)))
                 
                 # Prepare for next iteration if needed
                 if current_word_count < target_word_count:
                     messages.append({"role": "assistant", "content": content})
-                    
-                    remaining_words = target_word_count - current_word_count
-                    remaining_minutes = max(1, round(remaining_words / 150))
-                    
-                    continuation_msg = (
-                        f"¡Excelente! Pero aún necesitamos más contenido para cumplir con el tiempo objetivo.\n"
-                        f"Faltan aproximadamente {remaining_words} palabras ({remaining_minutes} minutos).\n"
-                        f"Continúa la simulación exactamente donde quedó. Introduce un nuevo punto de discusión, "
-                        f"profundiza en un detalle técnico o genera un conflicto/resolución.\n"
-                        f"MANTÉN EL FORMATO JSON. NO repitas introducciones."
-                    )
-                    messages.append({"role": "user", "content": continuation_msg})
+                    messages.append({"role": "user", "content": self._continuation_message(current_word_count, target_word_count)})
                 
+            except DeadlineExceededError as e:
+                # Out of script budget: keep what we have so the audio stage still gets its share
+                logger.warning(f"{e} Continuing with {current_word_count}/{target_word_count} words.")
+                break
             except Exception as e:
                 logger.error(f"Error during script generation iteration {iteration}: {e}")
                 break
@@ -120,27 +173,25 @@ class ScriptGenerationService:
         if not all_segments:
             raise ValueError("Failed to generate any valid script segments.")
 
-        return Script(segments=all_segments)
+        return self._checked(Script(segments=all_segments))
 
-    async def generate_script_from_prompt(self, request: "PromptRequest", api_key: str = None) -> Script:
+    async def generate_script_from_prompt(self, request: "PromptRequest", api_key: str = None, job_id: Optional[str] = None) -> Script:
         """
         Generates a script based on a free-form prompt/instruction.
         Enforces JSON output for audio compatibility.
         """
         logger.info(f"Generating script from prompt: {request.prompt[:50]}...")
+        job = job_context()
+        job.enter_stage("script")
+        metadata = {"source": "prompt", "prompt": request.prompt}
+
+        checkpointed = self._load_batches(job_id)
+        if checkpointed:
+            logger.info(f"Reusing checkpointed script for job {job_id}.")
+            job.add_llm_usage(**checkpointed[0].usage)
+            return self._checked(Script(segments=checkpointed[0].segments, metadata=metadata))
         
-        system_prompt = (
-            "You are an expert scriptwriter/director. "
-            "Convert the user's request into a structured audio script JSON.\n"
-            "STRICT OUTPUT FORMAT:\n"
-            "{\n"
-            "  \"segments\": [\n"
-            "    {\"role\": \"Narrator\", \"name\": \"Narrator\", \"text\": \"...\", \"voice\": \"en-US-AriaNeural\"},\n"
-            "    {\"role\": \"Character\", \"name\": \"Bob\", \"text\": \"...\", \"voice\": \"en-US-GuyNeural\"}\n"
-            "  ]\n"
-            "}\n"
-            "Choose appropriate voices (en-US-*) for the characters/roles implied."
-        )
+        system_prompt = ScenarioPrompts.prompt_mode_system(self._prompt_voices(["en-US"]))
 
         messages = [
             {"role": "system", "content": system_prompt},
@@ -148,13 +199,15 @@ class ScriptGenerationService:
         ]
 
         try:
-            content = await self.llm.generate_text(messages, response_format="json", api_key=api_key, model=request.model)
-            segments = self._parse_segments(content)
+            job.llm_calls_planned = job.llm_calls + 1
+            content, usage = await self._call_llm(messages, request.model, api_key, ScenarioPrompts.cache_key())
+            segments, content = self._parse_segments(content)
             
             if not segments:
                 raise ValueError("LLM returned no valid segments for prompt.")
-                
-            return Script(segments=segments, metadata={"source": "prompt", "prompt": request.prompt})
+
+            self._save_batch(job_id, content, segments, usage)
+            return self._checked(Script(segments=segments, metadata=metadata))
             
         except Exception as e:
             logger.error(f"Prompt generation failed: {e}")
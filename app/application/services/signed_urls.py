@@ -0,0 +1,106 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+from app.domain.ports import SignedUrlProvider
+from app.infrastructure.config.settings import settings
+from app.infrastructure.monitoring.logger import logger
+from app.infrastructure.monitoring.metrics import metrics
+
+metrics.describe("signed_url_lookups_total", "Signed URL lookups, by result (hit, miss, shared = joined an in-flight request).")
+metrics.describe("signed_url_batches_total", "Signing requests sent to cloud storage.")
+
+class SignedUrlService:
+    """
+    Signed download URLs for cloud objects, issued on demand.
+
+    URLs are created in one storage call for all the paths a caller needs and kept in
+    memory until `refresh_margin` seconds before they expire, so repeated plays of the
+    same object do not go upstream. Concurrent lookups of a path that is already being
+    signed wait for that request instead of sending their own (single flight).
+    """
+    def __init__(self, provider: SignedUrlProvider, expires_in: Optional[int] = None,
+                 refresh_margin: Optional[float] = None, max_entries: Optional[int] = None):
+        self.provider = provider
+        self.expires_in = expires_in or settings.SIGNED_URL_EXPIRES_SECONDS
+        # Never hand out a URL that expires before the client can use it
+        self.refresh_margin = min(
+            refresh_margin if refresh_margin is not None else settings.SIGNED_URL_REFRESH_MARGIN_SECONDS,
+            self.expires_in / 2
+        )
+        self.max_entries = max_entries or settings.SIGNED_URL_CACHE_MAX_ENTRIES
+        # path -> (url, monotonic expiry), least recently used first
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    def _cached(self, path: str, now: float) -> Optional[str]:
+        entry = self._entries.get(path)
+        if entry is None:
+            return None
+        url, expires_at = entry
+        if expires_at - self.refresh_margin <= now:
+            del self._entries[path]
+            return None
+        self._entries.move_to_end(path)
+        return url
+
+    async def get_url(self, path: str) -> Optional[str]:
+        return (await self.get_urls([path])).get(path)
+
+    async def get_urls(self, paths: Iterable[str]) -> Dict[str, str]:
+        """Signed URL per path; paths that cannot be signed are left out."""
+        now = time.monotonic()
+        urls: Dict[str, str] = {}
+        shared: Dict[str, asyncio.Future] = {}
+        missing = []
+        for path in dict.fromkeys(paths):
+            url = self._cached(path, now)
+            if url is not None:
+                urls[path] = url
+                metrics.inc("signed_url_lookups_total", result="hit")
+            elif path in self._in_flight:
+                shared[path] = self._in_flight[path]
+                metrics.inc("signed_url_lookups_total", result="shared")
+            else:
+                missing.append(path)
+                metrics.inc("signed_url_lookups_total", result="miss")
+
+        if missing:
+            urls.update(await self._sign(missing))
+
+        retry = []
+        for path, future in shared.items():
+            # Shielded: a caller giving up must not cancel the request others wait on
+            signed = await asyncio.shield(future)
+            if signed is None:
+                # The request we joined failed; its owner saw the error, try again ourselves
+                retry.append(path)
+            elif path in signed:
+                urls[path] = signed[path]
+        if retry:
+            urls.update(await self.get_urls(retry))
+        return urls
+
+    async def _sign(self, paths: list) -> Dict[str, str]:
+        future = asyncio.get_running_loop().create_future()
+        for path in paths:
+            self._in_flight[path] = future
+        signed = None
+        try:
+            issued_at = time.monotonic()
+            metrics.inc("signed_url_batches_total")
+            signed = await self.provider.create_signed_urls(paths, self.expires_in)
+            for path, url in signed.items():
+                self._entries[path] = (url, issued_at + self.expires_in)
+                self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if len(signed) < len(paths):
+                logger.warning(f"Cloud storage signed {len(signed)} of {len(paths)} paths.")
+            return signed
+        finally:
+            for path in paths:
+                if self._in_flight.get(path) is future:
+                    del self._in_flight[path]
+            # Waiters get None (retry) if this request failed or was cancelled
+            future.set_result(signed)
@@ -0,0 +1,75 @@
+import difflib
+from typing import Dict, List, Set
+from app.domain.exceptions import InvalidVoiceError
+from app.domain.models import Script
+from app.domain.ports import VoiceCatalog
+from app.infrastructure.monitoring.logger import logger
+from app.infrastructure.monitoring.metrics import metrics
+
+metrics.describe("voice_preflight_total", "Distinct script voices checked before TTS, by outcome (ok, normalized, close_match, locale_fallback, rejected).")
+
+class VoicePreflight:
+    """
+    Checks every voice of a script against the catalog before any TTS call.
+
+    Unknown voices are fixed when the intent is clear: spelling variants (case,
+    separators, a missing "Neural"), near misses of an existing voice, or failing
+    that another voice of the same locale (or language), kept distinct from the
+    voices the script already uses. Anything else rejects the whole script.
+    """
+    # Similarity needed to take a near miss for a typo (difflib ratio)
+    CLOSE_MATCH_CUTOFF = 0.85
+
+    def __init__(self, catalog: VoiceCatalog):
+        self.catalog = catalog
+
+    def check(self, script: Script) -> Script:
+        """The script with its voices fixed (the same object if all were valid); raises InvalidVoiceError."""
+        voices = list(dict.fromkeys(segment.voice for segment in script.segments))
+        in_use: Set[str] = {v for v in voices if self.catalog.get(v)}
+        fixes: Dict[str, str] = {}
+        rejected: List[str] = []
+        for voice in voices:
+            known = self.catalog.get(voice)
+            if known:
+                if known.short_name != voice:
+                    fixes[voice] = known.short_name
+                metrics.inc("voice_preflight_total", outcome="ok")
+                continue
+            outcome, fix = self._fix(voice, in_use)
+            metrics.inc("voice_preflight_total", outcome=outcome)
+            if fix is None:
+                rejected.append(voice)
+                continue
+            logger.warning(f"Voice '{voice}' is not available; using {fix} ({outcome}).")
+            fixes[voice] = fix
+            in_use.add(fix)
+
+        if rejected:
+            raise InvalidVoiceError(f"Unknown voices with no replacement: {', '.join(rejected)}")
+        if not fixes:
+            return script
+        segments = [s.model_copy(update={"voice": fixes[s.voice]}) if s.voice in fixes else s for s in script.segments]
+        return script.model_copy(update={"segments": segments})
+
+    def _fix(self, voice: str, in_use: Set[str]):
+        normalized = voice.strip().replace("_", "-").replace(" ", "")
+        for candidate in (normalized, f"{normalized}Neural"):
+            known = self.catalog.get(candidate)
+            if known:
+                return "normalized", known.short_name
+
+        names = [v.short_name.lower() for v in self.catalog.voices()]
+        close = difflib.get_close_matches(normalized.lower(), names, n=1, cutoff=self.CLOSE_MATCH_CUTOFF)
+        if close:
+            return "close_match", self.catalog.get(close[0]).short_name
+
+        # Same locale, else same language; an unused voice keeps speakers apart
+        parts = normalized.split("-")
+        if len(parts) < 2:
+            return "rejected", None
+        candidates = [v.short_name for locale in ("-".join(parts[:2]), parts[0]) for v in self.catalog.voices(locale=locale)]
+        if not candidates:
+            return "rejected", None
+        unused = [name for name in candidates if name not in in_use]
+        return "locale_fallback", (unused or candidates)[0]
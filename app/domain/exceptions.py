@@ -14,4 +14,12 @@ class ConfigurationError(VanaheimError):
 
 class GenerationError(VanaheimError):
     """Raised when the generation process (LLM or TTS) fails."""
-    pass
\ No newline at end of file
+    pass
+
+class DeadlineExceededError(GenerationError):
+    """Raised when a job (or one of its stages) runs out of its time budget."""
+    pass
+
+class InvalidVoiceError(VanaheimError):
+    """Raised when a script uses voices the TTS provider does not have (and no fix was found)."""
+    pass
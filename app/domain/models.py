@@ -1,6 +1,6 @@
 from enum import Enum
-from typing import List, Optional
-from pydantic import BaseModel, Field
+from typing import Dict, List, Optional, Union
+from pydantic import BaseModel, Field, model_validator
 
 # --- Enums ---
 class AIModel(str, Enum):
@@ -10,6 +10,20 @@ class AIModel(str, Enum):
     GPT_4 = "gpt-4"
     GPT_3_5_TURBO = "gpt-3.5-turbo"
 
+class BatchOutput(str, Enum):
+    ZIP = "zip"
+    MULTIPART = "multipart"
+    MANIFEST = "manifest"
+
+class AudioFormat(str, Enum):
+    MP3 = "mp3"
+    OPUS = "opus"  # Opus in an Ogg container
+
+class AudioQuality(str, Enum):
+    LOW = "low"
+    STANDARD = "standard"
+    HIGH = "high"
+
 class ScenarioType(str, Enum):
     CORPORATE = "CORPORATE"
     PODCAST = "PODCAST"
@@ -43,6 +57,37 @@ class VoiceEnum(str, Enum):
     IT_IT_ELSA = "it-IT-ElsaNeural"
     IT_IT_ISABELLA = "it-IT-IsabellaNeural"
 
+class VoiceInfo(BaseModel):
+    """A TTS voice as listed by the provider (e.g. es-MX-DaliaNeural, es-MX, Female)."""
+    short_name: str
+    locale: str
+    gender: str
+
+# --- Value Objects ---
+class AudioEncoding(BaseModel):
+    """Codec/container and quality of an audio output (both produced natively by the TTS service)."""
+    format: AudioFormat = AudioFormat.MP3
+    quality: AudioQuality = AudioQuality.STANDARD
+
+    model_config = {"frozen": True}
+
+    @property
+    def extension(self) -> str:
+        return "ogg" if self.format == AudioFormat.OPUS else "mp3"
+
+    @property
+    def media_type(self) -> str:
+        return "audio/ogg" if self.format == AudioFormat.OPUS else "audio/mpeg"
+
+class AudioOutputOptions(BaseModel):
+    """Output format fields shared by the generation requests."""
+    output_format: AudioFormat = Field(default=AudioFormat.MP3, description="mp3, or opus (Ogg): about half the size of MP3 for speech.")
+    quality: AudioQuality = Field(default=AudioQuality.STANDARD, description="low (16 kHz, smallest), standard (24 kHz) or high.")
+
+    @property
+    def encoding(self) -> AudioEncoding:
+        return AudioEncoding(format=self.output_format, quality=self.quality)
+
 # --- Entities ---
 class ScriptSegment(BaseModel):
     voice: str = Field(..., description="The TTS voice ID.")
@@ -54,7 +99,7 @@ class Script(BaseModel):
     segments: List[ScriptSegment]
     metadata: Optional[dict] = Field(default_factory=dict)
 
-class SimulationRequest(BaseModel):
+class SimulationRequest(AudioOutputOptions):
     """Specialized Scenario Mode (e.g. Corporate, Podcast) with Timer"""
     participants: int = Field(..., ge=2, le=10)
     duration_minutes: int = Field(..., ge=1, le=120, description="Target duration in minutes (1-120).")
@@ -78,7 +123,7 @@ class SimulationRequest(BaseModel):
         }
     }
 
-class TextRequest(BaseModel):
+class TextRequest(AudioOutputOptions):
     """Free Mode: Simple Text to Audio"""
     text: str = Field(..., description="The text to convert to audio.")
     voice: VoiceEnum = Field(default=VoiceEnum.EN_US_ARIA, description="Select a high-quality neural voice.")
@@ -94,7 +139,7 @@ class TextRequest(BaseModel):
         }
     }
 
-class PromptRequest(BaseModel):
+class PromptRequest(AudioOutputOptions):
     """Dev Mode: Open Prompt to Audio"""
     prompt: str = Field(..., description="The instruction/prompt for the LLM (e.g. 'Create a dialog between 2 pirates').")
     topic: Optional[str] = "General"
@@ -119,6 +164,59 @@ class AudioRequest(BaseModel):
     script: Script
     output_filename: Optional[str] = None
 
+class RenderRequest(AudioOutputOptions):
+    """Render Mode: audio from a saved (or inline) script, without calling the LLM"""
+    script_id: Optional[str] = Field(None, description="Job id of a script generated earlier (/ai/prompt or /simulation/scenario).")
+    script: Optional[Script] = Field(None, description="Inline script, instead of script_id.")
+    voice_overrides: Dict[str, VoiceEnum] = Field(default_factory=dict, description="New voice per speaker name, role or original voice.")
+
+    @model_validator(mode="after")
+    def _one_source(self):
+        if (self.script_id is None) == (self.script is None):
+            raise ValueError("Provide exactly one of script_id or script.")
+        return self
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "script_id": "f8656779-8e39-4fe7-abab-d38e4a39a712",
+                    "voice_overrides": {"Ana": "es-ES-ElviraNeural", "es-MX-JorgeNeural": "es-ES-AlvaroNeural"}
+                }
+            ]
+        }
+    }
+
+class BatchTTSRequest(AudioOutputOptions):
+    """Batch Mode: many texts (or full scripts) to audio in one call"""
+    items: List[Union[TextRequest, AudioRequest]] = Field(..., min_length=1, description="Texts or scripts to synthesize; identical items are synthesized once.")
+    output: BatchOutput = Field(default=BatchOutput.ZIP, description="zip archive, multipart/mixed stream, or a JSON manifest of stored files.")
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "items": [
+                        {"text": "Welcome to Hlid Systems.", "voice": "en-US-AriaNeural"},
+                        {"text": "Bienvenidos a Hlid Systems.", "voice": "es-MX-DaliaNeural"}
+                    ],
+                    "output": "zip"
+                }
+            ]
+        }
+    }
+
+class BatchItemResult(BaseModel):
+    """Outcome of one batch item. Duplicates point at the item that was actually synthesized."""
+    index: int
+    item_id: str
+    status: str = Field(..., description="'ok' or 'error'.")
+    filename: Optional[str] = None
+    path: Optional[str] = None
+    bytes: Optional[int] = None
+    duplicate_of: Optional[int] = None
+    error: Optional[str] = None
+
 class SimulationRecord(BaseModel):
     """Corresponds to vanaheim_audio table"""
     id: Optional[str] = None
@@ -130,4 +228,44 @@ class SimulationRecord(BaseModel):
     script_path: str
     audio_path: str
     configuration: Optional[dict] = Field(default_factory=dict, description="Stores model, voices used, etc.")
-    script_content: Optional[str] = Field(None, description="The actual generated script text.")
\ No newline at end of file
+    script_content: Optional[str] = Field(None, description="The actual generated script text (JSON; stored gzip-compressed with SCRIPT_DB_COMPRESSION).")
+
+class SimulationFilter(BaseModel):
+    """History query filters; model and scenario match keys of SimulationRecord.configuration."""
+    topic: Optional[str] = Field(None, description="Case-insensitive substring of the topic.")
+    scenario: Optional[ScenarioType] = None
+    model: Optional[str] = None
+
+    def configuration_match(self) -> dict:
+        """The configuration keys a record must contain."""
+        match = {"scenario": self.scenario.value if self.scenario else None, "model": self.model}
+        return {key: value for key, value in match.items() if value is not None}
+
+class ArtifactRecord(BaseModel):
+    """A file a job left on local disk (final audio or saved script), as kept in the artifact index."""
+    artifact_id: str = Field(..., description="Job id (or batch item id) the file belongs to.")
+    kind: str = Field(..., description="'audio' or 'script'.")
+    path: str
+    bytes: int
+    sha256: str
+    duration_seconds: Optional[float] = None
+    cloud_path: Optional[str] = Field(None, description="Object path in cloud storage, if uploaded.")
+    local_only: bool = Field(False, description="Never meant for cloud storage (e.g. /tts/simple output).")
+    created_at: float
+    last_accessed_at: Optional[float] = Field(None, description="Last download or read, for LRU eviction.")
+
+class ScriptBatch(BaseModel):
+    """One LLM iteration of a script: the raw reply and the segments parsed from it."""
+    content: str
+    segments: List[ScriptSegment]
+    usage: Dict[str, int] = Field(default_factory=dict, description="Tokens the call used (prompt, completion, cached).")
+
+class JobCheckpoint(BaseModel):
+    """Durable descriptor of a generation job, used to resume it after a failure."""
+    job_id: str
+    kind: str = Field(..., description="Pipeline that owns the job (e.g. 'scenario', 'prompt').")
+    request: dict = Field(default_factory=dict, description="The original request payload.")
+    owner: Optional[str] = Field(None, description="Hashed identity of the client that started the job.")
+    request_hash: Optional[str] = Field(None, description="Hash of the request payload, so a retry must send the same body.")
+    created_at: str
+    updated_at: str
@@ -1,19 +1,28 @@
+import os
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
-from app.domain.models import ScriptSegment, SimulationRecord
+from typing import List, Dict, Any, Optional, Tuple
+from app.domain.models import ScriptSegment, SimulationRecord, ScriptBatch, JobCheckpoint, AudioEncoding, ArtifactRecord, VoiceInfo, SimulationFilter
 
 class TTSProvider(ABC):
     """Port for Text-to-Speech services."""
     @abstractmethod
-    async def generate_audio(self, text: str, voice: str, output_path: str) -> str:
-        """Generates audio file for a given text and voice."""
+    async def generate_audio(self, text: str, voice: str, output_path: str, encoding: Optional[AudioEncoding] = None) -> str:
+        """Generates audio file for a given text and voice (default encoding: standard MP3)."""
         pass
 
+    def supported_encoding(self, encoding: AudioEncoding) -> AudioEncoding:
+        """The encoding generate_audio will produce when asked for `encoding` (a fallback if it cannot)."""
+        return encoding
+
 class LLMProvider(ABC):
     """Port for Large Language Model services."""
     @abstractmethod
-    async def generate_text(self, messages: List[Dict[str, str]], response_format: str = "json", api_key: str = None) -> str:
-        """Generates text from an LLM provider."""
+    async def generate_text(self, messages: List[Dict[str, str]], response_format: str = "json", api_key: str = None,
+                            model: Optional[str] = None, cache_key: Optional[str] = None) -> str:
+        """
+        Generates text from an LLM provider. Calls sharing a cache_key share their leading
+        messages (prompt caching hint). Token usage is added to the current job context.
+        """
         pass
 
 class StorageProvider(ABC):
@@ -23,7 +32,8 @@ class StorageProvider(ABC):
         pass
 
     @abstractmethod
-    async def concatenate_files(self, file_paths: List[str], output_path: str) -> str:
+    async def concatenate_files(self, file_paths: List[str], output_path: str, pauses: Optional[List[float]] = None) -> str:
+        """Joins audio files into output_path; pauses[i] is the silence (seconds) inserted after file i."""
         pass
 
     @abstractmethod
@@ -34,9 +44,128 @@ class StorageProvider(ABC):
     def cleanup_temp_dir(self, path: str):
         pass
 
+    def artifact_path(self, base_dir: str, filename: str) -> str:
+        """Where a job's final file named `filename` is written under base_dir (default: flat)."""
+        return os.path.join(base_dir, filename)
+
+class SignedUrlProvider(ABC):
+    """Port for time-limited download URLs of cloud objects."""
+    @abstractmethod
+    async def create_signed_urls(self, paths: List[str], expires_in: int) -> Dict[str, str]:
+        """Signed URL per path, for all paths in one call (paths that cannot be signed are left out)."""
+        pass
+
 class SimulationRepository(ABC):
     """Port for Database Interaction"""
     @abstractmethod
     async def save_simulation(self, record: SimulationRecord) -> SimulationRecord:
         # returns the saved record or ID
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    async def get_script_content(self, simulation_id: str) -> Optional[str]:
+        """The stored script JSON of a simulation, or None if unknown."""
+        pass
+
+    @abstractmethod
+    async def get_audio_path(self, simulation_id: str) -> Optional[str]:
+        """The audio path recorded for a simulation, or None if unknown."""
+        pass
+
+    @abstractmethod
+    async def list_simulations(self, filters: SimulationFilter, limit: int, after: Optional[Tuple[str, str]] = None,
+                               include_script: bool = False) -> List[SimulationRecord]:
+        """
+        Records matching `filters`, newest first (created_at, then id, descending), starting
+        after the (created_at, id) key of the previous page. script_content is only loaded
+        with include_script.
+        """
+        pass
+
+class CheckpointStore(ABC):
+    """Port for durable job progress (script batches and synthesized segments)."""
+    @abstractmethod
+    def save_job(self, checkpoint: JobCheckpoint) -> None:
+        pass
+
+    @abstractmethod
+    def load_job(self, job_id: str) -> Optional[JobCheckpoint]:
+        pass
+
+    @abstractmethod
+    def save_batch(self, job_id: str, batch: ScriptBatch) -> None:
+        pass
+
+    @abstractmethod
+    def load_batches(self, job_id: str) -> List[ScriptBatch]:
+        pass
+
+    @abstractmethod
+    def segment_path(self, job_id: str, index: int, segment: ScriptSegment, extension: str = "mp3") -> str:
+        """Durable location for the audio of one segment. Existing files are reusable."""
+        pass
+
+    @abstractmethod
+    def adopt_segments(self, job_id: str, target_job_id: str):
+        """Moves the segment audio of `job_id` into the checkpoint of `target_job_id` (files already there are kept)."""
+        pass
+
+    @abstractmethod
+    def clear(self, job_id: str):
+        pass
+
+    @abstractmethod
+    def purge_expired(self, max_age_seconds: float) -> int:
+        """Removes checkpoints untouched for longer than max_age_seconds. Returns how many."""
+        pass
+
+class ArtifactIndex(ABC):
+    """Port for the local index of job artifacts: id -> files, so lookups never scan directories."""
+    @abstractmethod
+    def record_file(self, artifact_id: str, kind: str, path: str, cloud_path: Optional[str] = None, local_only: bool = False) -> ArtifactRecord:
+        """Indexes a finished file (size, checksum and, for audio, duration are measured here)."""
+        pass
+
+    @abstractmethod
+    def find(self, artifact_id: str, kind: str) -> Optional[ArtifactRecord]:
+        """The latest artifact of that kind, or None."""
+        pass
+
+    @abstractmethod
+    def list(self, artifact_id: str) -> List[ArtifactRecord]:
+        pass
+
+    @abstractmethod
+    def remove(self, path: str) -> None:
+        pass
+
+    @abstractmethod
+    def touch(self, path: str) -> None:
+        """Records a download/read of the file (for least-recently-used eviction)."""
+        pass
+
+    @abstractmethod
+    def total_bytes(self) -> int:
+        pass
+
+    @abstractmethod
+    def least_recently_used(self, limit: int, accessed_before: Optional[float] = None) -> List[ArtifactRecord]:
+        """Artifacts by last access (or creation), oldest first; optionally only those idle since before a time."""
+        pass
+
+class CloudObjectChecker(ABC):
+    """Port to confirm that an object exists in cloud storage (before dropping a local copy)."""
+    @abstractmethod
+    async def exists(self, path: str) -> bool:
+        pass
+
+class VoiceCatalog(ABC):
+    """Port for the voices the TTS provider offers."""
+    @abstractmethod
+    def get(self, short_name: str) -> Optional[VoiceInfo]:
+        pass
+
+    @abstractmethod
+    def voices(self, locale: Optional[str] = None, gender: Optional[str] = None) -> List[VoiceInfo]:
+        """Voices of a locale ("es-MX") or language ("es"), optionally of one gender, sorted by name."""
+        pass
@@ -1,13 +1,81 @@
+import os
+from typing import Optional
+import anyio
 import edge_tts
+from app.domain.models import AudioEncoding, AudioFormat, AudioQuality
 from app.domain.ports import TTSProvider
+from app.infrastructure.adapters import edge_tts_formats
+from app.infrastructure.adapters.edge_tts_formats import EDGE_TTS_DEFAULT_FORMAT
+from app.application.job_context import job_context
+from app.infrastructure.config.settings import settings
+from app.infrastructure.resilience.hedging import Hedger
+from app.infrastructure.resilience.adaptive_limiter import AdaptiveLimiter, get_limiter
 from app.infrastructure.monitoring.logger import logger
 
+# Output formats the Edge read-aloud service encodes natively (no transcoding on our side)
+EDGE_OUTPUT_FORMATS = {
+    (AudioFormat.MP3, AudioQuality.LOW): "audio-16khz-32kbitrate-mono-mp3",
+    (AudioFormat.MP3, AudioQuality.STANDARD): "audio-24khz-48kbitrate-mono-mp3",
+    (AudioFormat.MP3, AudioQuality.HIGH): "audio-24khz-96kbitrate-mono-mp3",
+    (AudioFormat.OPUS, AudioQuality.LOW): "ogg-16khz-16bit-mono-opus",
+    (AudioFormat.OPUS, AudioQuality.STANDARD): "ogg-24khz-16bit-mono-opus",
+    (AudioFormat.OPUS, AudioQuality.HIGH): "ogg-48khz-16bit-mono-opus",
+}
+
 class EdgeTTSAdapter(TTSProvider):
-    async def generate_audio(self, text: str, voice: str, output_path: str) -> str:
+    def __init__(self, hedger: Optional[Hedger] = None, limiter: Optional[AdaptiveLimiter] = None):
+        self.limiter = limiter or get_limiter("edge_tts")
+        if settings.EDGE_TTS_WSS_URL:
+            edge_tts_formats.set_endpoint(settings.EDGE_TTS_WSS_URL)
+        self.hedger = hedger or Hedger(
+            "edge_tts",
+            quantile=settings.TTS_HEDGE_QUANTILE,
+            min_delay=settings.TTS_HEDGE_MIN_DELAY_SECONDS,
+            default_delay=settings.TTS_HEDGE_DEFAULT_DELAY_SECONDS,
+            max_extra_ratio=settings.TTS_HEDGE_MAX_EXTRA_RATIO,
+            enabled=settings.TTS_HEDGE_ENABLED,
+            guard=lambda: self.limiter.waiting == 0
+        )
+
+    def supported_encoding(self, encoding: AudioEncoding) -> AudioEncoding:
+        if EDGE_OUTPUT_FORMATS[(encoding.format, encoding.quality)] == EDGE_TTS_DEFAULT_FORMAT or edge_tts_formats.native_formats_available():
+            return encoding
+        logger.warning(f"{encoding.format.value}/{encoding.quality.value} needs edge-tts internals that are missing; using standard MP3.")
+        return AudioEncoding()
+
+    async def generate_audio(self, text: str, voice: str, output_path: str, encoding: Optional[AudioEncoding] = None) -> str:
         try:
-            communicate = edge_tts.Communicate(text, voice)
-            await communicate.save(output_path)
+            # Per-call timeout, clamped to the job's remaining stage budget
+            timeout = job_context().call_timeout(settings.TTS_CALL_TIMEOUT_SECONDS)
+            with anyio.fail_after(timeout):
+                encoding = self.supported_encoding(encoding or AudioEncoding())
+                output_format = EDGE_OUTPUT_FORMATS[(encoding.format, encoding.quality)]
+                winner_path = await self.hedger.run(
+                    lambda attempt: self._synthesize(text, voice, f"{output_path}.try{attempt}", output_format), work=len(text)
+                )
+            os.replace(winner_path, output_path)
             return output_path
+        except TimeoutError as e:
+            # The attempts only see a cancellation; report the timeout to the limiter here
+            self.limiter.record_overload("timeout")
+            logger.error(f"EdgeTTS generation timed out for voice {voice}: {e}")
+            raise
         except Exception as e:
             logger.error(f"EdgeTTS generation failed for voice {voice}: {e}")
             raise
+
+    async def _synthesize(self, text: str, voice: str, attempt_path: str, output_format: str = EDGE_TTS_DEFAULT_FORMAT) -> str:
+        # Each attempt writes its own file; a cancelled/failed attempt removes its leftovers.
+        try:
+            # Synthesis time grows with the text: the limiter judges latency per character
+            async with self.limiter.acquire(work=len(text)):
+                if output_format == EDGE_TTS_DEFAULT_FORMAT:
+                    communicate = edge_tts.Communicate(text, voice)
+                    await communicate.save(attempt_path)
+                else:
+                    await edge_tts_formats.save_in_format(text, voice, output_format, attempt_path)
+            return attempt_path
+        except BaseException:
+            if os.path.exists(attempt_path):
+                os.remove(attempt_path)
+            raise
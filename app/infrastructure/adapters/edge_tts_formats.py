@@ -0,0 +1,101 @@
+"""
+Native output formats for edge-tts.
+
+edge_tts.Communicate hardcodes its `speech.config` (standard MP3, and it rejects
+anything but audio/mpeg). For the other formats the Edge service encodes natively,
+this module speaks the same protocol with edge_tts helpers that are not public API.
+Everything that touches those internals lives here: `native_formats_available()`
+checks they are present, and callers fall back to standard MP3 when they are not.
+"""
+import aiohttp
+import edge_tts
+from edge_tts.exceptions import NoAudioReceived, UnexpectedResponse
+from app.infrastructure.monitoring.logger import logger
+
+# The only format edge_tts.Communicate requests
+EDGE_TTS_DEFAULT_FORMAT = "audio-24khz-48kbitrate-mono-mp3"
+
+# edge_tts.communicate internals used by save_in_format
+_WIRE_NAMES = ("WSS_URL", "WSS_HEADERS", "SEC_MS_GEC_VERSION", "DRM", "_SSL_CTX", "connect_id", "date_to_string",
+               "escape", "remove_incompatible_characters", "split_text_by_byte_length", "mkssml",
+               "ssml_headers_plus_data", "get_headers_and_data")
+
+def _wire():
+    """edge_tts.communicate if it still has every internal save_in_format needs, else None."""
+    wire = getattr(edge_tts, "communicate", None)
+    if wire is None or not all(hasattr(wire, name) for name in _WIRE_NAMES):
+        return None
+    if not (callable(getattr(wire.DRM, "generate_sec_ms_gec", None)) and callable(getattr(wire.DRM, "headers_with_muid", None))):
+        return None
+    try:
+        from edge_tts.data_classes import TTSConfig
+        TTSConfig("en-US-EmmaMultilingualNeural", "+0%", "+0%", "+0Hz", "SentenceBoundary")
+    except Exception:
+        return None
+    return wire
+
+_native = None
+
+def native_formats_available() -> bool:
+    """Whether this edge-tts still exposes what save_in_format needs (checked once)."""
+    global _native
+    if _native is None:
+        _native = _wire() is not None
+        if not _native:
+            logger.warning(f"edge-tts {getattr(edge_tts, '__version__', '?')} changed its internals: "
+                           "only standard MP3 can be synthesized.")
+    return _native
+
+def set_endpoint(url: str):
+    """Points edge_tts at another service URL (it has no option for it; the URL is a module global)."""
+    edge_tts.communicate.WSS_URL = url
+
+async def save_in_format(text: str, voice: str, output_format: str, output_path: str):
+    """
+    edge_tts.Communicate.save with another output format: one websocket per text chunk,
+    config, SSML, then binary `Path:audio` frames until `turn.end`. Each chunk is a
+    complete stream; for Ogg they are written one after another and joined on
+    concatenation. Only call it when native_formats_available().
+    """
+    from edge_tts.data_classes import TTSConfig
+    wire = edge_tts.communicate
+    config = TTSConfig(voice, "+0%", "+0%", "+0Hz", "SentenceBoundary")
+    chunks = wire.split_text_by_byte_length(wire.escape(wire.remove_incompatible_characters(text)), 4096)
+    timeout = aiohttp.ClientTimeout(total=None, connect=None, sock_connect=10, sock_read=60)
+    received = 0
+    with open(output_path, "wb") as audio:
+        for chunk in chunks:
+            async with aiohttp.ClientSession(trust_env=True, timeout=timeout) as session, session.ws_connect(
+                f"{wire.WSS_URL}&ConnectionId={wire.connect_id()}"
+                f"&Sec-MS-GEC={wire.DRM.generate_sec_ms_gec()}&Sec-MS-GEC-Version={wire.SEC_MS_GEC_VERSION}",
+                compress=15,
+                headers=wire.DRM.headers_with_muid(wire.WSS_HEADERS),
+                ssl=wire._SSL_CTX,
+            ) as websocket:
+                await websocket.send_str(
+                    f"X-Timestamp:{wire.date_to_string()}\r\n"
+                    "Content-Type:application/json; charset=utf-8\r\n"
+                    "Path:speech.config\r\n\r\n"
+                    '{"context":{"synthesis":{"audio":{"metadataoptions":{'
+                    '"sentenceBoundaryEnabled":"false","wordBoundaryEnabled":"false"},'
+                    f'"outputFormat":"{output_format}"'
+                    "}}}}\r\n"
+                )
+                await websocket.send_str(wire.ssml_headers_plus_data(
+                    wire.connect_id(), wire.date_to_string(), wire.mkssml(config, chunk)
+                ))
+                async for message in websocket:
+                    if message.type == aiohttp.WSMsgType.TEXT:
+                        if "Path:turn.end" in message.data:
+                            break
+                    elif message.type == aiohttp.WSMsgType.BINARY:
+                        header_length = int.from_bytes(message.data[:2], "big")
+                        headers, data = wire.get_headers_and_data(message.data, header_length)
+                        if headers.get(b"Path") != b"audio":
+                            raise UnexpectedResponse("Received binary message, but the path is not audio.")
+                        audio.write(data)
+                        received += len(data)
+                    elif message.type == aiohttp.WSMsgType.ERROR:
+                        raise edge_tts.exceptions.WebSocketError(str(message.data or "Unknown error"))
+    if not received:
+        raise NoAudioReceived(f"No audio was received for output format {output_format}.")
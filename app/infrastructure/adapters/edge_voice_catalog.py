@@ -0,0 +1,80 @@
+"""
+Voice catalog of the Edge read-aloud service.
+
+Starts from the snapshot bundled with the app (config/edge_voices.json), or from the
+last refreshed copy in VOICE_CATALOG_PATH, and is refreshed from `edge_tts.list_voices`
+every VOICE_CATALOG_REFRESH_HOURS. To update the bundled snapshot:
+
+    python -m app.infrastructure.adapters.edge_voice_catalog --bundled
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+from app.domain.models import VoiceInfo
+from app.domain.ports import VoiceCatalog
+from app.infrastructure.config.settings import settings
+from app.infrastructure.monitoring.logger import logger
+
+BUNDLED_SNAPSHOT = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config", "edge_voices.json")
+
+class EdgeVoiceCatalog(VoiceCatalog):
+    """In-memory catalog indexed by short name (case-insensitive), locale and language."""
+    def __init__(self, snapshot_path: Optional[str] = None):
+        self.snapshot_path = snapshot_path or settings.VOICE_CATALOG_PATH
+        path = self.snapshot_path if os.path.exists(self.snapshot_path) else BUNDLED_SNAPSHOT
+        with open(path, "r", encoding="utf-8") as f:
+            self._index(json.load(f))
+        self.loaded_at = os.path.getmtime(path)
+
+    def _index(self, entries: List[dict]):
+        voices = sorted((VoiceInfo(short_name=e["ShortName"], locale=e["Locale"], gender=e["Gender"]) for e in entries),
+                        key=lambda v: v.short_name)
+        by_name: Dict[str, VoiceInfo] = {}
+        by_locale: Dict[str, List[VoiceInfo]] = defaultdict(list)
+        for voice in voices:
+            by_name[voice.short_name.lower()] = voice
+            by_locale[voice.locale.lower()].append(voice)
+            by_locale[voice.locale.split("-")[0].lower()].append(voice)
+        # Swapped as a whole, so readers never see a half-built index
+        self._by_name, self._by_locale = by_name, dict(by_locale)
+
+    def get(self, short_name: str) -> Optional[VoiceInfo]:
+        return self._by_name.get(short_name.lower())
+
+    def voices(self, locale: Optional[str] = None, gender: Optional[str] = None) -> List[VoiceInfo]:
+        candidates = self._by_locale.get(locale.lower(), []) if locale else list(self._by_name.values())
+        return [v for v in candidates if not gender or v.gender.lower() == gender.lower()]
+
+    async def refresh(self) -> int:
+        """Reloads the voice list from the service and saves it as the new snapshot. Returns the voice count."""
+        import edge_tts
+        entries = [{k: e[k] for k in ("ShortName", "Locale", "Gender")} for e in await edge_tts.list_voices()]
+        if not entries:
+            raise ValueError("The voice list is empty.")
+        self._index(entries)
+        os.makedirs(os.path.dirname(os.path.abspath(self.snapshot_path)), exist_ok=True)
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.part"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=1, ensure_ascii=False)
+        os.replace(tmp_path, self.snapshot_path)
+        self.loaded_at = time.time()
+        logger.info(f"Voice catalog refreshed: {len(entries)} voices.")
+        return len(entries)
+
+    async def refresh_periodically(self, interval: float):
+        while True:
+            # A fresh snapshot (e.g. written by another worker) is not fetched again
+            await asyncio.sleep(max(0.0, self.loaded_at + interval - time.time()))
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Voice catalog refresh failed (keeping {len(self._by_name)} voices): {e}")
+                self.loaded_at = time.time()
+
+if __name__ == "__main__":
+    catalog = EdgeVoiceCatalog(BUNDLED_SNAPSHOT if "--bundled" in sys.argv else None)
+    asyncio.run(catalog.refresh())
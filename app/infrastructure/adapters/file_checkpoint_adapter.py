@@ -0,0 +1,127 @@
+import hashlib
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+from app.domain.models import JobCheckpoint, ScriptBatch, ScriptSegment
+from app.domain.ports import CheckpointStore
+from app.infrastructure.config.settings import settings
+from app.infrastructure.monitoring.logger import logger
+
+class FileCheckpointAdapter(CheckpointStore):
+    """
+    Stores job checkpoints on local disk:
+
+        {CHECKPOINT_DIR}/{job_id}/job.json          -> JobCheckpoint
+        {CHECKPOINT_DIR}/{job_id}/batches.jsonl     -> one ScriptBatch per line
+        {CHECKPOINT_DIR}/{job_id}/segments/*.mp3    -> synthesized segments (*.ogg for Opus)
+    """
+    def __init__(self, base_dir: Optional[str] = None):
+        self.base_dir = base_dir or settings.CHECKPOINT_DIR
+
+    def _job_dir(self, job_id: str) -> str:
+        return os.path.join(self.base_dir, job_id)
+
+    def save_job(self, checkpoint: JobCheckpoint) -> None:
+        job_dir = self._job_dir(checkpoint.job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        tmp_path = os.path.join(job_dir, "job.json.part")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(checkpoint.model_dump_json())
+        os.replace(tmp_path, os.path.join(job_dir, "job.json"))
+
+    def load_job(self, job_id: str) -> Optional[JobCheckpoint]:
+        path = os.path.join(self._job_dir(job_id), "job.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return JobCheckpoint.model_validate_json(f.read())
+
+    def save_batch(self, job_id: str, batch: ScriptBatch) -> None:
+        job_dir = self._job_dir(job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        with open(os.path.join(job_dir, "batches.jsonl"), "a", encoding="utf-8") as f:
+            f.write(batch.model_dump_json() + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._touch(job_id)
+
+    def load_batches(self, job_id: str) -> List[ScriptBatch]:
+        path = os.path.join(self._job_dir(job_id), "batches.jsonl")
+        if not os.path.exists(path):
+            return []
+        batches = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    batches.append(ScriptBatch.model_validate_json(line))
+                except ValueError:
+                    # A torn final line (crash mid-write) is dropped; earlier batches stay valid.
+                    logger.warning(f"Ignoring corrupt checkpoint batch for job {job_id}")
+                    break
+        return batches
+
+    def segment_path(self, job_id: str, index: int, segment: ScriptSegment, extension: str = "mp3") -> str:
+        segments_dir = os.path.join(self._job_dir(job_id), "segments")
+        os.makedirs(segments_dir, exist_ok=True)
+        # The digest ties the file to the exact voice/text, so an edited script never reuses stale audio.
+        digest = hashlib.sha1(f"{segment.voice}\n{segment.text}".encode("utf-8")).hexdigest()[:12]
+        return os.path.join(segments_dir, f"segment_{index:03d}_{digest}.{extension}")
+
+    def adopt_segments(self, job_id: str, target_job_id: str):
+        source = os.path.join(self._job_dir(job_id), "segments")
+        if not os.path.isdir(source):
+            return
+        target = os.path.join(self._job_dir(target_job_id), "segments")
+        os.makedirs(target, exist_ok=True)
+        for name in os.listdir(source):
+            if name.endswith(".part") or os.path.exists(os.path.join(target, name)):
+                continue
+            try:
+                os.replace(os.path.join(source, name), os.path.join(target, name))
+            except OSError as e:
+                logger.warning(f"Failed to move segment {name} to {target}: {e}")
+
+    def clear(self, job_id: str):
+        path = self._job_dir(job_id)
+        try:
+            if os.path.exists(path):
+                shutil.rmtree(path)
+                logger.debug(f"Cleared checkpoint {path}")
+        except Exception as e:
+            logger.warning(f"Failed to clear checkpoint {path}: {e}")
+
+    def purge_expired(self, max_age_seconds: float) -> int:
+        if not os.path.isdir(self.base_dir):
+            return 0
+        cutoff = time.time() - max_age_seconds
+        purged = 0
+        for job_id in os.listdir(self.base_dir):
+            job_dir = self._job_dir(job_id)
+            try:
+                if os.path.isdir(job_dir) and self._last_activity(job_dir) < cutoff:
+                    shutil.rmtree(job_dir)
+                    purged += 1
+            except Exception as e:
+                logger.warning(f"Failed to purge checkpoint {job_dir}: {e}")
+        if purged:
+            logger.info(f"Purged {purged} expired job checkpoints.")
+        return purged
+
+    def _touch(self, job_id: str):
+        checkpoint = self.load_job(job_id)
+        if checkpoint:
+            checkpoint.updated_at = datetime.now(timezone.utc).isoformat()
+            self.save_job(checkpoint)
+
+    @staticmethod
+    def _last_activity(job_dir: str) -> float:
+        latest = os.path.getmtime(job_dir)
+        for root, _, files in os.walk(job_dir):
+            for name in files:
+                latest = max(latest, os.path.getmtime(os.path.join(root, name)))
+        return latest
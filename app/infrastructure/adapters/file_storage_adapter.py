@@ -1,22 +1,70 @@
+import hashlib
 import os
 import shutil
-from typing import List
+from typing import List, Optional
 from app.domain.ports import StorageProvider
+from app.infrastructure.audio.mp3 import mp3_silence, read_first_frame_header
+from app.infrastructure.audio.ogg_opus import OggOpusJoiner
 from app.infrastructure.monitoring.logger import logger
+from app.infrastructure.monitoring.metrics import metrics
 from app.infrastructure.config.settings import settings
 
+metrics.describe("audio_output_bytes_total", "Bytes of final audio files assembled, by container format.")
+metrics.describe("audio_pause_seconds_total", "Silence spliced between segments of final audio files.")
+
 class FileStorageAdapter(StorageProvider):
+    def __init__(self, shard_levels: Optional[int] = None):
+        self.shard_levels = settings.STORAGE_SHARD_LEVELS if shard_levels is None else shard_levels
+
+    def artifact_path(self, base_dir: str, filename: str) -> str:
+        """
+        Sharded by a hash of the file name: `{base_dir}/3f/a2/{filename}` for two levels,
+        so no directory grows past a few thousand entries. Creates the shard directory.
+        """
+        digest = hashlib.sha1(filename.encode("utf-8")).hexdigest()
+        shard_dir = os.path.join(base_dir, *(digest[2 * i:2 * i + 2] for i in range(self.shard_levels)))
+        os.makedirs(shard_dir, exist_ok=True)
+        return os.path.join(shard_dir, filename)
+
     async def save_file(self, content: bytes, path: str) -> str:
         with open(path, 'wb') as f:
             f.write(content)
         return path
 
-    async def concatenate_files(self, file_paths: List[str], output_path: str) -> str:
+    async def concatenate_files(self, file_paths: List[str], output_path: str, pauses: Optional[List[float]] = None) -> str:
+        """
+        Joins segment files; the output extension picks the format (.ogg: Ogg Opus, else MP3 frames).
+        pauses[i] seconds of silence, in the format of the segment before it, follow file i.
+        """
         logger.info(f"Concatenating {len(file_paths)} files into {output_path}")
+        extension = os.path.splitext(output_path)[1].lower()
+        pauses = pauses or []
+        silence_seconds = 0.0
         with open(output_path, 'wb') as outfile:
-            for file_path in file_paths:
-                with open(file_path, 'rb') as infile:
-                    shutil.copyfileobj(infile, outfile)
+            if extension == ".ogg":
+                # Ogg streams cannot simply be appended: merge their pages into one stream
+                joiner = OggOpusJoiner(outfile)
+                for i, file_path in enumerate(file_paths):
+                    with open(file_path, 'rb') as infile:
+                        joiner.append(infile)
+                    if i < len(pauses) and pauses[i] > 0:
+                        joiner.append_silence(pauses[i])
+                        silence_seconds += pauses[i]
+                joiner.close()
+            else:
+                # MP3 is a sequence of self-contained frames: byte concatenation is a valid stream,
+                # and so is splicing whole silent frames between segments
+                for i, file_path in enumerate(file_paths):
+                    with open(file_path, 'rb') as infile:
+                        header = read_first_frame_header(infile) if i < len(pauses) and pauses[i] > 0 else None
+                        infile.seek(0)
+                        shutil.copyfileobj(infile, outfile)
+                    if header:
+                        outfile.write(mp3_silence(header, pauses[i]))
+                        silence_seconds += pauses[i]
+        metrics.inc("audio_output_bytes_total", os.path.getsize(output_path), format=extension.lstrip(".") or "mp3")
+        if silence_seconds:
+            metrics.inc("audio_pause_seconds_total", silence_seconds)
         return output_path
 
     def create_temp_dir(self, identifier: str) -> str:
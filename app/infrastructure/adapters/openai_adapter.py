@@ -1,36 +1,69 @@
-from typing import List, Dict
-from openai import AsyncOpenAI
+from typing import List, Dict, Optional
+from openai import NOT_GIVEN, AsyncOpenAI, DefaultAsyncHttpxClient
 from app.domain.ports import LLMProvider
+from app.application.job_context import job_context
+from app.infrastructure.resilience.adaptive_limiter import get_limiter
 from app.infrastructure.config.settings import settings
 from app.infrastructure.monitoring.logger import logger
+from app.infrastructure.monitoring.metrics import metrics
+
+metrics.describe("llm_tokens_total", "LLM tokens by kind (prompt, completion, cached = prompt tokens served from the provider's prompt cache) and model.")
 
 class OpenAIAdapter(LLMProvider):
     def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY) if settings.OPENAI_API_KEY else None
+        # One connection pool for the server key and every per-request key
+        self.http_client = DefaultAsyncHttpxClient()
+        self.client = self._client_for(settings.OPENAI_API_KEY) if settings.OPENAI_API_KEY else None
+        self.limiter = get_limiter("openai")
+
+    def _client_for(self, api_key: str) -> AsyncOpenAI:
+        # No SDK retries: each call's timeout is a deadline clamped to the job's stage budget, which
+        # retries would multiply; throttling is handled by the adaptive limiter
+        return AsyncOpenAI(api_key=api_key, base_url=settings.OPENAI_BASE_URL, http_client=self.http_client, max_retries=0)
 
-    async def generate_text(self, messages: List[Dict[str, str]], response_format: str = "json", api_key: str = None, model: str = "gpt-4-turbo-preview") -> str:
+    async def aclose(self):
+        await self.http_client.aclose()
+
+    async def generate_text(self, messages: List[Dict[str, str]], response_format: str = "json", api_key: str = None, model: str = "gpt-4-turbo-preview",
+                            cache_key: Optional[str] = None) -> str:
         format_type = {"type": "json_object"} if response_format == "json" else None
         
         # Use provided key or fallback to default client (which has env key)
         client = self.client
         if api_key:
-            # Instantiate a temp client for this request? 
-            # Or pass api_key to the creation method call? 
-            # The async client is usually instantiated once. 
-            # Creating a new client per request might be overhead but safer for dynamic keys.
-            from openai import AsyncOpenAI
-            client = AsyncOpenAI(api_key=api_key)
+            # Per-request key: a thin client over the shared connection pool
+            client = self._client_for(api_key)
         
         if not client:
             raise ValueError("OpenAI API Key is required. Please set OPENAI_API_KEY in .env or provide X-OpenAI-Key header.")
             
         try:
-            response = await client.chat.completions.create(
-                model=model,
-                messages=messages,
-                response_format=format_type
-            )
+            # Per-call timeout, clamped to the job's remaining stage budget
+            timeout = job_context().call_timeout(settings.LLM_CALL_TIMEOUT_SECONDS)
+            async with self.limiter.acquire() as call:
+                response = await client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    response_format=format_type,
+                    prompt_cache_key=cache_key or NOT_GIVEN,
+                    timeout=timeout
+                )
+                # Latency grows with the tokens generated: the limiter judges it per completion token
+                call.work = response.usage.completion_tokens if response.usage else None
+            self._record_usage(response.usage, model)
             return response.choices[0].message.content
         except Exception as e:
             logger.error(f"OpenAI call failed: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    @staticmethod
+    def _record_usage(usage, model: str):
+        if usage is None:
+            return
+        details = usage.prompt_tokens_details
+        cached = (details.cached_tokens or 0) if details else 0
+        job_context().add_llm_usage(usage.prompt_tokens, usage.completion_tokens, cached)
+        model_name = getattr(model, "value", model)
+        metrics.inc("llm_tokens_total", usage.prompt_tokens, kind="prompt", model=model_name)
+        metrics.inc("llm_tokens_total", usage.completion_tokens, kind="completion", model=model_name)
+        metrics.inc("llm_tokens_total", cached, kind="cached", model=model_name)
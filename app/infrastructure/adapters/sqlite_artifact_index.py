@@ -0,0 +1,174 @@
+"""
+Local artifact index: job id -> final audio and script files.
+
+    python -m app.infrastructure.adapters.sqlite_artifact_index
+
+moves files written by older versions (flat OUTPUT_DIR/SCRIPTS_DIR) into the sharded
+layout and indexes them.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+from app.domain.models import ArtifactRecord
+from app.domain.ports import ArtifactIndex, StorageProvider
+from app.infrastructure.audio.mp3 import mp3_duration_seconds
+from app.infrastructure.audio.ogg_opus import opus_duration_seconds
+from app.infrastructure.config.settings import settings
+from app.infrastructure.monitoring.logger import logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    path TEXT PRIMARY KEY,
+    artifact_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    duration_seconds REAL,
+    cloud_path TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artifacts_by_id ON artifacts (artifact_id, kind, created_at);
+"""
+# Columns added after the first version of the table
+_ADDED_COLUMNS = {"local_only": "INTEGER NOT NULL DEFAULT 0", "last_accessed_at": "REAL"}
+_COLUMNS = "artifact_id, kind, path, bytes, sha256, duration_seconds, cloud_path, local_only, created_at, last_accessed_at"
+# Least recently used first: never-downloaded files count from their creation
+_LAST_USE = "COALESCE(last_accessed_at, created_at)"
+# A download within this many seconds of the last recorded one is not written again
+TOUCH_RESOLUTION_SECONDS = 60
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _duration_seconds(path: str) -> Optional[float]:
+    extension = os.path.splitext(path)[1].lower()
+    try:
+        if extension == ".mp3":
+            return mp3_duration_seconds(path)
+        if extension == ".ogg":
+            return opus_duration_seconds(path)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not measure {path}: {e}")
+    return None
+
+class SQLiteArtifactIndex(ArtifactIndex):
+    """
+    Artifact index in a SQLite file (ARTIFACT_INDEX_PATH). WAL journal, so the workers
+    of a host share it and readers never wait for a writer; one connection per process,
+    serialized by a lock (calls are short: checksums are computed before taking it).
+    """
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or settings.ARTIFACT_INDEX_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        existing = {row[1] for row in self._db.execute("PRAGMA table_info(artifacts)")}
+        for column, definition in _ADDED_COLUMNS.items():
+            if column not in existing:
+                self._db.execute(f"ALTER TABLE artifacts ADD COLUMN {column} {definition}")
+        self._db.execute(f"CREATE INDEX IF NOT EXISTS artifacts_by_last_use ON artifacts ({_LAST_USE})")
+
+    @staticmethod
+    def _record(row) -> ArtifactRecord:
+        return ArtifactRecord(**dict(zip(_COLUMNS.split(", "), row)))
+
+    def record_file(self, artifact_id: str, kind: str, path: str, cloud_path: Optional[str] = None, local_only: bool = False) -> ArtifactRecord:
+        record = ArtifactRecord(
+            artifact_id=artifact_id,
+            kind=kind,
+            path=os.path.abspath(path),
+            bytes=os.path.getsize(path),
+            sha256=_sha256(path),
+            duration_seconds=_duration_seconds(path) if kind == "audio" else None,
+            cloud_path=cloud_path,
+            local_only=local_only,
+            created_at=time.time(),
+        )
+        with self._lock:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO artifacts ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (record.artifact_id, record.kind, record.path, record.bytes, record.sha256,
+                 record.duration_seconds, record.cloud_path, int(record.local_only), record.created_at, None)
+            )
+        return record
+
+    def find(self, artifact_id: str, kind: str) -> Optional[ArtifactRecord]:
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {_COLUMNS} FROM artifacts WHERE artifact_id = ? AND kind = ? ORDER BY created_at DESC LIMIT 1",
+                (artifact_id, kind)
+            ).fetchone()
+        return self._record(row) if row else None
+
+    def list(self, artifact_id: str) -> List[ArtifactRecord]:
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {_COLUMNS} FROM artifacts WHERE artifact_id = ? ORDER BY created_at", (artifact_id,)
+            ).fetchall()
+        return [self._record(row) for row in rows]
+
+    def remove(self, path: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM artifacts WHERE path = ?", (os.path.abspath(path),))
+
+    def touch(self, path: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE artifacts SET last_accessed_at = ? WHERE path = ? AND COALESCE(last_accessed_at, 0) < ?",
+                (now, os.path.abspath(path), now - TOUCH_RESOLUTION_SECONDS)
+            )
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(bytes), 0) FROM artifacts").fetchone()[0]
+
+    def least_recently_used(self, limit: int, accessed_before: Optional[float] = None) -> List[ArtifactRecord]:
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {_COLUMNS} FROM artifacts WHERE {_LAST_USE} < ? ORDER BY {_LAST_USE} LIMIT ?",
+                (accessed_before if accessed_before is not None else float("inf"), limit)
+            ).fetchall()
+        return [self._record(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+def _legacy_artifact_id(filename: str) -> str:
+    # `{job_id}_{kind}.ext` (kind may contain dots, e.g. ScenarioType.CORPORATE), or a batch item's `{item_id}.ext`
+    stem = os.path.splitext(filename)[0]
+    head, _, tail = stem.rpartition("_")
+    return stem if not head or tail.isdigit() else head
+
+def migrate_flat_layout(index: ArtifactIndex, storage: StorageProvider) -> int:
+    """Moves top-level files of OUTPUT_DIR/SCRIPTS_DIR into the sharded layout and indexes them."""
+    moved = 0
+    for base_dir, kind, extensions in ((settings.OUTPUT_DIR, "audio", (".mp3", ".ogg")), (settings.SCRIPTS_DIR, "script", (".json",))):
+        if not os.path.isdir(base_dir):
+            continue
+        for entry in list(os.scandir(base_dir)):
+            if not entry.is_file() or os.path.splitext(entry.name)[1] not in extensions:
+                continue
+            target = storage.artifact_path(base_dir, entry.name)
+            if target != entry.path:
+                os.replace(entry.path, target)
+            index.record_file(_legacy_artifact_id(entry.name), kind, target)
+            moved += 1
+    return moved
+
+if __name__ == "__main__":
+    from app.infrastructure.adapters.file_storage_adapter import FileStorageAdapter
+    index = SQLiteArtifactIndex()
+    logger.info(f"Indexed {migrate_flat_layout(index, FileStorageAdapter())} files from the flat layout.")
+    index.close()
@@ -0,0 +1,120 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+import anyio
+from app.domain.models import SimulationRecord, SimulationFilter
+from app.domain.ports import SimulationRepository
+from app.infrastructure.config.settings import settings
+from app.infrastructure.monitoring.logger import logger
+from app.infrastructure.serialization.script_codec import decode_db_content
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS vanaheim_audio (
+    id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    context TEXT,
+    duration_minutes INTEGER,
+    participants_count INTEGER,
+    script_path TEXT,
+    audio_path TEXT,
+    script_content TEXT,
+    configuration TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS vanaheim_audio_history ON vanaheim_audio (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS vanaheim_audio_model ON vanaheim_audio (json_extract(configuration, '$.model'), created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS vanaheim_audio_scenario ON vanaheim_audio (json_extract(configuration, '$.scenario'), created_at DESC, id DESC);
+"""
+_SUMMARY_COLUMNS = ["id", "created_at", "topic", "context", "duration_minutes", "participants_count", "script_path", "audio_path", "configuration"]
+# Configuration keys that can be filtered on (each has an index above)
+_CONFIGURATION_KEYS = {"model", "scenario"}
+
+class SQLiteSimulationRepository(SimulationRepository):
+    """
+    Simulation records in a local SQLite file (SIMULATION_DB_PATH): the stand-in for the
+    Supabase table when no credentials are configured, and for tests. Same columns and
+    query semantics; configuration is stored as JSON text with expression indexes.
+    """
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or settings.SIMULATION_DB_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    async def save_simulation(self, record: SimulationRecord) -> SimulationRecord:
+        record = record.model_copy(update={
+            "id": record.id or str(uuid.uuid4()),
+            "created_at": record.created_at or datetime.now(timezone.utc).isoformat()
+        })
+        row = record.model_dump()
+        row["configuration"] = json.dumps(record.configuration or {}, ensure_ascii=False)
+        try:
+            await anyio.to_thread.run_sync(self._insert, row)
+            logger.info(f"Saved simulation record to local DB: {record.id}")
+        except sqlite3.Error as e:
+            logger.error(f"Failed to save simulation locally: {e}")
+        return record
+
+    def _insert(self, row: dict):
+        with self._lock:
+            self._db.execute(
+                f"INSERT INTO vanaheim_audio ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})", tuple(row.values())
+            )
+
+    async def get_script_content(self, simulation_id: str) -> Optional[str]:
+        return await anyio.to_thread.run_sync(self._get_script_content, simulation_id)
+
+    def _get_script_content(self, simulation_id: str) -> Optional[str]:
+        return decode_db_content(self._get_column(simulation_id, "script_content"))
+
+    async def get_audio_path(self, simulation_id: str) -> Optional[str]:
+        return await anyio.to_thread.run_sync(self._get_column, simulation_id, "audio_path")
+
+    def _get_column(self, simulation_id: str, column: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute(f"SELECT {column} FROM vanaheim_audio WHERE id = ?", (simulation_id,)).fetchone()
+        return row[0] if row else None
+
+    async def list_simulations(self, filters: SimulationFilter, limit: int, after: Optional[Tuple[str, str]] = None,
+                               include_script: bool = False) -> List[SimulationRecord]:
+        return await anyio.to_thread.run_sync(self._list_simulations, filters, limit, after, include_script)
+
+    def _list_simulations(self, filters: SimulationFilter, limit: int, after: Optional[Tuple[str, str]],
+                          include_script: bool) -> List[SimulationRecord]:
+        columns = _SUMMARY_COLUMNS + ["script_content"] if include_script else _SUMMARY_COLUMNS
+        where, params = [], []
+        if filters.topic:
+            where.append("instr(lower(topic), lower(?)) > 0")
+            params.append(filters.topic)
+        for key, value in filters.configuration_match().items():
+            if key not in _CONFIGURATION_KEYS:
+                raise ValueError(f"Cannot filter on configuration key '{key}'.")
+            where.append(f"json_extract(configuration, '$.{key}') = ?")
+            params.append(value)
+        if after:
+            where.append("(created_at, id) < (?, ?)")
+            params.extend(after)
+        sql = f"SELECT {', '.join(columns)} FROM vanaheim_audio"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        with self._lock:
+            rows = self._db.execute(sql, (*params, limit)).fetchall()
+        records = []
+        for row in rows:
+            data = dict(zip(columns, row))
+            data["configuration"] = json.loads(data["configuration"] or "{}")
+            if include_script:
+                data["script_content"] = decode_db_content(data["script_content"])
+            records.append(SimulationRecord(**data))
+        return records
+
+    def close(self):
+        with self._lock:
+            self._db.close()
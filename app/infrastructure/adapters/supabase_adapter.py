@@ -1,11 +1,25 @@
-from supabase import create_client, Client
+from typing import List, Optional, Tuple
+import anyio
 from app.infrastructure.config.settings import settings
 from app.domain.ports import SimulationRepository
-from app.domain.models import SimulationRecord
+from app.domain.models import SimulationRecord, SimulationFilter
 from app.infrastructure.monitoring.logger import logger
+from app.infrastructure.serialization.script_codec import decode_db_content
+
+# Every column but script_content, which can be large
+SUMMARY_COLUMNS = "id, created_at, topic, context, duration_minutes, participants_count, script_path, audio_path, configuration"
+
+def like_pattern(text: str) -> str:
+    """ILIKE pattern matching `text` anywhere (its own wildcards taken literally)."""
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
 
 class SupabaseAdapter(SimulationRepository):
-    def __init__(self):
+    def __init__(self, client=None):
+        # `client`: a shared Supabase client (see Container); without one, build our own
+        self.client = client
+        if client is not None:
+            return
         try:
             self.url = settings.SUPABASE_URL
             self.key = settings.SUPABASE_KEY
@@ -13,7 +27,8 @@ class SupabaseAdapter(SimulationRepository):
                 logger.warning("Supabase credentials missing. DB save will fail.")
                 self.client = None
             else:
-                self.client: Client = create_client(self.url, self.key)
+                from supabase import create_client
+                self.client = create_client(self.url, self.key)
         except Exception as e:
             logger.error(f"Failed to initialize Supabase client: {e}")
             self.client = None
@@ -35,4 +50,51 @@ class SupabaseAdapter(SimulationRepository):
         except Exception as e:
             logger.error(f"Failed to save simulation to Supabase: {e}")
             # We enforce resilience: don't crash the main response if logging fails
-            return record
\ No newline at end of file
+            return record
+
+    async def get_script_content(self, simulation_id: str) -> Optional[str]:
+        # The client is synchronous: the lookup (and decompressing a large script) runs off the event loop
+        return await anyio.to_thread.run_sync(self._get_script_content, simulation_id)
+
+    async def get_audio_path(self, simulation_id: str) -> Optional[str]:
+        return await anyio.to_thread.run_sync(self._get_column, simulation_id, "audio_path")
+
+    def _get_script_content(self, simulation_id: str) -> Optional[str]:
+        return decode_db_content(self._get_column(simulation_id, "script_content"))
+
+    def _get_column(self, simulation_id: str, column: str) -> Optional[str]:
+        if not self.client:
+            return None
+        try:
+            response = self.client.table("vanaheim_audio").select(column).eq("id", simulation_id).limit(1).execute()
+            return response.data[0].get(column) if response.data else None
+        except Exception as e:
+            logger.error(f"Failed to load {column} of simulation {simulation_id} from Supabase: {e}")
+            return None
+
+    async def list_simulations(self, filters: SimulationFilter, limit: int, after: Optional[Tuple[str, str]] = None,
+                               include_script: bool = False) -> List[SimulationRecord]:
+        if not self.client:
+            return []
+        try:
+            return await anyio.to_thread.run_sync(self._list_simulations, filters, limit, after, include_script)
+        except Exception as e:
+            logger.error(f"Failed to list simulations from Supabase: {e}")
+            raise
+
+    def _list_simulations(self, filters: SimulationFilter, limit: int, after: Optional[Tuple[str, str]], include_script: bool) -> List[SimulationRecord]:
+        # Served by the indexes in schema.sql: (created_at, id) btree, configuration GIN, topic trigram GIN
+        columns = f"{SUMMARY_COLUMNS}, script_content" if include_script else SUMMARY_COLUMNS
+        query = self.client.table("vanaheim_audio").select(columns)
+        if filters.topic:
+            query = query.ilike("topic", like_pattern(filters.topic))
+        if filters.configuration_match():
+            query = query.contains("configuration", filters.configuration_match())
+        if after:
+            created_at, simulation_id = after
+            query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{simulation_id}")')
+        response = query.order("created_at", desc=True).order("id", desc=True).limit(limit).execute()
+        records = [SimulationRecord(**row) for row in response.data]
+        for record in records:
+            record.script_content = decode_db_content(record.script_content)
+        return records
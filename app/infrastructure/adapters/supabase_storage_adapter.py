@@ -1,11 +1,20 @@
-from app.domain.ports import StorageProvider
+from typing import Dict, List, Optional
+import anyio
+from app.domain.ports import CloudObjectChecker, SignedUrlProvider, StorageProvider
 from app.infrastructure.config.settings import settings
 from app.infrastructure.monitoring.logger import logger
 import os
 
-class SupabaseStorageAdapter(StorageProvider):
-    def __init__(self, bucket_name: str = "vanaheim-bucket"):
+# Content types by extension, so clients downloading from the bucket get a playable file
+CONTENT_TYPES = {".mp3": "audio/mpeg", ".ogg": "audio/ogg", ".zip": "application/zip", ".json": "application/json"}
+
+class SupabaseStorageAdapter(StorageProvider, SignedUrlProvider, CloudObjectChecker):
+    def __init__(self, bucket_name: str = "vanaheim-bucket", client=None):
         self.bucket_name = bucket_name
+        # `client`: a shared Supabase client (see Container); without one, build our own
+        self.client = client
+        if client is not None:
+            return
         try:
             from supabase import create_client
             self.url = settings.SUPABASE_URL
@@ -37,20 +46,38 @@ class SupabaseStorageAdapter(StorageProvider):
             res = self.client.storage.from_(self.bucket_name).upload(
                 path=path,
                 file=content,
-                file_options={"upsert": "true"}
+                file_options={
+                    "upsert": "true",
+                    "content-type": CONTENT_TYPES.get(os.path.splitext(path)[1].lower(), "application/octet-stream")
+                }
             )
             
-            # Generate Signed URL (Valid for 1 hour)
-            # Strategy: We don't save the Signed URL in DB (it expires).
-            # We save the 'path' in DB, and generate the URL on demand when requested.
-            # But the Port says 'save_file' returns str.
-            # For V1, we return the path reference, NOT the URL.
+            # We don't save a Signed URL in DB (it expires): we return the path reference,
+            # and URLs are generated on demand (see SignedUrlService) when a download needs one.
             return path
         except Exception as e:
             logger.error(f"Failed to upload to Supabase: {e}")
             return ""
 
-    async def concatenate_files(self, file_paths: list[str], output_path: str) -> str:
+    async def create_signed_urls(self, paths: List[str], expires_in: int) -> Dict[str, str]:
+        """One storage round-trip for all paths (the SDK call is blocking: run it off the event loop)."""
+        if not self.client or not paths:
+            return {}
+        try:
+            bucket = self.client.storage.from_(self.bucket_name)
+            signed = await anyio.to_thread.run_sync(bucket.create_signed_urls, paths, expires_in)
+        except Exception as e:
+            logger.error(f"Failed to sign {len(paths)} storage paths: {e}")
+            return {}
+        return {item["path"]: item["signedURL"] for item in signed if item.get("signedURL") and not item.get("error")}
+
+    async def exists(self, path: str) -> bool:
+        if not self.client:
+            return False
+        # Errors propagate: "could not check" must not be read as "no copy" or "has a copy"
+        return await anyio.to_thread.run_sync(self.client.storage.from_(self.bucket_name).exists, path)
+
+    async def concatenate_files(self, file_paths: list[str], output_path: str, pauses: Optional[list[float]] = None) -> str:
         # Complex in Cloud. For V1, we might do this locally then upload result.
         logger.warning("Cloud concatenation not implemented. Use local processing.")
         return ""
@@ -0,0 +1,17 @@
+import hmac
+from typing import Optional
+from fastapi import Header, HTTPException
+from app.infrastructure.config.settings import settings
+
+def admin_token_matches(token: Optional[str]) -> bool:
+    """True if admin endpoints are enabled (ADMIN_TOKEN) and `token` is that token (constant-time compare)."""
+    if not settings.ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode("utf-8"), settings.ADMIN_TOKEN.encode("utf-8"))
+
+def require_admin(x_admin_token: Optional[str] = Header(None, alias="X-Vanaheim-Admin-Token")):
+    """FastAPI dependency for admin endpoints: 404 unless ADMIN_TOKEN is configured, 403 on a wrong token."""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not admin_token_matches(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
@@ -0,0 +1,129 @@
+from contextlib import nullcontext
+from typing import AsyncContextManager, Awaitable, Callable, Optional
+import anyio
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from app.application.job_context import JobContext, bind_job, unbind_job
+from app.infrastructure.api.lifecycle import lifecycle
+from app.infrastructure.api.progress import progress
+from app.infrastructure.monitoring.logger import logger
+from app.infrastructure.monitoring.memory import memory
+from app.infrastructure.monitoring.metrics import metrics
+
+metrics.describe("jobs_cancelled_total", "Jobs cancelled because the client disconnected.")
+metrics.describe("upstream_calls_saved_total", "Estimated upstream (LLM/TTS) calls avoided by cancelling orphaned jobs.")
+
+# Non-standard "Client Closed Request" status; nobody reads it, but it shows up in access logs.
+CLIENT_CLOSED_REQUEST = 499
+
+async def _wait_for_disconnect(request: Request):
+    # The body has already been read by FastAPI, so the next ASGI message is the
+    # disconnect. Awaiting it (rather than polling) costs nothing and reacts immediately.
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+async def _in_slot(job: JobContext, slot: Optional[AsyncContextManager], work: Callable[[], Awaitable[Response]]) -> Response:
+    async with (slot or nullcontext()):
+        job.start()
+        return await work()
+
+def _drained_response(job: JobContext) -> Response:
+    # The checkpoint survives the interruption: the client resumes the job on another worker
+    return JSONResponse(
+        status_code=503,
+        content={
+            "status": "error",
+            "message": f"Service restarted while job {job.job_id} was running; resume it with POST /api/v1/jobs/{job.job_id}/resume.",
+            "type": "Draining"
+        },
+        headers={"Retry-After": "5", "X-Vanaheim-Job-Id": job.job_id}
+    )
+
+async def run_job(request: Request, job: JobContext, work: Callable[[], Awaitable[Response]], finish_in_background: bool = False,
+                  slot: Optional[AsyncContextManager] = None) -> Response:
+    """
+    Runs a generation job bound to `job`, cancelling it if the client disconnects.
+
+    The job and a disconnect watcher share one task group: whichever finishes first
+    cancels the other, so LLM/TTS calls stop at their next await point and the
+    pipeline's `finally` blocks clean up temp files. Checkpoints are kept, so a
+    cancelled job can still be resumed. With `finish_in_background` the watcher is
+    not started and the job runs to completion even if nobody is listening.
+    `slot` (a scheduler slot) is acquired inside the cancellable region, so a client
+    that gives up while queued leaves the queue immediately. The job is registered
+    with the worker lifecycle, whose drain may interrupt it at shutdown (503),
+    and publishes its progress until it ends (see GET /jobs/{job_id}/events); its memory
+    peak is recorded when it ends. A job id already in flight on this worker is refused (409).
+    """
+    lifecycle.ensure_not_running(job.job_id)
+    token = bind_job(job)
+    progress.attach(job)
+    outcome = "failed"
+    try:
+        response = await _run_bound(request, job, work, finish_in_background, slot)
+        outcome = _outcome(job, response)
+        return response
+    finally:
+        memory.job_finished(job)
+        progress.finish(job, outcome)
+        unbind_job(token)
+
+def _outcome(job: JobContext, response: Response) -> str:
+    if job.drained:
+        return "drained"
+    if job.cancelled:
+        return "cancelled"
+    return "failed" if response.status_code >= 400 else "done"
+
+async def _run_bound(request: Request, job: JobContext, work: Callable[[], Awaitable[Response]], finish_in_background: bool,
+                     slot: Optional[AsyncContextManager]) -> Response:
+    if finish_in_background:
+        with anyio.CancelScope() as scope:
+            lifecycle.register(job, scope)
+            try:
+                return await _in_slot(job, slot, work)
+            finally:
+                lifecycle.unregister(job)
+        return _drained_response(job)
+
+    outcome = {}
+    try:
+        async with anyio.create_task_group() as tg:
+            lifecycle.register(job, tg.cancel_scope)
+
+            async def _run():
+                try:
+                    outcome["response"] = await _in_slot(job, slot, work)
+                except Exception as e:
+                    # Re-raised below, outside the group, so callers never see an ExceptionGroup
+                    outcome["error"] = e
+                tg.cancel_scope.cancel()
+
+            async def _watch():
+                await _wait_for_disconnect(request)
+                job.cancelled = True
+                tg.cancel_scope.cancel()
+
+            tg.start_soon(_run)
+            tg.start_soon(_watch)
+    finally:
+        lifecycle.unregister(job)
+
+    if "error" in outcome:
+        raise outcome["error"]
+    if "response" in outcome:
+        return outcome["response"]
+    if job.drained:
+        return _drained_response(job)
+
+    saved_llm, saved_tts = job.llm_calls_remaining, job.tts_calls_remaining
+    metrics.inc("jobs_cancelled_total", kind=job.kind, stage=job.stage)
+    metrics.inc("upstream_calls_saved_total", saved_llm, provider="openai")
+    metrics.inc("upstream_calls_saved_total", saved_tts, provider="edge_tts")
+    logger.warning(
+        f"Client disconnected: cancelled {job.kind} job {job.job_id} during '{job.stage}' "
+        f"(~{saved_llm} LLM and ~{saved_tts} TTS calls saved)."
+    )
+    return Response(status_code=CLIENT_CLOSED_REQUEST)
@@ -0,0 +1,147 @@
+"""
+Conditional and ranged file responses for generated audio.
+
+Starlette's FileResponse (0.36) ignores Range and If-None-Match, so downloads are
+served here: strong ETags, 304 on If-None-Match, single byte ranges (206/416,
+honouring If-Range), and HEAD. The body itself is, in order of preference,
+handed to the fronting proxy (X-Accel-Redirect / X-Sendfile), sent by the
+server with the ASGI `pathsend` extension, or read with positioned reads in
+large blocks off the event loop.
+"""
+import os
+import re
+from email.utils import formatdate
+from typing import Optional, Tuple
+from urllib.parse import quote
+import anyio
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+from app.infrastructure.config.settings import settings
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def strong_etag(stat_result: os.stat_result) -> str:
+    # Artifacts are written once (to a temp name, then renamed), so inode, size and
+    # mtime identify their bytes exactly: a strong validator without hashing the file.
+    return f'"{stat_result.st_ino:x}-{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+def etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match comparison (weak, per RFC 9110): W/ prefixes are ignored."""
+    if header.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in header.split(","))
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    The (start, end) inclusive byte range of a single-range header; None if the header
+    should be ignored (malformed or multi-range: the full file is sent instead).
+    Raises ValueError if the range cannot be satisfied.
+    """
+    match = _RANGE.match(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("Empty suffix range.")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable.")
+    return start, end
+
+class FileRangeResponse(Response):
+    """Sends bytes [start, end] of a file without loading it into memory."""
+    chunk_size = 1024 * 1024
+
+    def __init__(self, path: str, start: int, end: int, status_code: int, headers: dict):
+        super().__init__(status_code=status_code, headers=headers)
+        self.path = path
+        self.start = start
+        self.end = end
+        self.full_file = status_code == 200
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        if self.full_file and "http.response.pathsend" in scope.get("extensions", {}):
+            # The server sends the file itself (sendfile where available)
+            await send({"type": "http.response.pathsend", "path": self.path})
+            return
+        fd = await anyio.to_thread.run_sync(os.open, self.path, os.O_RDONLY)
+        try:
+            position, remaining = self.start, self.end - self.start + 1
+            while remaining > 0:
+                chunk = await anyio.to_thread.run_sync(os.pread, fd, min(self.chunk_size, remaining), position)
+                if not chunk:
+                    # The file shrank under us: end the body, the client sees a short read
+                    break
+                position += len(chunk)
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+                if remaining == 0:
+                    return
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            os.close(fd)
+
+def _offload_headers(path: str) -> Optional[dict]:
+    if settings.DOWNLOAD_OFFLOAD == "x-accel":
+        # nginx: an `internal` location whose alias is OUTPUT_DIR
+        relative = os.path.relpath(path, settings.OUTPUT_DIR).replace(os.sep, "/")
+        return {"X-Accel-Redirect": f"{settings.DOWNLOAD_OFFLOAD_PREFIX.rstrip('/')}/{quote(relative)}"}
+    if settings.DOWNLOAD_OFFLOAD == "x-sendfile":
+        return {"X-Sendfile": path}
+    return None
+
+def content_disposition(filename: str) -> str:
+    """Attachment header value; RFC 5987 encoding keeps quotes and CR/LF of user-supplied names out of the framing."""
+    return f"attachment; filename*=utf-8''{quote(filename)}"
+
+def file_download(request: Request, path: str, media_type: str, filename: str, extra_headers: Optional[dict] = None) -> Response:
+    """The response for a GET/HEAD of `path`: 200, 206, 304 or 416, or a proxy offload."""
+    stat_result = os.stat(path)
+    size = stat_result.st_size
+    etag = strong_etag(stat_result)
+    headers = {
+        **(extra_headers or {}),
+        "ETag": etag,
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+        "Cache-Control": f"private, max-age={settings.DOWNLOAD_CACHE_MAX_AGE_SECONDS}",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    headers["Content-Disposition"] = content_disposition(filename)
+    offload = _offload_headers(path)
+    if offload:
+        # The proxy serves the body (and handles Range itself)
+        return Response(status_code=200, headers={**headers, **offload}, media_type=media_type)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    headers["Content-Type"] = media_type
+    if byte_range is None:
+        return FileRangeResponse(path, 0, size - 1, 200, {**headers, "Content-Length": str(size)})
+    start, end = byte_range
+    return FileRangeResponse(path, start, end, 206, {
+        **headers,
+        "Content-Length": str(end - start + 1),
+        "Content-Range": f"bytes {start}-{end}/{size}",
+    })
@@ -0,0 +1,113 @@
+import time
+from typing import Dict, List, Tuple
+import anyio
+from fastapi import HTTPException
+from app.application.job_context import JobContext
+from app.infrastructure.monitoring.logger import logger
+from app.infrastructure.monitoring.metrics import metrics
+
+metrics.describe("jobs_in_flight", "Generation jobs running in this worker.")
+metrics.describe("jobs_drained_total", "Jobs in flight when the worker started draining, by outcome.")
+
+# Stages that are writing finished results (cloud upload, DB record): worth a short extra wait
+WRITE_STAGES = ("upload", "persist")
+
+class Lifecycle:
+    """
+    Serving state of this worker process.
+
+    Tracks the generation jobs in flight (with the cancel scope that stops each one)
+    and implements the graceful drain: stop admitting jobs, wait for the running ones,
+    then cancel what is still generating (its checkpoint survives, so the client can
+    resume it on another worker) while jobs already writing results get a grace period.
+    """
+    def __init__(self):
+        self.draining = False
+        self.drain_started_at = None
+        self._jobs: Dict[str, Tuple[JobContext, anyio.CancelScope]] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._jobs)
+
+    def jobs(self) -> List[JobContext]:
+        return [job for job, _ in self._jobs.values()]
+
+    def ensure_not_running(self, job_id: str):
+        """Raises 409 if `job_id` is already in flight here: two runs would share (and clear) one checkpoint."""
+        if job_id in self._jobs:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Job {job_id} is already running; wait for it or follow GET /api/v1/jobs/{job_id}/events.",
+                headers={"X-Vanaheim-Job-Id": job_id}
+            )
+
+    def register(self, job: JobContext, scope: anyio.CancelScope):
+        self._jobs[job.job_id] = (job, scope)
+        metrics.set("jobs_in_flight", len(self._jobs))
+        if self.draining:
+            # Admitted just before the drain started: it still counts, but will be cut at the deadline
+            logger.warning(f"Job {job.job_id} started while draining.")
+
+    def unregister(self, job: JobContext):
+        self._jobs.pop(job.job_id, None)
+        metrics.set("jobs_in_flight", len(self._jobs))
+        if self.draining:
+            metrics.inc("jobs_drained_total", outcome="checkpointed" if job.drained else "finished")
+
+    def ensure_accepting(self):
+        """Raises 503 while draining, so load balancers and clients retry on another worker."""
+        if self.draining:
+            raise HTTPException(
+                status_code=503,
+                detail="Service is restarting; retry on another instance.",
+                headers={"Retry-After": "5", "Connection": "close"}
+            )
+
+    def reset(self):
+        """Accepting again: a (re)started app must not inherit the drain of a previous run in this process."""
+        self.draining = False
+        self.drain_started_at = None
+
+    def begin_drain(self):
+        if not self.draining:
+            self.draining = True
+            self.drain_started_at = time.monotonic()
+            logger.warning(f"Draining: no new jobs accepted, {self.in_flight} in flight.")
+
+    async def _wait_idle(self, timeout: float) -> bool:
+        with anyio.move_on_after(max(0.0, timeout)):
+            while self._jobs:
+                await anyio.sleep(0.1)
+        return not self._jobs
+
+    def _interrupt(self, write_stages_too: bool):
+        for job, scope in list(self._jobs.values()):
+            if write_stages_too or job.stage not in WRITE_STAGES:
+                logger.warning(f"Drain deadline: interrupting {job.kind} job {job.job_id} in stage '{job.stage}'.")
+                job.drained = True
+                scope.cancel()
+
+    async def drain(self, timeout: float, flush_timeout: float):
+        """Runs the graceful drain; returns once no job is in flight (or every job was interrupted)."""
+        self.begin_drain()
+        if await self._wait_idle(timeout):
+            return
+        self._interrupt(write_stages_too=False)
+        if await self._wait_idle(flush_timeout):
+            return
+        self._interrupt(write_stages_too=True)
+        await self._wait_idle(5)
+
+    def snapshot(self) -> dict:
+        return {
+            "status": "draining" if self.draining else "ready",
+            "in_flight_jobs": self.in_flight,
+            "draining_for_seconds": round(time.monotonic() - self.drain_started_at, 1) if self.draining else None,
+        }
+
+lifecycle = Lifecycle()
+
+def accepting_jobs():
+    """FastAPI dependency for job endpoints: 503 while the worker drains."""
+    lifecycle.ensure_accepting()
@@ -1,13 +1,20 @@
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
+import asyncio
 import os
+import anyio
 from fastapi.middleware.cors import CORSMiddleware
 from app.infrastructure.api.v1.router import router as api_router
+from app.infrastructure.api.admin import admin_token_matches
+from app.infrastructure.api.lifecycle import lifecycle
+from app.infrastructure.container import Container
+from app.infrastructure.maintenance.janitor import run_periodically, sweep_orphan_temp_dirs
 from app.infrastructure.config.settings import settings
 from app.infrastructure.monitoring.logger import logger
+from app.infrastructure.monitoring.profiler import profiler
 from fastapi import Request
 from fastapi.responses import JSONResponse
-from app.domain.exceptions import VanaheimError, ResourceNotFoundError, ConfigurationError
+from app.domain.exceptions import VanaheimError, ResourceNotFoundError, ConfigurationError, InvalidVoiceError
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -17,9 +24,31 @@ async def lifespan(app: FastAPI):
     os.makedirs(settings.SCRIPTS_DIR, exist_ok=True)
     os.makedirs(settings.OUTPUT_DIR, exist_ok=True)
     os.makedirs(settings.TEMP_DIR, exist_ok=True)
+    os.makedirs(settings.CHECKPOINT_DIR, exist_ok=True)
+    lifecycle.reset()
+
+    # Adapters are built on first use; the container owns (and closes) their clients
+    container = Container()
+    app.state.container = container
+
+    # Retention: drop checkpoints of jobs nobody resumed in time (again on every janitor pass)
+    await anyio.to_thread.run_sync(container.checkpoint_store.purge_expired, settings.CHECKPOINT_RETENTION_HOURS * 3600)
+    # Leftovers of crashed jobs go now; artifact age/quota limits are enforced periodically
+    await anyio.to_thread.run_sync(sweep_orphan_temp_dirs)
+    janitor_task = None
+    if settings.JANITOR_INTERVAL_SECONDS > 0:
+        janitor_task = asyncio.create_task(run_periodically(lambda: container.janitor, settings.JANITOR_INTERVAL_SECONDS))
+    voices_task = None
+    if settings.VOICE_CATALOG_REFRESH_HOURS > 0:
+        voices_task = asyncio.create_task(container.voice_catalog.refresh_periodically(settings.VOICE_CATALOG_REFRESH_HOURS * 3600))
     yield
-    # Shutdown logic if needed
     logger.info("Vanaheim Service Shutting Down...")
+    for task in (janitor_task, voices_task):
+        if task:
+            task.cancel()
+    # No-op under the production runner, which drains before the server stops
+    await lifecycle.drain(settings.DRAIN_TIMEOUT_SECONDS, settings.DRAIN_FLUSH_SECONDS)
+    await container.aclose()
 
 # Swagger / OpenAPI Metadata
 tags_metadata = [
@@ -79,6 +108,14 @@ async def resource_not_found_handler(request: Request, exc: ResourceNotFoundErro
         content={"status": "error", "message": exc.message, "type": "NotFound"},
     )
 
+@app.exception_handler(InvalidVoiceError)
+async def invalid_voice_handler(request: Request, exc: InvalidVoiceError):
+    logger.warning(f"Invalid Voice: {exc.message}")
+    return JSONResponse(
+        status_code=422,
+        content={"status": "error", "message": exc.message, "type": "InvalidVoice"},
+    )
+
 @app.exception_handler(ConfigurationError)
 async def configuration_error_handler(request: Request, exc: ConfigurationError):
     logger.critical(f"Configuration Error: {exc.message}")
@@ -109,13 +146,24 @@ class ObservabilityMiddleware(BaseHTTPMiddleware):
         
         # Inject Request ID
         request.state.request_id = request_id
-        response = await call_next(request)
+        # Opt-in profiling: admins ask for it per request, or arm it for the next matching requests
+        profile = None
+        requested = request.headers.get("X-Vanaheim-Profile", "").lower() in ("1", "true")
+        if profiler.wanted(request.url.path, requested and admin_token_matches(request.headers.get("X-Vanaheim-Admin-Token"))):
+            profile = profiler.begin(request_id, request.method, request.url.path)
+        try:
+            response = await call_next(request)
+        finally:
+            if profile:
+                await profiler.end(profile)
         
         process_time = time.time() - start_time
         
         # Add Headers
         response.headers["X-Request-ID"] = request_id
         response.headers["X-Process-Time"] = str(process_time)
+        if profile:
+            response.headers["X-Vanaheim-Profile-Id"] = request_id
         
         return response
 
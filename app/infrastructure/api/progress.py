@@ -0,0 +1,133 @@
+import itertools
+import json
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+import anyio
+from fastapi import HTTPException
+from app.application.job_context import JobContext
+from app.infrastructure.config.settings import settings
+from app.infrastructure.monitoring.metrics import metrics
+
+metrics.describe("progress_subscribers", "Clients following the progress of a job.")
+metrics.describe("progress_events_dropped_total", "Progress events dropped because a subscriber read too slowly.")
+
+# The final state of this many finished jobs stays available to clients that connect late
+FINISHED_JOBS_KEPT = 256
+
+@dataclass(frozen=True)
+class ProgressEvent:
+    id: int
+    event: str
+    data: Dict[str, Any]
+
+    def to_sse(self) -> str:
+        return f"id: {self.id}\nevent: {self.event}\ndata: {json.dumps(self.data, ensure_ascii=False)}\n\n"
+
+class Subscription:
+    """
+    One client following a job: a bounded buffer that drops its oldest events when the
+    client falls behind, so publishing never waits and a slow reader holds O(buffer) memory.
+    """
+    def __init__(self, events: List[ProgressEvent], size: int):
+        self._events: Deque[ProgressEvent] = deque(events, maxlen=max(size, len(events)))
+        self._wakeup = anyio.Event()
+        self.dropped = 0
+        self.closed = False
+
+    def push(self, event: ProgressEvent):
+        if len(self._events) == self._events.maxlen:
+            self.dropped += 1
+            metrics.inc("progress_events_dropped_total")
+        self._events.append(event)
+        self._wakeup.set()
+
+    def close(self):
+        self.closed = True
+        self._wakeup.set()
+
+    async def events(self, heartbeat: float) -> AsyncIterator[Optional[ProgressEvent]]:
+        """Buffered events until the job ends; None after `heartbeat` seconds without any."""
+        while True:
+            while self._events:
+                yield self._events.popleft()
+            if self.closed:
+                return
+            with anyio.move_on_after(heartbeat) as scope:
+                await self._wakeup.wait()
+            self._wakeup = anyio.Event()
+            if scope.cancelled_caught:
+                yield None
+
+@dataclass
+class _Channel:
+    # Latest event of each kind: what a new subscriber gets first
+    state: Dict[str, ProgressEvent] = field(default_factory=dict)
+    subscribers: List[Subscription] = field(default_factory=list)
+
+    def snapshot(self) -> List[ProgressEvent]:
+        return sorted(self.state.values(), key=lambda e: e.id)
+
+class ProgressBroker:
+    """
+    In-process pub/sub of job progress (stage changes, script words, segments, upload).
+
+    Jobs publish through their JobContext while run_job follows them; every subscriber gets
+    the job's current state, then live events, then a final `end` event with the outcome.
+    """
+    def __init__(self):
+        self._ids = itertools.count(1)
+        self._running: Dict[str, _Channel] = {}
+        self._finished: "OrderedDict[str, List[ProgressEvent]]" = OrderedDict()
+
+    def attach(self, job: JobContext):
+        channel = self._running.setdefault(job.job_id, _Channel())
+        self._finished.pop(job.job_id, None)
+        job.on_progress = lambda event, data: self._publish(channel, event, data)
+        job.report("stage", stage=job.stage)
+
+    def finish(self, job: JobContext, outcome: str):
+        job.on_progress = None
+        channel = self._running.pop(job.job_id, None)
+        if channel is None:
+            return
+        self._publish(channel, "end", {"outcome": outcome})
+        for subscriber in channel.subscribers:
+            subscriber.close()
+        self._finished[job.job_id] = channel.snapshot()
+        while len(self._finished) > FINISHED_JOBS_KEPT:
+            self._finished.popitem(last=False)
+
+    def _publish(self, channel: _Channel, event: str, data: Dict[str, Any]):
+        message = ProgressEvent(next(self._ids), event, data)
+        channel.state[event] = message
+        for subscriber in channel.subscribers:
+            subscriber.push(message)
+
+    def subscribe(self, job_id: str) -> Subscription:
+        """A subscription to a running (or recently finished) job; 404 if unknown, 429 if it has too many."""
+        channel = self._running.get(job_id)
+        if channel is None:
+            if job_id not in self._finished:
+                raise HTTPException(status_code=404, detail=f"Job {job_id} is not running on this worker.")
+            subscription = Subscription(self._finished[job_id], settings.PROGRESS_BUFFER_EVENTS)
+            subscription.close()
+            return subscription
+        if len(channel.subscribers) >= settings.PROGRESS_MAX_SUBSCRIBERS:
+            raise HTTPException(status_code=429, detail=f"Job {job_id} already has {len(channel.subscribers)} subscribers.")
+        subscription = Subscription(channel.snapshot(), settings.PROGRESS_BUFFER_EVENTS)
+        channel.subscribers.append(subscription)
+        metrics.set("progress_subscribers", self.subscriber_count)
+        return subscription
+
+    def unsubscribe(self, job_id: str, subscription: Subscription):
+        channel = self._running.get(job_id)
+        if channel and subscription in channel.subscribers:
+            channel.subscribers.remove(subscription)
+        metrics.set("progress_subscribers", self.subscriber_count)
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(channel.subscribers) for channel in self._running.values())
+
+progress = ProgressBroker()
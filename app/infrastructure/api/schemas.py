@@ -1,8 +1,22 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from app.domain.models import SimulationRecord
 
 class GenerationResponse(BaseModel):
     job_id: str
     status: str
     message: str
     output_file: Optional[str] = None
+
+class SimulationPage(BaseModel):
+    items: List[SimulationRecord]
+    next_cursor: Optional[str] = Field(None, description="Pass as `cursor` for the next (older) page; absent on the last page.")
+
+class MemoryTracingRequest(BaseModel):
+    enabled: bool
+    frames: int = Field(1, ge=1, le=32, description="Stack frames kept per allocation (more frames: costlier, but shows callers).")
+    top_sites: int = Field(10, ge=1, le=100, description="Allocation sites reported per stage.")
+
+class ProfilingArmRequest(BaseModel):
+    requests: int = Field(1, ge=0, le=100, description="Profile this many of the next matching requests (0 disarms).")
+    path_prefix: str = Field("/api/v1/", description="Only requests whose path starts with this prefix.")
@@ -0,0 +1,172 @@
+"""
+Production runner: `python -m app.infrastructure.api.server`.
+
+Supervises N uvicorn workers (WORKERS, or sized to the CPU cores and memory of the
+container) sharing one listening socket, with uvloop/httptools when installed.
+On SIGTERM every worker drains: readiness turns 503, new jobs are refused, in-flight
+jobs get DRAIN_TIMEOUT_SECONDS to finish (then they are interrupted with their
+checkpoints kept) and pending uploads/DB writes DRAIN_FLUSH_SECONDS to complete.
+"""
+import asyncio
+import importlib.util
+import math
+import multiprocessing
+import os
+import signal
+import time
+from typing import List, Optional
+import uvicorn
+from app.infrastructure.api.lifecycle import lifecycle
+from app.infrastructure.config.settings import settings
+from app.infrastructure.monitoring.logger import logger
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn server that drains generation jobs before it stops serving."""
+    def __init__(self, config: uvicorn.Config):
+        super().__init__(config)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._draining = False
+
+    async def serve(self, sockets=None):
+        self._loop = asyncio.get_running_loop()
+        await super().serve(sockets=sockets)
+
+    def handle_exit(self, sig, frame):
+        if self._draining or self._loop is None:
+            # Second signal (or not serving yet): uvicorn's own shutdown, forced on a second SIGINT
+            return super().handle_exit(sig, frame)
+        self._draining = True
+        self._loop.call_soon_threadsafe(lambda: asyncio.ensure_future(self._drain()))
+
+    async def _drain(self):
+        try:
+            await lifecycle.drain(settings.DRAIN_TIMEOUT_SECONDS, settings.DRAIN_FLUSH_SECONDS)
+        finally:
+            self.should_exit = True
+
+def _cpu_limit() -> float:
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    try:
+        # cgroup v2 quota, e.g. "200000 100000" for 2 CPUs (docker --cpus=2)
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, int(quota) / int(period))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+def _memory_limit_bytes() -> Optional[int]:
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+            if value != "max" and int(value) < 1 << 60:
+                return int(value)
+        except (OSError, ValueError):
+            continue
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+def worker_count() -> int:
+    """WORKERS if set, else one worker per CPU, capped by WORKER_MEMORY_MB per worker."""
+    if settings.WORKERS > 0:
+        return settings.WORKERS
+    workers = max(1, math.floor(_cpu_limit()))
+    memory = _memory_limit_bytes()
+    if memory:
+        workers = min(workers, max(1, memory // (settings.WORKER_MEMORY_MB * 1024 * 1024)))
+    return workers
+
+def build_config(workers: int) -> uvicorn.Config:
+    return uvicorn.Config(
+        "app.main:app",
+        host=settings.HOST,
+        port=settings.PORT,
+        workers=workers,
+        loop=settings.SERVER_LOOP,
+        http=settings.SERVER_HTTP,
+        # Backstop once the drain is over (e.g. clients still downloading results)
+        timeout_graceful_shutdown=math.ceil(settings.DRAIN_FLUSH_SECONDS),
+        proxy_headers=True,
+    )
+
+def _run_worker(config: uvicorn.Config, sockets: list):
+    config.configure_logging()
+    DrainingServer(config).run(sockets=sockets)
+
+class Supervisor:
+    """
+    Keeps `workers` processes serving one socket: restarts crashed workers and, on
+    SIGTERM, forwards it and waits for every worker to drain (killing stragglers
+    after the drain deadline plus a margin).
+    """
+    def __init__(self, config: uvicorn.Config, workers: int):
+        self.config = config
+        self.workers = workers
+        self.context = multiprocessing.get_context("spawn")
+        self.processes: List[multiprocessing.Process] = []
+        self.stopping_since: Optional[float] = None
+
+    def _spawn(self, sockets: list) -> multiprocessing.Process:
+        process = self.context.Process(target=_run_worker, kwargs={"config": self.config, "sockets": sockets})
+        process.start()
+        return process
+
+    def _handle_signal(self, sig, frame):
+        if self.stopping_since is None:
+            self.stopping_since = time.monotonic()
+            logger.warning(f"Supervisor received {signal.Signals(sig).name}: draining {len(self.processes)} workers.")
+        # SIGINT from a terminal already reached the whole process group; SIGTERM (docker stop) did not
+        if sig == signal.SIGTERM:
+            for process in self.processes:
+                if process.is_alive():
+                    os.kill(process.pid, signal.SIGTERM)
+
+    def run(self):
+        sockets = [self.config.bind_socket()]
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        signal.signal(signal.SIGINT, self._handle_signal)
+        self.processes = [self._spawn(sockets) for _ in range(self.workers)]
+        deadline = settings.DRAIN_TIMEOUT_SECONDS + 2 * settings.DRAIN_FLUSH_SECONDS + 10
+
+        while True:
+            time.sleep(0.5)
+            if self.stopping_since is None:
+                for index, process in enumerate(self.processes):
+                    if not process.is_alive():
+                        logger.error(f"Worker {process.pid} exited with code {process.exitcode}; restarting it.")
+                        self.processes[index] = self._spawn(sockets)
+                continue
+
+            alive = [p for p in self.processes if p.is_alive()]
+            if not alive:
+                break
+            if time.monotonic() - self.stopping_since > deadline:
+                logger.error(f"{len(alive)} workers did not drain within {deadline:.0f}s; killing them.")
+                for process in alive:
+                    process.kill()
+                break
+
+        for process in self.processes:
+            process.join()
+        logger.info("All workers stopped.")
+
+def main():
+    workers = worker_count()
+    config = build_config(workers)
+    loop, http = settings.SERVER_LOOP, settings.SERVER_HTTP
+    if loop == "auto":
+        loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    if http == "auto":
+        http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    logger.info(f"Starting {workers} worker(s) on {settings.HOST}:{settings.PORT} (loop={loop}, http={http})")
+    if workers == 1:
+        DrainingServer(config).run()
+    else:
+        Supervisor(config, workers).run()
+
+if __name__ == "__main__":
+    main()
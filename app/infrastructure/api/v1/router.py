@@ -1,51 +1,136 @@
+import base64
+import hashlib
+import os
+import re
 import uuid
-from fastapi import APIRouter, HTTPException, UploadFile, File, Header
-from fastapi.responses import FileResponse
+import zipfile
+from functools import partial
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Header, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, RedirectResponse, StreamingResponse
+from starlette.background import BackgroundTask
 import json
-from typing import Optional
+from typing import List, Optional
 
 from app.domain.models import SimulationRequest, Script, TextRequest, PromptRequest, ScriptSegment, VoiceEnum
-from app.infrastructure.api.schemas import GenerationResponse
-
-# Application Services
-from app.application.services.script_generator import ScriptGenerationService
-from app.application.services.audio_generator import AudioGenerationService
-
-# Adapters (Dependency Injection root could be here or main)
-from app.infrastructure.adapters.openai_adapter import OpenAIAdapter
-from app.infrastructure.adapters.edge_tts_adapter import EdgeTTSAdapter
-from app.infrastructure.adapters.file_storage_adapter import FileStorageAdapter
-from app.infrastructure.adapters.supabase_adapter import SupabaseAdapter
-from app.infrastructure.adapters.supabase_storage_adapter import SupabaseStorageAdapter
+from app.domain.models import AudioRequest, BatchTTSRequest, BatchOutput, BatchItemResult, RenderRequest, AudioEncoding, AudioOutputOptions
+from app.domain.exceptions import ResourceNotFoundError, InvalidVoiceError
+from app.infrastructure.api.schemas import GenerationResponse, SimulationPage, MemoryTracingRequest, ProfilingArmRequest
+
+# Adapters and services are built lazily by the container (see main.py lifespan)
+from app.infrastructure.container import Container, get_container
+from app.infrastructure.api.admin import require_admin
+from app.infrastructure.api.cancellation import run_job
+from app.infrastructure.api.downloads import content_disposition, file_download
+from app.infrastructure.serialization.script_codec import EncodedScript, read_script_file
+from app.infrastructure.api.lifecycle import accepting_jobs, lifecycle
+from app.infrastructure.api.progress import progress, Subscription
 from app.infrastructure.monitoring.logger import logger
-from app.domain.models import SimulationRecord
+from app.infrastructure.monitoring.memory import memory
+from app.infrastructure.monitoring.metrics import metrics
+from app.infrastructure.monitoring.profiler import profiler
+from app.infrastructure.resilience.adaptive_limiter import all_limiters
+from app.infrastructure.scheduling.scheduler import PriorityClass
+from app.infrastructure.config.settings import settings
+from app.application.job_context import JobContext, job_context
+from app.domain.models import SimulationRecord, SimulationFilter, ScenarioType, JobCheckpoint, VoiceInfo
 from datetime import datetime, timezone
 
 router = APIRouter()
 
-# Instantiate Adapters
-llm_provider = OpenAIAdapter()
-tts_provider = EdgeTTSAdapter()
-# Let's keep it simple: Application Service takes 'local_storage' and optional 'cloud_storage'.
-storage_provider = FileStorageAdapter() 
-cloud_storage = SupabaseStorageAdapter() # New instance
-db_repository = SupabaseAdapter()
+# Client-supplied job ids end up in file paths, so keep them to a safe charset.
+JOB_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+def _resolve_job_id(requested_job_id: Optional[str]) -> str:
+    """Returns the client-supplied job id (used to retry/resume a job) or a fresh one."""
+    if not requested_job_id:
+        return str(uuid.uuid4())
+    if not JOB_ID_PATTERN.match(requested_job_id):
+        raise HTTPException(status_code=422, detail="X-Vanaheim-Job-Id must match [A-Za-z0-9_-]{1,64}.")
+    return requested_job_id
+
+def _new_job(job_id: str, kind: str, duration_minutes: int = 0, priority: PriorityClass = PriorityClass.BATCH) -> JobContext:
+    """Creates the job context with its time budget (longer scenarios get proportionally more)."""
+    return JobContext(
+        job_id=job_id,
+        kind=kind,
+        priority=priority.rank,
+        budget_seconds=settings.JOB_TIMEOUT_SECONDS + duration_minutes * settings.JOB_TIMEOUT_PER_MINUTE_SECONDS,
+        stage_shares={"script": settings.SCRIPT_STAGE_BUDGET_SHARE}
+    )
+
+def _client_id(http_request: Request, api_key: Optional[str]) -> str:
+    """Fair-queuing identity: the API key (hashed, never kept in clear) or the client address."""
+    if api_key:
+        return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+    return "ip:" + (http_request.client.host if http_request.client else "unknown")
+
+def _finish_in_background(header_value: Optional[bool]) -> bool:
+    return settings.FINISH_IN_BACKGROUND if header_value is None else header_value
+
+def _request_hash(payload: dict) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def _check_checkpoint_owner(checkpoint: JobCheckpoint, client_id: str, payload_hash: Optional[str] = None):
+    """409 unless the checkpoint was created by this client (and, on a retry, for the same request)."""
+    if checkpoint.owner is not None and checkpoint.owner != client_id:
+        raise HTTPException(status_code=409, detail=f"Job {checkpoint.job_id} belongs to another client; use a new job id.")
+    if payload_hash is not None and checkpoint.request_hash is not None and checkpoint.request_hash != payload_hash:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job {checkpoint.job_id} was started with a different request; retry with the same body or a new job id."
+        )
+
+def _checkpoint_job(container: Container, job_id: str, kind: str, request, client_id: str) -> None:
+    """Registers the job so it can be resumed later; a retry must come from the same client with the same request."""
+    payload = request.model_dump(mode="json")
+    payload_hash = _request_hash(payload)
+    existing = container.checkpoint_store.load_job(job_id)
+    if existing:
+        _check_checkpoint_owner(existing, client_id, payload_hash)
+        return
+    now = datetime.now(timezone.utc).isoformat()
+    container.checkpoint_store.save_job(JobCheckpoint(
+        job_id=job_id,
+        kind=kind,
+        request=payload,
+        owner=client_id,
+        request_hash=payload_hash,
+        created_at=now,
+        updated_at=now
+    ))
 
-# Instantiate Services
-script_service = ScriptGenerationService(llm_provider)
-audio_service = AudioGenerationService(tts_provider, storage_provider, cloud_storage)
+def _encoding(container: Container, request: AudioOutputOptions) -> AudioEncoding:
+    """The requested output encoding, or the one the TTS provider falls back to."""
+    return container.tts_provider.supported_encoding(request.encoding)
 
-@router.post("/tts/simple", tags=["TTS"])
-async def generate_simple_tts(request: TextRequest):
+def _render_key(script_id: str) -> str:
+    """Checkpoint that caches the segment audio of a saved script across renders."""
+    return f"render-{script_id}"
+
+def _retire_checkpoint(container: Container, job_id: str):
+    container.checkpoint_store.adopt_segments(job_id, _render_key(job_id))
+    container.checkpoint_store.clear(job_id)
+
+@router.post("/tts/simple", tags=["TTS"], dependencies=[Depends(accepting_jobs)])
+async def generate_simple_tts(http_request: Request, request: TextRequest, container: Container = Depends(get_container)):
     """
     **Free Mode: Simple Text-to-Audio**
     
     Converts plain text to audio using a specific voice without using LLMs.
     
     - **No API Key required**.
-    - **Fast generation**.
+    - **Fast generation**: runs in the interactive priority class, ahead of long LLM jobs.
     """
     job_id = str(uuid.uuid4())
+    return await run_job(
+        http_request,
+        _new_job(job_id, "simple", priority=PriorityClass.INTERACTIVE),
+        lambda: _run_simple_job(container, job_id, request),
+        slot=container.scheduler.slot(PriorityClass.INTERACTIVE, _client_id(http_request, None))
+    )
+
+async def _run_simple_job(container: Container, job_id: str, request: TextRequest):
     try:
         # Create a single-segment script
         script = Script(segments=[
@@ -57,23 +142,144 @@ async def generate_simple_tts(request: TextRequest):
             )
         ])
         
-        output_filename = f"{job_id}_simple.mp3"
-        final_path = await audio_service.generate_script_audio(script, output_filename, upload_to_cloud=False)
+        encoding = _encoding(container, request)
+        output_filename = f"{job_id}_simple.{encoding.extension}"
+        final_path = await container.audio_service.generate_script_audio(script, output_filename, upload_to_cloud=False, encoding=encoding, artifact_id=job_id)
         
         # Return File Directly for Download
         return FileResponse(
             path=final_path,
-            filename=f"simple_tts_{job_id}.mp3",
-            media_type="audio/mpeg"
+            filename=f"simple_tts_{job_id}.{encoding.extension}",
+            media_type=encoding.media_type
         )
     except Exception as e:
         logger.error(f"Simple TTS failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/ai/prompt", tags=["AI Tools"])
+@router.post("/tts/batch", tags=["TTS"], dependencies=[Depends(accepting_jobs)])
+async def generate_batch_tts(http_request: Request, request: BatchTTSRequest, container: Container = Depends(get_container)):
+    """
+    **Batch Mode: Many Texts-to-Audio in One Call**
+
+    Synthesizes a list of texts (`TextRequest`) or scripts (`AudioRequest`) as one job.
+
+    - **Deduplicated**: identical items are synthesized once.
+    - **Bounded**: `BATCH_MAX_PARALLEL_ITEMS` items at a time, sharing the upstream limiter with all jobs.
+    - **Output**: `zip` (one entry per unique item + `manifest.json`), `multipart` (multipart/mixed
+      stream, manifest last) or `manifest` (JSON; files stay in the output directory).
+    - Failed items are listed in the manifest; the call fails only if every item fails.
+    - The batch's `output_format`/`quality` apply to every item.
+    """
+    if len(request.items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=422, detail=f"A batch holds at most {settings.BATCH_MAX_ITEMS} items.")
+    job_id = str(uuid.uuid4())
+    return await run_job(
+        http_request,
+        _new_job(job_id, "batch"),
+        lambda: _run_batch_job(container, job_id, request),
+        slot=container.scheduler.slot(PriorityClass.BATCH, _client_id(http_request, None), cost=max(1.0, len(request.items) / 10))
+    )
+
+def _batch_script(item) -> Script:
+    if isinstance(item, AudioRequest):
+        return item.script
+    return Script(segments=[ScriptSegment(role="Narrator", name="Narrator", text=item.text, voice=item.voice)])
+
+def _batch_manifest(job_id: str, results: List[BatchItemResult]) -> dict:
+    return {
+        "job_id": job_id,
+        "items": [r.model_dump(exclude={"path"}, exclude_none=True) for r in results],
+        "unique": sum(1 for r in results if r.duplicate_of is None),
+        "failed": sum(1 for r in results if r.status != "ok"),
+    }
+
+def _write_batch_zip(zip_path: str, manifest: dict, results: List[BatchItemResult], extension: str):
+    # MP3/Opus are already compressed: store entries, so zipping costs one sequential copy
+    names = set()
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_STORED) as archive:
+        for result in results:
+            if result.path is None:
+                continue
+            name = result.filename if result.filename not in names else f"{result.item_id}.{extension}"
+            names.add(name)
+            archive.write(result.path, arcname=name)
+        archive.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=2))
+
+def _multipart_batch(boundary: str, manifest: dict, results: List[BatchItemResult], media_type: str):
+    # Sync generator: Starlette runs it in the threadpool, so file reads do not block the loop
+    for result in results:
+        if result.path is None:
+            continue
+        yield (
+            f"--{boundary}\r\nContent-Type: {media_type}\r\n"
+            f"Content-Disposition: {content_disposition(result.filename)}\r\n"
+            f"X-Vanaheim-Item-Id: {result.item_id}\r\nX-Vanaheim-Item-Index: {result.index}\r\n\r\n"
+        ).encode("utf-8")
+        with open(result.path, "rb") as f:
+            while chunk := f.read(64 * 1024):
+                yield chunk
+        yield b"\r\n"
+    yield (
+        f"--{boundary}\r\nContent-Type: application/json\r\n"
+        f"Content-Disposition: attachment; filename=\"manifest.json\"\r\n\r\n"
+    ).encode("utf-8")
+    yield json.dumps(manifest, ensure_ascii=False).encode("utf-8")
+    yield f"\r\n--{boundary}--\r\n".encode("utf-8")
+
+async def _run_batch_job(container: Container, job_id: str, request: BatchTTSRequest):
+    # Manifest mode keeps the files; zip/multipart only need them until the response is sent
+    keep_files = request.output == BatchOutput.MANIFEST
+    work_dir = settings.OUTPUT_DIR if keep_files else container.storage_provider.create_temp_dir(f"batch_{job_id}")
+    cleanup = None if keep_files else BackgroundTask(container.storage_provider.cleanup_temp_dir, work_dir)
+    encoding = _encoding(container, request)
+    response = None
+    try:
+        results = await container.audio_service.generate_batch(
+            [_batch_script(item) for item in request.items],
+            job_id,
+            work_dir,
+            filenames=[getattr(item, "output_filename", None) for item in request.items],
+            encoding=encoding,
+            index_artifacts=keep_files
+        )
+        manifest = _batch_manifest(job_id, results)
+        if manifest["failed"] == len(results):
+            raise HTTPException(status_code=500, detail=f"Every batch item failed: {results[0].error}", headers={"X-Vanaheim-Job-Id": job_id})
+
+        headers = {"X-Vanaheim-Job-Id": job_id, "X-Vanaheim-Batch-Failed": str(manifest["failed"])}
+        if request.output == BatchOutput.MANIFEST:
+            response = JSONResponse(content=manifest, headers=headers)
+        elif request.output == BatchOutput.MULTIPART:
+            boundary = f"vanaheim-{job_id}"
+            response = StreamingResponse(
+                _multipart_batch(boundary, manifest, results, encoding.media_type),
+                media_type=f"multipart/mixed; boundary={boundary}",
+                headers=headers,
+                background=cleanup
+            )
+        else:
+            zip_path = os.path.join(work_dir, f"batch_{job_id}.zip")
+            await anyio.to_thread.run_sync(_write_batch_zip, zip_path, manifest, results, encoding.extension)
+            response = FileResponse(path=zip_path, filename=f"batch_{job_id}.zip", media_type="application/zip", headers=headers, background=cleanup)
+        return response
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch TTS failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e), headers={"X-Vanaheim-Job-Id": job_id})
+    finally:
+        # Without a response (failure, cancellation) nobody will run the background cleanup
+        if cleanup and response is None:
+            container.storage_provider.cleanup_temp_dir(work_dir)
+
+@router.post("/ai/prompt", tags=["AI Tools"], dependencies=[Depends(accepting_jobs)])
 async def generate_from_prompt(
+    http_request: Request,
     request: PromptRequest,
-    x_openai_key: Optional[str] = Header(None, alias="X-OpenAI-Key")
+    x_openai_key: Optional[str] = Header(None, alias="X-OpenAI-Key"),
+    x_job_id: Optional[str] = Header(None, alias="X-Vanaheim-Job-Id"),
+    x_finish_in_background: Optional[bool] = Header(None, alias="X-Vanaheim-Finish-In-Background"),
+    container: Container = Depends(get_container)
 ):
     """
     **Dev Mode: Prompt -> AI Script -> Audio**
@@ -82,34 +288,52 @@ async def generate_from_prompt(
     
     - **Requires X-OpenAI-Key header**.
     - **Persists data** to Supabase (if configured).
+    - **Resumable**: send `X-Vanaheim-Job-Id` to retry a failed job without paying for finished work again.
+    - **Cancelled on disconnect** unless `X-Vanaheim-Finish-In-Background: true`.
     """
     # If header is missing, check if we have a default env key (handled by Adapter), 
     # but we should explicit check here to fail fast if neither exists
-    from app.infrastructure.config.settings import settings
     if not x_openai_key and not settings.OPENAI_API_KEY:
         raise HTTPException(status_code=401, detail="X-OpenAI-Key header required (no server-side key configured).")
 
-    job_id = str(uuid.uuid4())
+    job_id = _resolve_job_id(x_job_id)
+    client_id = _client_id(http_request, x_openai_key)
+    _checkpoint_job(container, job_id, "prompt", request, client_id)
+    return await run_job(
+        http_request,
+        _new_job(job_id, "prompt"),
+        lambda: _run_prompt_job(container, job_id, request, x_openai_key),
+        finish_in_background=_finish_in_background(x_finish_in_background),
+        slot=container.scheduler.slot(PriorityClass.BATCH, client_id, cost=2)
+    )
+
+async def _save_script(container: Container, job_id: str, script_name: str, encoded: EncodedScript) -> str:
+    """Writes the script file (`{script_name}.json[.gz]`) to its sharded place in SCRIPTS_DIR and indexes it under the job id."""
+    script_path = container.storage_provider.artifact_path(settings.SCRIPTS_DIR, f"{script_name}{encoded.file_suffix}")
+    with open(script_path, "wb") as f:
+        f.write(encoded.file_content())
+    try:
+        await anyio.to_thread.run_sync(container.artifact_index.record_file, job_id, "script", script_path)
+    except Exception as e:
+        logger.warning(f"Could not index {script_path}: {e}")
+    return script_path
+
+async def _run_prompt_job(container: Container, job_id: str, request: PromptRequest, api_key: Optional[str]):
     try:
         # 1. Generate Script from Prompt
-        script = await script_service.generate_script_from_prompt(request, api_key=x_openai_key)
-        
-        # 2. Save Script JSON (Reuse logic or abstract? Copy-paste for V1 speed/safety)
-        script_filename = f"{job_id}_prompt.json"
+        script = await container.script_service.generate_script_from_prompt(request, api_key=api_key, job_id=job_id)
         
-        # Lazy import to avoid circular dep issues if any
-        from app.infrastructure.config.settings import settings
-        import os
-        script_path = os.path.join(settings.SCRIPTS_DIR, script_filename)
-        
-        with open(script_path, "w", encoding="utf-8") as f:
-            json.dump(script.model_dump(), f, indent=4, ensure_ascii=False)
+        # 2. Save Script JSON (serialized once for the file and the DB record)
+        encoded = EncodedScript(script)
+        script_path = await _save_script(container, job_id, f"{job_id}_prompt", encoded)
 
         # 3. Generate Audio
-        output_filename = f"{job_id}_prompt.mp3"
-        final_path = await audio_service.generate_script_audio(script, output_filename)
+        encoding = _encoding(container, request)
+        output_filename = f"{job_id}_prompt.{encoding.extension}"
+        final_path = await container.audio_service.generate_script_audio(script, output_filename, job_id=job_id, encoding=encoding, artifact_id=job_id)
         
         # 4. Save to DB
+        job_context().enter_stage("persist")
         try:
             record = SimulationRecord(
                 id=job_id,
@@ -120,31 +344,41 @@ async def generate_from_prompt(
                 participants_count=len(script.segments), # Count roles? or segments
                 script_path=script_path,
                 audio_path=final_path,
-                configuration={"model": request.model.value, "prompt": request.prompt},
-                script_content=json.dumps(script.model_dump(), ensure_ascii=False)
+                configuration={"model": request.model.value, "prompt": request.prompt, "tokens": job_context().llm_usage()},
+                script_content=encoded.db_content()
             )
-            await db_repository.save_simulation(record)
+            await container.db_repository.save_simulation(record)
         except Exception as db_e:
             logger.error(f"DB Recording error: {db_e}")
 
+        # Job is complete: its segments seed the render cache of its script, the rest goes
+        _retire_checkpoint(container, job_id)
+
         # Return File Directly (User Requirement: Immediate Audio Playback/Download)
         return FileResponse(
             path=final_path,
-            filename=f"prompt_{job_id}.mp3",
-            media_type="audio/mpeg",
+            filename=f"prompt_{job_id}.{encoding.extension}",
+            media_type=encoding.media_type,
             headers={
                 "X-Vanaheim-Job-Id": job_id,
                 "X-Vanaheim-Script-Preview": request.prompt[:100].replace("\n", " ")  # Brief preview in header
             }
         )
+    except InvalidVoiceError:
+        # The script was rejected before any TTS call: a client error, see the exception handler
+        raise
     except Exception as e:
-        logger.error(f"Dev Mode failed: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.error(f"Dev Mode failed (job {job_id}, resumable): {e}")
+        raise HTTPException(status_code=500, detail=str(e), headers={"X-Vanaheim-Job-Id": job_id})
 
-@router.post("/simulation/scenario", tags=["Simulations"])
+@router.post("/simulation/scenario", tags=["Simulations"], dependencies=[Depends(accepting_jobs)])
 async def generate_from_scenario(
+    http_request: Request,
     request: SimulationRequest, 
-    x_openai_key: Optional[str] = Header(None, alias="X-OpenAI-Key")
+    x_openai_key: Optional[str] = Header(None, alias="X-OpenAI-Key"),
+    x_job_id: Optional[str] = Header(None, alias="X-Vanaheim-Job-Id"),
+    x_finish_in_background: Optional[bool] = Header(None, alias="X-Vanaheim-Finish-In-Background"),
+    container: Container = Depends(get_container)
 ):
     """
     **Specialized Mode: Complex Scenario Simulation**
@@ -155,26 +389,38 @@ async def generate_from_scenario(
     - Specific topic and context
     
     - **Requires X-OpenAI-Key header** (or server env).
+    - **Resumable**: send `X-Vanaheim-Job-Id` to retry a failed job without paying for finished work again.
+    - **Cancelled on disconnect** unless `X-Vanaheim-Finish-In-Background: true`.
     """
-    job_id = str(uuid.uuid4())
+    job_id = _resolve_job_id(x_job_id)
+    client_id = _client_id(http_request, x_openai_key)
+    _checkpoint_job(container, job_id, "scenario", request, client_id)
+    return await run_job(
+        http_request,
+        _new_job(job_id, "scenario", request.duration_minutes),
+        lambda: _run_scenario_job(container, job_id, request, x_openai_key),
+        finish_in_background=_finish_in_background(x_finish_in_background),
+        slot=container.scheduler.slot(PriorityClass.BATCH, client_id, cost=request.duration_minutes)
+    )
+
+async def _run_scenario_job(container: Container, job_id: str, request: SimulationRequest, api_key: Optional[str]):
     try:
         # 1. Generate Script
-        script = await script_service.generate_script(request, api_key=x_openai_key)
+        script = await container.script_service.generate_script(request, api_key=api_key, job_id=job_id)
         
         # 2. Save Script
-        script_filename = f"{job_id}_{request.scenario}.json"
-        from app.infrastructure.config.settings import settings
-        import os
-        script_path = os.path.join(settings.SCRIPTS_DIR, script_filename)
-        
-        with open(script_path, "w", encoding="utf-8") as f:
-            json.dump(script.model_dump(), f, indent=4, ensure_ascii=False)
+        encoded = EncodedScript(script)
+        script_path = await _save_script(container, job_id, f"{job_id}_{request.scenario}", encoded)
 
         # 3. Generate Audio
-        output_filename = f"{job_id}_{request.scenario}.mp3"
-        final_path = await audio_service.generate_script_audio(script, output_filename)
+        encoding = _encoding(container, request)
+        output_filename = f"{job_id}_{request.scenario}.{encoding.extension}"
+        final_path = await container.audio_service.generate_script_audio(
+            script, output_filename, job_id=job_id, encoding=encoding, artifact_id=job_id, scenario=request.scenario.value
+        )
         
         # 4. Save to DB
+        job_context().enter_stage("persist")
         try:
             record = SimulationRecord(
                 id=job_id,
@@ -185,33 +431,377 @@ async def generate_from_scenario(
                 participants_count=request.participants,
                 script_path=script_path,
                 audio_path=final_path,
-                configuration={"model": request.model.value, "scenario": request.scenario},
-                script_content=json.dumps(script.model_dump(), ensure_ascii=False)
+                configuration={"model": request.model.value, "scenario": request.scenario, "tokens": job_context().llm_usage()},
+                script_content=encoded.db_content()
             )
-            await db_repository.save_simulation(record)
+            await container.db_repository.save_simulation(record)
         except Exception as db_e:
             logger.error(f"DB Recording error (non-fatal): {db_e}")
 
+        # Job is complete: its segments seed the render cache of its script, the rest goes
+        _retire_checkpoint(container, job_id)
+
         # Return File Directly (User Requirement: Immediate Audio Playback/Download)
         return FileResponse(
             path=final_path,
-            filename=f"scenario_{job_id}.mp3",
-            media_type="audio/mpeg",
+            filename=f"scenario_{job_id}.{encoding.extension}",
+            media_type=encoding.media_type,
             headers={
                 "X-Vanaheim-Job-Id": job_id,
                 "X-Vanaheim-Participants": str(len(script.segments))
             }
         )
 
+    except InvalidVoiceError:
+        raise
     except Exception as e:
-        logger.error(f"Generate Simulation failed: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.error(f"Generate Simulation failed (job {job_id}, resumable): {e}")
+        raise HTTPException(status_code=500, detail=str(e), headers={"X-Vanaheim-Job-Id": job_id})
+
+@router.post("/scripts/render", tags=["Simulations"], dependencies=[Depends(accepting_jobs)])
+async def render_script(http_request: Request, request: RenderRequest, container: Container = Depends(get_container)):
+    """
+    **Render a Saved Script (No LLM)**
+
+    Synthesizes the script of an earlier `/ai/prompt` or `/simulation/scenario` job (`script_id`),
+    or an inline `script`, optionally with `voice_overrides` (by speaker name, role or voice).
+
+    - **No API Key required**: the LLM is never called.
+    - **Incremental**: segment audio is cached per script, so a re-render only synthesizes the
+      segments whose voice or text changed (`X-Vanaheim-Segments-Synthesized` tells how many).
+    """
+    if request.script_id is not None:
+        if not JOB_ID_PATTERN.match(request.script_id):
+            raise HTTPException(status_code=422, detail="script_id must match [A-Za-z0-9_-]{1,64}.")
+        script = await _load_stored_script(container, request.script_id)
+        render_key = _render_key(request.script_id)
+    else:
+        script = request.script
+        # Inline scripts are keyed by their texts, so resending one with other voices reuses the rest
+        render_key = "render-inline-" + hashlib.sha1("\0".join(s.text for s in script.segments).encode("utf-8")).hexdigest()[:16]
+    script = container.audio_service.apply_voice_overrides(script, {k: v.value for k, v in request.voice_overrides.items()})
+
+    job_id = str(uuid.uuid4())
+    words = sum(len(segment.text.split()) for segment in script.segments)
+    return await run_job(
+        http_request,
+        _new_job(job_id, "render", duration_minutes=round(words / 150)),
+        lambda: _run_render_job(container, job_id, render_key, script, _encoding(container, request)),
+        slot=container.scheduler.slot(PriorityClass.BATCH, _client_id(http_request, None), cost=max(1.0, words / 150))
+    )
+
+def _read_indexed_script(container: Container, script_id: str) -> Optional[Script]:
+    artifact = container.artifact_index.find(script_id, "script")
+    if artifact and os.path.exists(artifact.path):
+        container.artifact_index.touch(artifact.path)
+        return read_script_file(artifact.path)
+    return None
+
+async def _load_stored_script(container: Container, script_id: str) -> Script:
+    """The script saved by a finished job: its indexed JSON file, else the DB record."""
+    # SQLite lookups and the file read block: off the event loop
+    script = await anyio.to_thread.run_sync(_read_indexed_script, container, script_id)
+    if script:
+        return script
+    content = await container.db_repository.get_script_content(script_id)
+    if content:
+        return Script.model_validate_json(content)
+    raise ResourceNotFoundError(f"No saved script for job {script_id}.")
+
+async def _run_render_job(container: Container, job_id: str, render_key: str, script: Script, encoding: AudioEncoding):
+    try:
+        output_filename = f"{job_id}_render.{encoding.extension}"
+        # The render key's checkpoint holds the segment cache (segment files are keyed by voice/text). It is
+        # kept after a successful render on purpose, for the next re-render; the janitor's checkpoint purge
+        # drops it once unused for CHECKPOINT_RETENTION_HOURS
+        final_path = await container.audio_service.generate_script_audio(script, output_filename, job_id=render_key, encoding=encoding, artifact_id=job_id)
+        return FileResponse(
+            path=final_path,
+            filename=f"render_{job_id}.{encoding.extension}",
+            media_type=encoding.media_type,
+            headers={
+                "X-Vanaheim-Job-Id": job_id,
+                "X-Vanaheim-Segments-Synthesized": str(job_context().tts_calls)
+            }
+        )
+    except InvalidVoiceError:
+        raise
+    except Exception as e:
+        logger.error(f"Render failed (job {job_id}): {e}")
+        raise HTTPException(status_code=500, detail=str(e), headers={"X-Vanaheim-Job-Id": job_id})
+
+@router.post("/jobs/{job_id}/resume", tags=["Simulations"], dependencies=[Depends(accepting_jobs)])
+async def resume_job(
+    http_request: Request,
+    job_id: str,
+    x_openai_key: Optional[str] = Header(None, alias="X-OpenAI-Key"),
+    x_finish_in_background: Optional[bool] = Header(None, alias="X-Vanaheim-Finish-In-Background"),
+    container: Container = Depends(get_container)
+):
+    """
+    **Resume a Failed Job**
+
+    Re-runs a checkpointed `/ai/prompt` or `/simulation/scenario` job from the first missing
+    piece: script batches and audio segments that were already produced are reused.
+
+    - **Requires X-OpenAI-Key header** (or server env) if the script is not complete yet.
+    - **Same client only**: a job started with an X-OpenAI-Key is resumed with the same key (409 otherwise).
+    """
+    if not JOB_ID_PATTERN.match(job_id):
+        raise HTTPException(status_code=422, detail="Invalid job id.")
+
+    checkpoint = container.checkpoint_store.load_job(job_id)
+    if not checkpoint:
+        raise HTTPException(status_code=404, detail=f"No checkpoint found for job {job_id} (finished or expired).")
+    client_id = _client_id(http_request, x_openai_key)
+    _check_checkpoint_owner(checkpoint, client_id)
+
+    if checkpoint.kind == "prompt":
+        job, cost = _new_job(job_id, "prompt"), 2
+        runner = partial(_run_prompt_job, container, job_id, PromptRequest(**checkpoint.request), x_openai_key)
+    elif checkpoint.kind == "scenario":
+        scenario_request = SimulationRequest(**checkpoint.request)
+        job, cost = _new_job(job_id, "scenario", scenario_request.duration_minutes), scenario_request.duration_minutes
+        runner = partial(_run_scenario_job, container, job_id, scenario_request, x_openai_key)
+    else:
+        raise HTTPException(status_code=422, detail=f"Job kind '{checkpoint.kind}' cannot be resumed.")
+
+    logger.info(f"Resuming {checkpoint.kind} job {job_id}")
+    return await run_job(
+        http_request,
+        job,
+        runner,
+        finish_in_background=_finish_in_background(x_finish_in_background),
+        slot=container.scheduler.slot(PriorityClass.BATCH, client_id, cost=cost)
+    )
+
+@router.get("/simulations", tags=["Simulations"], response_model=SimulationPage, response_model_exclude_none=True)
+async def list_simulations(
+    topic: Optional[str] = None,
+    scenario: Optional[ScenarioType] = None,
+    model: Optional[str] = None,
+    limit: int = Query(settings.HISTORY_PAGE_SIZE, ge=1),
+    cursor: Optional[str] = None,
+    include_script: bool = False,
+    container: Container = Depends(get_container)
+):
+    """
+    **Simulation History**
+
+    Past prompt/scenario jobs, newest first, optionally filtered by topic (substring), scenario and model.
+    Pages are keyset-paginated: pass `next_cursor` as `cursor` to get the next one (stable while new jobs arrive).
+    `script_content` is only returned with `include_script=true`.
+    """
+    after = None
+    if cursor:
+        try:
+            after = tuple(json.loads(base64.urlsafe_b64decode(cursor.encode("ascii"))))
+            if len(after) != 2 or not all(isinstance(part, str) for part in after):
+                raise ValueError
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=422, detail="Invalid cursor.")
+    limit = min(limit, settings.HISTORY_MAX_PAGE_SIZE)
+    try:
+        # One extra row tells whether there is a next page
+        records = await container.db_repository.list_simulations(
+            SimulationFilter(topic=topic, scenario=scenario, model=model), limit + 1, after=after, include_script=include_script
+        )
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"History query failed: {e}")
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        last = records[-1]
+        next_cursor = base64.urlsafe_b64encode(json.dumps([last.created_at, last.id]).encode("utf-8")).decode("ascii")
+    return SimulationPage(items=records, next_cursor=next_cursor)
+
+@router.api_route("/jobs/{job_id}/audio", methods=["GET", "HEAD"], tags=["Simulations"])
+async def download_job_audio(http_request: Request, job_id: str, container: Container = Depends(get_container)):
+    """
+    **Download a Job's Audio**
+
+    Serves the audio of a finished job with `ETag`/`If-None-Match` (304) and single
+    byte `Range` requests (206), so players can seek and clients resume downloads.
+    If the local file is gone, redirects (307) to a signed URL of the cloud copy.
+    """
+    if not JOB_ID_PATTERN.match(job_id):
+        raise HTTPException(status_code=422, detail="Invalid job id.")
+
+    artifact = await anyio.to_thread.run_sync(container.artifact_index.find, job_id, "audio")
+    if artifact and os.path.exists(artifact.path):
+        if http_request.method == "GET":
+            await anyio.to_thread.run_sync(container.artifact_index.touch, artifact.path)
+        extension = os.path.splitext(artifact.path)[1].lstrip(".")
+        media_type = AudioEncoding(format="opus" if extension == "ogg" else "mp3").media_type
+        return file_download(http_request, artifact.path, media_type, os.path.basename(artifact.path), {"X-Vanaheim-Job-Id": job_id})
+
+    url = await _signed_cloud_url(container, job_id, artifact.cloud_path if artifact else None)
+    if url:
+        return RedirectResponse(url, status_code=307, headers={"X-Vanaheim-Job-Id": job_id})
+    raise HTTPException(status_code=404, detail=f"No audio found for job {job_id}.")
+
+@router.get("/jobs/{job_id}/events", tags=["Simulations"])
+async def job_events(job_id: str):
+    """
+    **Follow a Job's Progress (Server-Sent Events)**
+
+    Streams the progress of a job running on this worker: `stage` changes, `script` (words written
+    vs target), `segments` (synthesized/total), `items` (batch jobs) and `upload`, then a final `end`
+    event with the outcome (`done`, `failed`, `cancelled`, `drained`). A new subscriber first gets the
+    latest event of each kind, so it can connect at any time; send your own `X-Vanaheim-Job-Id` when
+    starting a job to know its id up front. Slow readers skip old events rather than slow the job.
+    """
+    if not JOB_ID_PATTERN.match(job_id):
+        raise HTTPException(status_code=422, detail="Invalid job id.")
+    subscription = progress.subscribe(job_id)
+    return StreamingResponse(
+        _progress_stream(job_id, subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Vanaheim-Job-Id": job_id}
+    )
+
+async def _progress_stream(job_id: str, subscription: Subscription):
+    try:
+        async for event in subscription.events(settings.PROGRESS_HEARTBEAT_SECONDS):
+            # A comment line keeps proxies from timing out an idle stream
+            yield event.to_sse() if event else ": keep-alive\n\n"
+    finally:
+        progress.unsubscribe(job_id, subscription)
+
+async def _signed_cloud_url(container: Container, job_id: str, cloud_path: Optional[str]) -> Optional[str]:
+    if container.signed_urls is None:
+        return None
+    if not cloud_path:
+        # Not indexed on this host: uploads are keyed by the output file name of the DB record
+        audio_path = await container.db_repository.get_audio_path(job_id)
+        if not audio_path:
+            return None
+        cloud_path = os.path.basename(audio_path)
+    return await container.signed_urls.get_url(cloud_path)
+
+@router.get("/voices", tags=["TTS"], response_model=List[VoiceInfo])
+async def list_voices(locale: Optional[str] = None, gender: Optional[str] = None, container: Container = Depends(get_container)):
+    """
+    **Voice Catalog**
+
+    TTS voices available for scripts, by locale (`es-MX`) or language (`es`) and gender (`Female`, `Male`).
+    Scripts using other voices are corrected (near misses, same-locale substitutes) or rejected with 422
+    before any audio is synthesized.
+    """
+    return container.voice_catalog.voices(locale=locale, gender=gender)
 
 @router.get("/health", tags=["Status"])
 async def health_check():
     """
     **Health Check**
     
-    Returns the operational status of the service.
+    Returns the operational status of the service: 503 while this worker drains for a restart.
+    """
+    body = {"status": "operational", "service": "Vanaheim", "version": "1.0.0", "in_flight_jobs": lifecycle.in_flight}
+    if lifecycle.draining:
+        return JSONResponse(status_code=503, content={**body, "status": "draining"})
+    return body
+
+@router.get("/health/live", tags=["Status"])
+async def liveness():
+    """
+    **Liveness**
+
+    200 as long as the process serves requests, including while draining (do not restart it then).
+    """
+    return {"status": "alive"}
+
+@router.get("/health/ready", tags=["Status"])
+async def readiness():
+    """
+    **Readiness**
+
+    200 when this worker accepts new jobs; 503 while it drains, so load balancers stop routing to it.
+    """
+    if lifecycle.draining:
+        return JSONResponse(status_code=503, content=lifecycle.snapshot())
+    return lifecycle.snapshot()
+
+@router.get("/metrics", tags=["Status"], response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    **Metrics**
+
+    Process-local counters and gauges in Prometheus text format
+    (e.g. cancelled jobs and upstream calls saved).
+    """
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/limiters", tags=["Status"])
+async def get_limiters(container: Container = Depends(get_container)):
+    """
+    **Adaptive Concurrency Limiters & Scheduler**
+
+    Current AIMD limit, in-flight/queued calls and recent decisions for each upstream (OpenAI, EdgeTTS),
+    plus running/queued jobs per scheduler priority class.
+    """
+    return {
+        "limiters": [limiter.snapshot() for limiter in all_limiters().values()],
+        "scheduler": container.scheduler.snapshot()
+    }
+
+@router.get("/admin/memory", tags=["Status"], dependencies=[Depends(require_admin)])
+async def get_memory():
+    """
+    **Memory Accounting (Admin)**
+
+    Worker RSS, the RSS peak (and its stage) of every job in flight and, while allocation
+    tracing is on, the latest per-stage diffs of traced allocations with their top sites.
+    Requires `X-Vanaheim-Admin-Token`.
+    """
+    return memory.snapshot(lifecycle.jobs())
+
+@router.post("/admin/memory/tracing", tags=["Status"], dependencies=[Depends(require_admin)])
+async def set_memory_tracing(request: MemoryTracingRequest):
+    """
+    **Allocation Tracing (Admin)**
+
+    Turns `tracemalloc` on or off for this worker. While on, every job stage change takes a
+    snapshot (slower jobs, more memory), diffed against the stage start and logged per stage.
+    Requires `X-Vanaheim-Admin-Token`.
+    """
+    if request.enabled:
+        memory.start_tracing(request.frames, request.top_sites)
+    else:
+        memory.stop_tracing()
+    return {"tracing": memory.tracing}
+
+@router.post("/admin/profiles/arm", tags=["Status"], dependencies=[Depends(require_admin)])
+async def arm_profiling(request: ProfilingArmRequest):
+    """
+    **Profile Upcoming Requests (Admin)**
+
+    Profiles the next `requests` requests under `path_prefix` on this worker, for clients that cannot send
+    `X-Vanaheim-Profile: true` (with the admin token) themselves. One request is profiled at a time.
+    """
+    profiler.arm(request.requests, request.path_prefix)
+    return {"armed": profiler.armed, "path_prefix": profiler.armed_prefix}
+
+@router.get("/admin/profiles", tags=["Status"], dependencies=[Depends(require_admin)])
+async def list_profiles():
+    """
+    **Request Profiles (Admin)**
+
+    Stored profiles of this worker, newest first, by request id (`X-Request-ID` of the profiled request).
+    """
+    return await anyio.to_thread.run_sync(profiler.profiles)
+
+@router.get("/admin/profiles/{request_id}", tags=["Status"], dependencies=[Depends(require_admin)], response_class=FileResponse)
+async def download_profile(request_id: str):
+    """
+    **Download a Profile (Admin)**
+
+    Folded stacks (`frame;frame;frame count`): feed to `flamegraph.pl` or open in speedscope.
     """
-    return {"status": "operational", "service": "Vanaheim", "version": "1.0.0"}
\ No newline at end of file
+    if not JOB_ID_PATTERN.match(request_id):
+        raise HTTPException(status_code=422, detail="Invalid request id.")
+    path = profiler.path(request_id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail=f"No profile for request {request_id}.")
+    return FileResponse(path, media_type="text/plain; charset=utf-8", filename=f"{request_id}.folded")
@@ -0,0 +1,84 @@
+"""
+MPEG audio (Layer III) frame headers, enough to measure EdgeTTS output and pad it with silence.
+
+EdgeTTS encodes at a constant bitrate, so a file's duration follows from the first
+frame header and the file size; no decoding and no full read are needed. Silence is
+made of frames with an all-zero side info (no spectral data) in the segments' own
+format, so it can be spliced between segments at frame boundaries without re-encoding.
+"""
+import os
+from functools import lru_cache
+from typing import BinaryIO, NamedTuple, Optional
+
+# Layer III bitrates (kbit/s) by header index, for MPEG-1 and for MPEG-2/2.5
+_BITRATES = {
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+# Sample rates by version bits (3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5)
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+# EdgeTTS's default format (MPEG-2 Layer III, 48 kbit/s, 24 kHz, mono): 144-byte frames of 24 ms
+SILENT_FRAME = bytes([0xFF, 0xF3, 0x64, 0xC4]) + bytes(140)
+
+class FrameHeader(NamedTuple):
+    bitrate: int
+    sample_rate: int
+
+def parse_frame_header(header: bytes) -> Optional[FrameHeader]:
+    """The Layer III frame header in the first 4 bytes, or None if they are not one."""
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version, layer = (header[1] >> 3) & 0x03, (header[1] >> 1) & 0x03
+    bitrate_index, rate_index = header[2] >> 4, (header[2] >> 2) & 0x03
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    kbps = _BITRATES[1 if version == 3 else 2][bitrate_index]
+    return FrameHeader(kbps * 1000, _SAMPLE_RATES[version][rate_index])
+
+def _audio_start(head: bytes) -> int:
+    # Skip an ID3v2 tag (its size is a 28-bit "synchsafe" integer)
+    if head[:3] == b"ID3" and len(head) >= 10:
+        return 10 + ((head[6] & 0x7F) << 21 | (head[7] & 0x7F) << 14 | (head[8] & 0x7F) << 7 | (head[9] & 0x7F))
+    return 0
+
+def read_first_frame_header(f: BinaryIO) -> Optional[bytes]:
+    """The raw 4-byte header of the first frame of an MP3 stream (after any ID3v2 tag), or None."""
+    f.seek(_audio_start(f.read(10)))
+    header = f.read(4)
+    return header if parse_frame_header(header) else None
+
+def mp3_duration_seconds(path: str) -> Optional[float]:
+    """Duration of a constant-bitrate MP3 file, or None if it does not start with a frame."""
+    with open(path, "rb") as f:
+        start = _audio_start(f.read(10))
+        f.seek(start)
+        header = parse_frame_header(f.read(4))
+    if header is None:
+        return None
+    return (os.path.getsize(path) - start) * 8 / header.bitrate
+
+def silent_frame(header: bytes) -> bytes:
+    """A silent frame in the format of frame header `header` (version, bitrate, sample rate, channel mode)."""
+    parsed = parse_frame_header(header)
+    if parsed is None:
+        raise ValueError("Not an MPEG Layer III frame header.")
+    mpeg1 = (header[1] >> 3) & 0x03 == 3
+    # No CRC, no padding slot, no mode extension
+    silent_header = bytes([0xFF, header[1] | 0x01, header[2] & 0xFD, header[3] & 0xCF])
+    size = (144 if mpeg1 else 72) * parsed.bitrate // parsed.sample_rate
+    return silent_header + bytes(size - 4)
+
+@lru_cache(maxsize=64)
+def _silence(header: bytes, frames: int) -> bytes:
+    return silent_frame(header) * frames
+
+def mp3_silence(header: bytes, seconds: float) -> bytes:
+    """About `seconds` of silence (whole frames) matching frame header `header`; cached per format and length."""
+    parsed = parse_frame_header(header)
+    if parsed is None:
+        raise ValueError("Not an MPEG Layer III frame header.")
+    samples_per_frame = 1152 if (header[1] >> 3) & 0x03 == 3 else 576
+    frames = round(seconds * parsed.sample_rate / samples_per_frame)
+    # Normalized, so every frame of the same format shares one cache entry
+    return _silence(silent_frame(header)[:4], frames) if frames > 0 else b""
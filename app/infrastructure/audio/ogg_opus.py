@@ -0,0 +1,169 @@
+"""
+Ogg Opus page handling, enough to join streams without re-encoding.
+
+EdgeTTS returns one complete Ogg Opus stream per request (OpusHead and OpusTags
+header pages, then audio pages). Appending the files byte by byte would produce a
+"chained" Ogg file that many players stop after the first link, so `OggOpusJoiner`
+rewrites the pages into a single logical stream: one serial number, headers from
+the first stream only, continuous page sequence numbers and granule positions,
+one BOS and one EOS page, and fresh CRCs. Pauses are appended as 20 ms CELT silence
+packets, the frames libopus itself emits for digital silence.
+"""
+import struct
+import zlib
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, List, Optional
+
+CAPTURE = b"OggS"
+# Granule position of a page on which no packet ends
+NO_GRANULE = 0xFFFFFFFFFFFFFFFF
+FLAG_CONTINUED = 0x01
+FLAG_BOS = 0x02
+FLAG_EOS = 0x04
+# Opus always counts granules at 48 kHz
+OPUS_GRANULE_RATE = 48_000
+_HEADER = struct.Struct("<4sBBQIIIB")
+# Silence packet: TOC of a 20 ms fullband CELT frame (+0x04 for stereo), then an empty frame
+SILENCE_TOC, SILENCE_FRAME = 0xF8, b"\xff\xfe"
+SILENCE_PACKET_GRANULES = 960
+
+# Ogg's CRC-32 is the non-reflected form of zlib's polynomial: run zlib (in C) over
+# bit-reversed bytes with no init/final xor and bit-reverse the result.
+_REVERSED_BYTES = bytes(int(f"{i:08b}"[::-1], 2) for i in range(256))
+
+def ogg_crc(data: bytes) -> int:
+    """Ogg's CRC-32 (polynomial 0x04C11DB7, not reflected, no final xor)."""
+    crc = zlib.crc32(data.translate(_REVERSED_BYTES), 0xFFFFFFFF) ^ 0xFFFFFFFF
+    return int(f"{crc:032b}"[::-1], 2)
+
+@dataclass
+class OggPage:
+    flags: int
+    granule: int
+    serial: int
+    sequence: int
+    lacing: bytes
+    body: bytes
+
+    @property
+    def packets_completed(self) -> int:
+        """Packets that end on this page (a lacing value below 255 closes a packet)."""
+        return sum(1 for value in self.lacing if value < 255)
+
+    def encode(self) -> bytes:
+        header = _HEADER.pack(CAPTURE, 0, self.flags, self.granule, self.serial, self.sequence, 0, len(self.lacing))
+        page = header + self.lacing + self.body
+        return page[:22] + struct.pack("<I", ogg_crc(page)) + page[26:]
+
+def build_page(packets: List[bytes], serial: int, sequence: int, granule: int, flags: int = 0) -> OggPage:
+    """A page holding whole packets (each shorter than 255 * 255 bytes)."""
+    lacing = bytearray()
+    for packet in packets:
+        lacing.extend([255] * (len(packet) // 255))
+        lacing.append(len(packet) % 255)
+    return OggPage(flags, granule, serial, sequence, bytes(lacing), b"".join(packets))
+
+def read_pages(stream: BinaryIO) -> Iterator[OggPage]:
+    while True:
+        header = stream.read(_HEADER.size)
+        if not header:
+            return
+        if len(header) < _HEADER.size:
+            raise ValueError("Truncated Ogg page header.")
+        capture, version, flags, granule, serial, sequence, _, segments = _HEADER.unpack(header)
+        if capture != CAPTURE or version != 0:
+            raise ValueError("Not an Ogg stream.")
+        lacing = stream.read(segments)
+        body = stream.read(sum(lacing))
+        if len(lacing) < segments or len(body) < sum(lacing):
+            raise ValueError("Truncated Ogg page.")
+        yield OggPage(flags, granule, serial, sequence, lacing, body)
+
+class OggOpusJoiner:
+    """Writes several Ogg Opus streams to `output` as one continuous stream."""
+    # OpusHead and OpusTags
+    HEADER_PACKETS = 2
+
+    def __init__(self, output: BinaryIO):
+        self.output = output
+        self.serial: Optional[int] = None
+        self.sequence = 0
+        self.granule_offset = 0
+        self._last_granule = 0
+        self._pending: Optional[OggPage] = None
+        self.channels = 1
+
+    def append(self, stream: BinaryIO):
+        """Appends every Ogg Opus stream in `stream` (a file may hold several back to back)."""
+        header_packets, keep_headers = self.HEADER_PACKETS, False
+        for page in read_pages(stream):
+            if page.flags & FLAG_BOS:
+                # A new stream: its granules restart, so shift them past everything written so far
+                self.granule_offset += self._last_granule
+                self._last_granule = 0
+                header_packets, keep_headers = 0, self.serial is None
+                if keep_headers:
+                    self.serial = page.serial
+                    if page.body.startswith(b"OpusHead"):
+                        self.channels = page.body[9]
+            if header_packets < self.HEADER_PACKETS:
+                header_packets += page.packets_completed
+                if not keep_headers:
+                    continue
+            if self.serial is None:
+                raise ValueError("Ogg data does not start with a BOS page.")
+            if page.granule != NO_GRANULE:
+                self._last_granule = page.granule
+                page.granule += self.granule_offset
+            self._emit(page)
+
+    def append_silence(self, seconds: float):
+        """Continues the current stream with `seconds` of silence (rounded to 20 ms packets)."""
+        if self.serial is None:
+            raise ValueError("Silence needs a stream to continue.")
+        packet = bytes([SILENCE_TOC | (0x04 if self.channels > 1 else 0)]) + SILENCE_FRAME
+        packets = round(seconds * OPUS_GRANULE_RATE / SILENCE_PACKET_GRANULES)
+        for start in range(0, packets, 50):
+            count = min(50, packets - start)
+            # Counted as part of the stream it follows: the next BOS shifts past it
+            self._last_granule += count * SILENCE_PACKET_GRANULES
+            self._emit(build_page([packet] * count, self.serial, 0, self._last_granule + self.granule_offset))
+
+    def _emit(self, page: OggPage):
+        page.serial = self.serial
+        page.sequence = self.sequence
+        self.sequence += 1
+        page.flags &= ~FLAG_EOS
+        if self.sequence > 1:
+            page.flags &= ~FLAG_BOS
+        # Held back one page, so the last one can carry EOS
+        if self._pending is not None:
+            self.output.write(self._pending.encode())
+        self._pending = page
+
+    def close(self):
+        if self._pending is not None:
+            self._pending.flags |= FLAG_EOS
+            self.output.write(self._pending.encode())
+            self._pending = None
+
+def opus_duration_seconds(path: str) -> Optional[float]:
+    """Duration of an Ogg Opus file from its last granule position (minus the encoder pre-skip)."""
+    with open(path, "rb") as f:
+        first = next(read_pages(f), None)
+        if first is None or not first.body.startswith(b"OpusHead"):
+            return None
+        pre_skip = struct.unpack_from("<H", first.body, 10)[0]
+        # The last page starts within its maximum size (27 + 255 + 255 * 255 bytes) of the end
+        size = f.seek(0, 2)
+        f.seek(max(0, size - 65_307))
+        tail = f.read()
+    position = tail.rfind(CAPTURE)
+    while position >= 0:
+        if position + _HEADER.size <= len(tail):
+            _, version, _, granule, serial, *_ = _HEADER.unpack_from(tail, position)
+            # "OggS" may also occur inside packet data: only trust a page of the same stream
+            if version == 0 and serial == first.serial and granule != NO_GRANULE:
+                return max(0, granule - pre_skip) / OPUS_GRANULE_RATE
+        position = tail.rfind(CAPTURE, 0, position)
+    return None
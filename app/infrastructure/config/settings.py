@@ -1,5 +1,5 @@
 import os
-from typing import Optional
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -8,11 +8,143 @@ class Settings(BaseSettings):
     SCRIPTS_DIR: str = os.path.join(os.getcwd(), "data", "scripts")
     OUTPUT_DIR: str = os.path.join(os.getcwd(), "data", "output")
     TEMP_DIR: str = os.path.join(os.getcwd(), "temp_segments")
+    CHECKPOINT_DIR: str = os.path.join(os.getcwd(), "data", "checkpoints")
+
+    # Final audio and scripts are sharded by file-name hash (levels of 2 hex chars; 0 = flat) and
+    # indexed by job id in a local SQLite file shared by the workers of a host.
+    STORAGE_SHARD_LEVELS: int = 2
+    ARTIFACT_INDEX_PATH: str = os.path.join(os.getcwd(), "data", "artifacts.db")
+    # Janitor (every JANITOR_INTERVAL_SECONDS, 0 = off): evicts artifacts idle for ARTIFACT_MAX_AGE_HOURS
+    # and, above ARTIFACT_QUOTA_MB, the least recently downloaded down to LOW_WATERMARK of the quota
+    # (0 = no limit). Temp directories untouched for TEMP_ORPHAN_AGE_SECONDS are from crashed jobs.
+    JANITOR_INTERVAL_SECONDS: float = 300
+    ARTIFACT_MAX_AGE_HOURS: float = 0
+    ARTIFACT_QUOTA_MB: int = 0
+    ARTIFACT_QUOTA_LOW_WATERMARK: float = 0.9
+    TEMP_ORPHAN_AGE_SECONDS: float = 6 * 3600
+
+    # Scripts are stored as compact JSON; optionally gzip-compressed on disk (.json.gz) and
+    # in the DB record's script_content ("gzip:" + base64). Both forms are always readable.
+    SCRIPT_FILE_COMPRESSION: bool = False
+    SCRIPT_DB_COMPRESSION: bool = False
+    # Simulation records go to Supabase when configured, else to this local SQLite file
+    SIMULATION_DB_PATH: str = os.path.join(os.getcwd(), "data", "simulations.db")
+    # History listing (GET /simulations): default and maximum page size
+    HISTORY_PAGE_SIZE: int = 20
+    HISTORY_MAX_PAGE_SIZE: int = 100
+
+    # TTS voice catalog: the bundled snapshot, or its refreshed copy at VOICE_CATALOG_PATH
+    # (re-fetched every VOICE_CATALOG_REFRESH_HOURS, 0 = never). Scenario prompts offer the
+    # voices of PROMPT_VOICE_LOCALES.
+    VOICE_CATALOG_PATH: str = os.path.join(os.getcwd(), "data", "voices.json")
+    VOICE_CATALOG_REFRESH_HOURS: float = 24
+    PROMPT_VOICE_LOCALES: List[str] = ["es-AR", "es-ES", "es-VE", "es-MX", "es-CO", "es-US"]
+
+    # Checkpoints of failed/unfinished jobs are kept this long for resuming.
+    CHECKPOINT_RETENTION_HOURS: int = 48
+
+    # Keep running LLM/TTS jobs after the client disconnects (default: cancel them).
+    # Can be overridden per request with the X-Vanaheim-Finish-In-Background header.
+    FINISH_IN_BACKGROUND: bool = False
+
+    # Time budgets. A job gets JOB_TIMEOUT_SECONDS (+ per requested audio minute for scenarios),
+    # the script stage may use SCRIPT_STAGE_BUDGET_SHARE of it, and each upstream call is capped
+    # by its own timeout and by whatever is left of the stage budget.
+    JOB_TIMEOUT_SECONDS: float = 600
+    JOB_TIMEOUT_PER_MINUTE_SECONDS: float = 60
+    SCRIPT_STAGE_BUDGET_SHARE: float = 0.6
+    LLM_CALL_TIMEOUT_SECONDS: float = 120
+    TTS_CALL_TIMEOUT_SECONDS: float = 30
+
+    # Hedged TTS requests: after the observed latency quantile (per character, times the text length), fire a duplicate request
+    # and keep whichever finishes first. Extra load is capped at TTS_HEDGE_MAX_EXTRA_RATIO.
+    TTS_HEDGE_ENABLED: bool = True
+    TTS_HEDGE_QUANTILE: float = 0.95
+    TTS_HEDGE_MIN_DELAY_SECONDS: float = 0.5
+    TTS_HEDGE_DEFAULT_DELAY_SECONDS: float = 4.0
+    TTS_HEDGE_MAX_EXTRA_RATIO: float = 0.1
+
+    # Adaptive (AIMD) concurrency limits per upstream, shared by all jobs in the process
+    EDGE_TTS_CONCURRENCY_INITIAL: int = 4
+    EDGE_TTS_CONCURRENCY_MAX: int = 32
+    OPENAI_CONCURRENCY_INITIAL: int = 4
+    OPENAI_CONCURRENCY_MAX: int = 16
+    LIMITER_DECREASE_FACTOR: float = 0.5
+    LIMITER_LATENCY_SPIKE_FACTOR: float = 3.0
+    # Segments of one job synthesized concurrently (the limiter still caps upstream calls)
+    TTS_MAX_PARALLEL_SEGMENTS: int = 8
+
+    # Pauses between script segments (ms), spliced in as pre-encoded silence when concatenating:
+    # after a change of speaker (PAUSE_SCENARIO_TURN_MS overrides it per scenario) and between
+    # consecutive lines of the same speaker. 0 = segments back to back.
+    PAUSE_TURN_MS: int = 400
+    PAUSE_SCENARIO_TURN_MS: Dict[str, int] = {"PODCAST": 300, "STORY": 700}
+    PAUSE_SAME_SPEAKER_MS: int = 150
+
+    # Batch TTS (/tts/batch): items per request and items synthesized concurrently
+    BATCH_MAX_ITEMS: int = 500
+    BATCH_MAX_PARALLEL_ITEMS: int = 4
+
+    # Downloads (GET /jobs/{job_id}/audio). DOWNLOAD_OFFLOAD hands file bodies to the fronting
+    # proxy: "x-accel" (nginx internal location DOWNLOAD_OFFLOAD_PREFIX aliased to OUTPUT_DIR) or
+    # "x-sendfile" (Apache/lighttpd). Jobs whose local file is gone redirect to a signed cloud URL.
+    DOWNLOAD_OFFLOAD: str = "none"
+    DOWNLOAD_OFFLOAD_PREFIX: str = "/protected-audio"
+    DOWNLOAD_CACHE_MAX_AGE_SECONDS: int = 3600
+    # Signed cloud URLs: lifetime, and cached in memory until REFRESH_MARGIN seconds before expiry
+    SIGNED_URL_EXPIRES_SECONDS: int = 3600
+    SIGNED_URL_REFRESH_MARGIN_SECONDS: int = 300
+    SIGNED_URL_CACHE_MAX_ENTRIES: int = 10000
+
+    # Job scheduler: concurrent jobs per priority class (interactive = /tts/simple,
+    # batch = LLM jobs) and optional fair-queuing weights per client id (default 1.0)
+    SCHEDULER_INTERACTIVE_SLOTS: int = 32
+    SCHEDULER_BATCH_SLOTS: int = 4
+    SCHEDULER_CLIENT_WEIGHTS: Dict[str, float] = {}
+
+    # Job memory accounting: worker RSS is sampled on every stage change and, between them, on
+    # progress events at most once per MEMORY_SAMPLE_INTERVAL_SECONDS per job (0 = stage changes only)
+    MEMORY_SAMPLE_INTERVAL_SECONDS: float = 1.0
+
+    # Progress events (GET /jobs/{job_id}/events): events buffered per subscriber (a client that
+    # reads too slowly loses the oldest ones), subscribers per job, and SSE keep-alive interval
+    PROGRESS_BUFFER_EVENTS: int = 64
+    PROGRESS_MAX_SUBSCRIBERS: int = 16
+    PROGRESS_HEARTBEAT_SECONDS: float = 15
+
+    # Production runner (python -m app.infrastructure.api.server). WORKERS=0 sizes the pool
+    # to the CPU cores and memory available to the container (WORKER_MEMORY_MB per worker).
+    HOST: str = "0.0.0.0"
+    PORT: int = 8000
+    WORKERS: int = 0
+    WORKER_MEMORY_MB: int = 512
+    SERVER_LOOP: str = "auto"  # uvloop when installed
+    SERVER_HTTP: str = "auto"  # httptools when installed
+    # Graceful drain on SIGTERM: in-flight jobs get DRAIN_TIMEOUT_SECONDS to finish; then jobs
+    # still generating are cancelled (checkpoints kept) and jobs already uploading or saving
+    # their results get DRAIN_FLUSH_SECONDS more.
+    DRAIN_TIMEOUT_SECONDS: float = 120
+    DRAIN_FLUSH_SECONDS: float = 15
     
+    # Admin endpoints (/admin/*) require this token in X-Vanaheim-Admin-Token; unset = disabled
+    ADMIN_TOKEN: Optional[str] = None
+    # Request profiling (X-Vanaheim-Profile: true with the admin token, or POST /admin/profiles/arm):
+    # sampling interval, longest sampled time, distinct stacks per profile, profiles kept (oldest go)
+    PROFILE_DIR: str = os.path.join(os.getcwd(), "data", "profiles")
+    PROFILE_SAMPLE_INTERVAL_SECONDS: float = 0.005
+    PROFILE_MAX_SECONDS: float = 300
+    PROFILE_MAX_STACKS: int = 5000
+    PROFILE_MAX_FILES: int = 20
+
     OPENAI_API_KEY: Optional[str] = None
     SUPABASE_URL: Optional[str] = None
     SUPABASE_KEY: Optional[str] = None
 
+    # Upstream endpoints (default: the public services). Point them at the local
+    # simulators in benchmarks/simulators for offline load tests.
+    OPENAI_BASE_URL: Optional[str] = None
+    EDGE_TTS_WSS_URL: Optional[str] = None
+
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 settings = Settings()
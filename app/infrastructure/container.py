@@ -0,0 +1,129 @@
+from functools import cached_property
+from typing import Optional
+from fastapi import Request
+from app.infrastructure.config.settings import settings
+from app.infrastructure.monitoring.logger import logger
+
+class Container:
+    """
+    Dependency container (composition root) for the API.
+
+    Adapters and services are built on first use, so importing the app or starting
+    a worker does not pay for the OpenAI/Supabase/EdgeTTS clients (or their imports)
+    until a request needs them. One Supabase client is shared by the DB repository
+    and the storage adapter. Created and closed by the FastAPI lifespan; tests and
+    benchmarks can replace any member by assigning it before first use.
+    """
+    def __init__(self):
+        self._supabase_http = None
+
+    @cached_property
+    def supabase_client(self):
+        if not settings.SUPABASE_URL or not settings.SUPABASE_KEY:
+            logger.warning("Supabase credentials missing. Records kept in a local SQLite file; cloud storage disabled.")
+            return None
+        try:
+            import httpx
+            from supabase import create_client
+            from supabase.lib.client_options import SyncClientOptions
+            # Our own HTTP client, so shutdown can close every connection the SDK opened
+            self._supabase_http = httpx.Client(timeout=60.0)
+            return create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY,
+                                 options=SyncClientOptions(httpx_client=self._supabase_http))
+        except Exception as e:
+            logger.error(f"Failed to initialize Supabase client: {e}")
+            return None
+
+    @cached_property
+    def llm_provider(self):
+        from app.infrastructure.adapters.openai_adapter import OpenAIAdapter
+        return OpenAIAdapter()
+
+    @cached_property
+    def tts_provider(self):
+        from app.infrastructure.adapters.edge_tts_adapter import EdgeTTSAdapter
+        return EdgeTTSAdapter()
+
+    @cached_property
+    def storage_provider(self):
+        from app.infrastructure.adapters.file_storage_adapter import FileStorageAdapter
+        return FileStorageAdapter()
+
+    @cached_property
+    def cloud_storage(self):
+        from app.infrastructure.adapters.supabase_storage_adapter import SupabaseStorageAdapter
+        return SupabaseStorageAdapter(client=self.supabase_client)
+
+    @cached_property
+    def db_repository(self):
+        if self.supabase_client is None:
+            from app.infrastructure.adapters.sqlite_simulation_repository import SQLiteSimulationRepository
+            return SQLiteSimulationRepository()
+        from app.infrastructure.adapters.supabase_adapter import SupabaseAdapter
+        return SupabaseAdapter(client=self.supabase_client)
+
+    @cached_property
+    def checkpoint_store(self):
+        from app.infrastructure.adapters.file_checkpoint_adapter import FileCheckpointAdapter
+        return FileCheckpointAdapter()
+
+    @cached_property
+    def artifact_index(self):
+        from app.infrastructure.adapters.sqlite_artifact_index import SQLiteArtifactIndex
+        return SQLiteArtifactIndex()
+
+    @cached_property
+    def voice_catalog(self):
+        from app.infrastructure.adapters.edge_voice_catalog import EdgeVoiceCatalog
+        return EdgeVoiceCatalog()
+
+    @cached_property
+    def janitor(self):
+        from app.infrastructure.maintenance.janitor import ArtifactJanitor
+        # Remote copies can only be confirmed (and are only required) with Supabase configured
+        if self.supabase_client is None:
+            return ArtifactJanitor(self.artifact_index, checkpoints=self.checkpoint_store)
+        return ArtifactJanitor(self.artifact_index, cloud=self.cloud_storage, repository=self.db_repository, checkpoints=self.checkpoint_store)
+
+    @cached_property
+    def script_service(self):
+        from app.application.services.script_generator import ScriptGenerationService
+        return ScriptGenerationService(self.llm_provider, self.checkpoint_store, voices=self.voice_catalog)
+
+    @cached_property
+    def audio_service(self):
+        from app.application.services.audio_generator import AudioGenerationService
+        return AudioGenerationService(self.tts_provider, self.storage_provider, self.cloud_storage, self.checkpoint_store,
+                                      artifacts=self.artifact_index, voices=self.voice_catalog)
+
+    @cached_property
+    def signed_urls(self):
+        """Signed URL cache for cloud objects (None if the cloud storage cannot sign URLs)."""
+        from app.domain.ports import SignedUrlProvider
+        from app.application.services.signed_urls import SignedUrlService
+        if not isinstance(self.cloud_storage, SignedUrlProvider):
+            return None
+        return SignedUrlService(self.cloud_storage)
+
+    @cached_property
+    def scheduler(self):
+        from app.infrastructure.scheduling.scheduler import JobScheduler
+        return JobScheduler.from_settings()
+
+    async def aclose(self):
+        """Closes the network clients (and local databases) that were actually created."""
+        llm_provider: Optional[object] = self.__dict__.get("llm_provider")
+        if llm_provider is not None and hasattr(llm_provider, "aclose"):
+            await llm_provider.aclose()
+        # Local SQLite files
+        for name in ("artifact_index", "db_repository"):
+            member: Optional[object] = self.__dict__.get(name)
+            if member is not None and hasattr(member, "close"):
+                member.close()
+        if self._supabase_http is not None:
+            self._supabase_http.close()
+            self._supabase_http = None
+
+def get_container(request: Request) -> Container:
+    """FastAPI dependency: the container created by the app's lifespan."""
+    return request.app.state.container
@@ -32,4 +32,11 @@ CREATE POLICY "Enable read/write for service role only" ON vanaheim_audio
     FOR ALL
     TO service_role
     USING (true)
-    WITH CHECK (true);
\ No newline at end of file
+    WITH CHECK (true);
+
+-- History queries (GET /simulations): newest first with keyset pagination on (created_at, id),
+-- filtered by configuration containment (model, scenario) and topic substring (ILIKE).
+CREATE INDEX IF NOT EXISTS vanaheim_audio_created_at_id_idx ON vanaheim_audio (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS vanaheim_audio_configuration_idx ON vanaheim_audio USING GIN (configuration jsonb_path_ops);
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS vanaheim_audio_topic_trgm_idx ON vanaheim_audio USING GIN (topic gin_trgm_ops);
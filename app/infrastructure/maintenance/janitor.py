@@ -0,0 +1,186 @@
+import asyncio
+import fcntl
+import os
+import shutil
+import time
+from typing import Callable, List, Optional, Set
+import anyio
+from app.domain.models import ArtifactRecord
+from app.domain.ports import ArtifactIndex, CheckpointStore, CloudObjectChecker, SimulationRepository
+from app.infrastructure.config.settings import settings
+from app.infrastructure.monitoring.logger import logger
+from app.infrastructure.monitoring.metrics import metrics
+
+metrics.describe("janitor_reclaimed_bytes_total", "Local disk bytes freed by the janitor, by reason (quota, age, orphan_temp).")
+metrics.describe("janitor_evictions_skipped_total", "Artifacts kept although eligible for eviction, by reason.")
+metrics.describe("artifact_local_bytes", "Bytes of indexed artifacts on local disk.")
+
+class ArtifactJanitor:
+    """
+    Retention for local artifacts and scratch space.
+
+    Each pass removes temp directories left behind by crashed jobs and checkpoints
+    nobody resumed within CHECKPOINT_RETENTION_HOURS (render caches included), then evicts
+    indexed artifacts idle for longer than ARTIFACT_MAX_AGE_HOURS and, while the
+    artifacts exceed ARTIFACT_QUOTA_MB, the least recently downloaded ones down to
+    the low watermark. With cloud storage configured, a file is only dropped once
+    its remote copy is confirmed (the audio object in the bucket, the script in the
+    DB record); files produced without a cloud upload by design are plain cache.
+    Workers of a host share the data directory, so one pass runs at a time (file lock).
+    Index queries and deletions run in worker threads, a page of candidates at a time.
+    """
+    # Candidates fetched per query while evicting
+    PAGE = 200
+
+    def __init__(self, index: ArtifactIndex, cloud: Optional[CloudObjectChecker] = None,
+                 repository: Optional[SimulationRepository] = None, checkpoints: Optional[CheckpointStore] = None):
+        self.index = index
+        self.cloud = cloud
+        self.repository = repository
+        self.checkpoints = checkpoints
+
+    async def run_once(self) -> int:
+        """One pass; returns the bytes reclaimed (0 if another worker holds the lock)."""
+        lock_path = os.path.join(settings.DATA_DIR, "janitor.lock")
+        os.makedirs(settings.DATA_DIR, exist_ok=True)
+        with open(lock_path, "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0
+            try:
+                reclaimed = await anyio.to_thread.run_sync(sweep_orphan_temp_dirs)
+                if self.checkpoints is not None:
+                    await anyio.to_thread.run_sync(self.checkpoints.purge_expired, settings.CHECKPOINT_RETENTION_HOURS * 3600)
+                reclaimed += await self._evict_expired()
+                reclaimed += await self._enforce_quota()
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+        metrics.set("artifact_local_bytes", await anyio.to_thread.run_sync(self.index.total_bytes))
+        if reclaimed:
+            logger.info(f"Janitor reclaimed {reclaimed / 1e6:.1f} MB.")
+        return reclaimed
+
+    async def _evict_expired(self) -> int:
+        if settings.ARTIFACT_MAX_AGE_HOURS <= 0:
+            return 0
+        cutoff = time.time() - settings.ARTIFACT_MAX_AGE_HOURS * 3600
+        reclaimed, skipped = 0, set()
+        while True:
+            candidates = await anyio.to_thread.run_sync(self._candidates, skipped, cutoff)
+            if not candidates:
+                return reclaimed
+            evictable = [record for record in candidates if await self._confirmed(record, skipped)]
+            reclaimed += await anyio.to_thread.run_sync(self._remove, evictable, "age")
+
+    async def _enforce_quota(self) -> int:
+        if settings.ARTIFACT_QUOTA_MB <= 0:
+            return 0
+        quota = settings.ARTIFACT_QUOTA_MB * 1024 * 1024
+        total = await anyio.to_thread.run_sync(self.index.total_bytes)
+        if total <= quota:
+            return 0
+        target = quota * settings.ARTIFACT_QUOTA_LOW_WATERMARK
+        reclaimed, skipped = 0, set()
+        while total > target:
+            candidates = await anyio.to_thread.run_sync(self._candidates, skipped, None)
+            if not candidates:
+                logger.warning(f"Artifacts use {total / 1e6:.0f} MB over a {quota / 1e6:.0f} MB quota, but nothing more can be evicted.")
+                break
+            evictable = []
+            for record in candidates:
+                if not await self._confirmed(record, skipped):
+                    continue
+                evictable.append(record)
+                total -= record.bytes
+                if total <= target:
+                    break
+            reclaimed += await anyio.to_thread.run_sync(self._remove, evictable, "quota")
+        return reclaimed
+
+    def _candidates(self, skipped: Set[str], accessed_before: Optional[float]) -> List[ArtifactRecord]:
+        # One page of the index (worker thread); files that must be kept are skipped, not re-fetched forever
+        page = self.index.least_recently_used(self.PAGE + len(skipped), accessed_before=accessed_before)
+        return [record for record in page if record.path not in skipped]
+
+    async def _confirmed(self, record: ArtifactRecord, skipped: Set[str]) -> bool:
+        """True if the file may be evicted; otherwise remembers to skip it."""
+        if await self._has_remote_copy(record):
+            return True
+        metrics.inc("janitor_evictions_skipped_total", reason="no_remote_copy")
+        skipped.add(record.path)
+        return False
+
+    def _remove(self, records: List[ArtifactRecord], reason: str) -> int:
+        """Deletes the files and their index entries (worker thread); returns the bytes freed."""
+        reclaimed = 0
+        for record in records:
+            self.index.remove(record.path)
+            try:
+                os.remove(record.path)
+            except FileNotFoundError:
+                # Already gone (deleted by hand): only the index entry was stale
+                continue
+            metrics.inc("janitor_reclaimed_bytes_total", record.bytes, reason=reason)
+            reclaimed += record.bytes
+        return reclaimed
+
+    async def _has_remote_copy(self, record: ArtifactRecord) -> bool:
+        if record.local_only or (self.cloud is None and self.repository is None):
+            return True
+        try:
+            if record.kind == "script":
+                return self.repository is None or bool(await self.repository.get_script_content(record.artifact_id))
+            return self.cloud is None or (bool(record.cloud_path) and await self.cloud.exists(record.cloud_path))
+        except Exception as e:
+            logger.warning(f"Could not confirm the remote copy of {record.path}: {e}")
+            return False
+
+async def run_periodically(get_janitor: Callable[[], ArtifactJanitor], interval: float):
+    """Janitor loop for the app lifespan; the janitor is built on the first pass, after startup."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await get_janitor().run_once()
+        except Exception as e:
+            logger.error(f"Janitor pass failed: {e}")
+
+def sweep_orphan_temp_dirs() -> int:
+    """Removes temp directories untouched for TEMP_ORPHAN_AGE_SECONDS (no live job writes them)."""
+    if not os.path.isdir(settings.TEMP_DIR):
+        return 0
+    cutoff = time.time() - settings.TEMP_ORPHAN_AGE_SECONDS
+    reclaimed = 0
+    for entry in os.scandir(settings.TEMP_DIR):
+        try:
+            if not entry.is_dir(follow_symlinks=False) or _last_write(entry.path) >= cutoff:
+                continue
+            size = _tree_size(entry.path)
+            shutil.rmtree(entry.path)
+            reclaimed += size
+            logger.info(f"Removed orphaned temp directory {entry.path}")
+        except OSError as e:
+            # Another worker may be sweeping the same directory
+            logger.warning(f"Failed to sweep {entry.path}: {e}")
+    metrics.inc("janitor_reclaimed_bytes_total", reclaimed, reason="orphan_temp")
+    return reclaimed
+
+def _last_write(path: str) -> float:
+    latest = os.path.getmtime(path)
+    for root, dirs, files in os.walk(path):
+        for name in files + dirs:
+            try:
+                latest = max(latest, os.path.getmtime(os.path.join(root, name)))
+            except OSError:
+                pass
+    return latest
+
+def _tree_size(path: str) -> int:
+    size = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                size += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return size
@@ -8,6 +8,15 @@ try:
 except ImportError:
     colorlog = None
 
+class LazyFileHandler(logging.FileHandler):
+    """FileHandler that creates its directory and opens the file on the first record, not on import."""
+    def __init__(self, filename: str, encoding: str = "utf-8"):
+        super().__init__(filename, encoding=encoding, delay=True)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
 def setup_logging():
     """
     Configures the application logger with console (colored) and file handlers.
@@ -42,10 +51,9 @@ def setup_logging():
     console_handler.setFormatter(formatter)
     
     # 2. File Handler (Persistent Trace)
-    # The code automatically creates this directory.
+    # The directory and file are created when the first record is written.
     log_dir = "logs" 
-    os.makedirs(log_dir, exist_ok=True)
-    file_handler = logging.FileHandler(os.path.join(log_dir, "vanaheim.log"), encoding='utf-8')
+    file_handler = LazyFileHandler(os.path.join(log_dir, "vanaheim.log"))
     file_formatter = logging.Formatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s'
     )
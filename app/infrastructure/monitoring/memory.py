@@ -0,0 +1,157 @@
+"""
+Memory accounting of generation jobs.
+
+Worker RSS is sampled (one read of /proc/self/statm) whenever a job changes stage, and on its
+progress events at most once per MEMORY_SAMPLE_INTERVAL_SECONDS, so every job knows the peak it
+ran into and how much each stage grew the process.
+With allocation tracing on (POST /admin/memory/tracing) each stage boundary also takes a
+tracemalloc snapshot and logs the allocation sites that grew most during the stage. RSS and
+snapshots are process-wide: with concurrent jobs they include the neighbours' allocations.
+"""
+import os
+import time
+import tracemalloc
+from collections import deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Deque, Dict, List, Optional
+from app.infrastructure.config.settings import settings
+from app.infrastructure.monitoring.logger import logger
+from app.infrastructure.monitoring.metrics import metrics
+
+if TYPE_CHECKING:
+    from app.application.job_context import JobContext
+
+metrics.describe("process_resident_bytes", "Resident memory of this worker at the last sample.")
+metrics.describe("job_peak_resident_bytes", "Worker RSS peak seen by the last finished job of each kind.")
+metrics.describe("stage_memory_growth_bytes_total", "RSS growth while jobs were in each stage (growing stages only).")
+metrics.describe("stage_traced_growth_bytes_total", "Net Python allocations during each stage while allocation tracing is on.")
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+# Allocations of the profiler itself and of imports are noise
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+def resident_bytes() -> int:
+    """Current RSS of this process (0 where /proc is not available)."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return 0
+
+@dataclass
+class JobMemory:
+    """Memory seen by one job: RSS peak (and the stage it happened in) and stage baselines."""
+    peak_bytes: int = 0
+    peak_stage: Optional[str] = None
+    stage_start_bytes: int = 0
+    sampled_at: float = 0.0
+    # Allocation sizes by traceback at the start of the stage (allocation tracing only)
+    traced: Optional[Dict[tracemalloc.Traceback, int]] = field(default=None, repr=False)
+
+class MemoryAccounting:
+    """Samples RSS for jobs and, while tracing is on, diffs tracemalloc snapshots per stage."""
+    def __init__(self, recent_reports: int = 50):
+        self.top_sites = 10
+        # Latest stage diffs, for GET /admin/memory
+        self.reports: Deque[dict] = deque(maxlen=recent_reports)
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start_tracing(self, frames: int = 1, top_sites: int = 10):
+        self.top_sites = top_sites
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            logger.warning(f"Allocation tracing on ({frames} frames): stage changes take tracemalloc snapshots.")
+
+    def stop_tracing(self):
+        if tracemalloc.is_tracing():
+            # Frees the traces; jobs still holding a baseline just skip their next diff
+            tracemalloc.stop()
+            logger.warning("Allocation tracing off.")
+
+    def sample(self, job: "JobContext") -> int:
+        return self._sample(job.memory, job.stage)
+
+    def progress(self, job: "JobContext"):
+        """Samples on a progress event, unless this job was sampled less than the interval ago."""
+        interval = settings.MEMORY_SAMPLE_INTERVAL_SECONDS
+        if interval > 0 and time.monotonic() - job.memory.sampled_at >= interval:
+            self._sample(job.memory, job.stage)
+
+    @staticmethod
+    def _sample(usage: JobMemory, stage: str) -> int:
+        usage.sampled_at = time.monotonic()
+        rss = resident_bytes()
+        metrics.set("process_resident_bytes", rss)
+        if rss > usage.peak_bytes:
+            usage.peak_bytes, usage.peak_stage = rss, stage
+        return rss
+
+    def stage_changed(self, job: "JobContext", previous: str):
+        """Closes the accounting of `previous`; call with job.stage already set to the new stage."""
+        usage = job.memory
+        rss = self._sample(usage, previous)
+        if usage.stage_start_bytes and rss > usage.stage_start_bytes:
+            metrics.inc("stage_memory_growth_bytes_total", rss - usage.stage_start_bytes, stage=previous)
+        usage.stage_start_bytes = rss
+
+        if not tracemalloc.is_tracing():
+            usage.traced = None
+            return
+        traced = _traced_by_site()
+        if usage.traced is not None:
+            self._report_stage(job, previous, usage.traced, traced)
+        usage.traced = traced
+
+    def job_finished(self, job: "JobContext"):
+        self.stage_changed(job, job.stage)
+        metrics.set("job_peak_resident_bytes", job.memory.peak_bytes, kind=job.kind)
+        if job.memory.peak_bytes:
+            logger.info(f"Job {job.job_id} ({job.kind}): worker RSS peaked at {job.memory.peak_bytes / 2**20:.1f} MB during '{job.memory.peak_stage}'.")
+
+    def _report_stage(self, job: "JobContext", stage: str, before: Dict[tracemalloc.Traceback, int], after: Dict[tracemalloc.Traceback, int]):
+        growth = {site: size - before.get(site, 0) for site, size in after.items()}
+        net = sum(after.values()) - sum(before.values())
+        top = sorted(((size, site) for site, size in growth.items() if size > 0), key=lambda item: item[0], reverse=True)[:self.top_sites]
+        if net > 0:
+            metrics.inc("stage_traced_growth_bytes_total", net, stage=stage)
+        report = {
+            "job_id": job.job_id,
+            "stage": stage,
+            "traced_growth_bytes": net,
+            "top": [{"site": _site(site), "growth_bytes": size} for size, site in top],
+        }
+        self.reports.append(report)
+        sites = ", ".join(f"{entry['site']} {entry['growth_bytes'] / 1024:+.0f} KB" for entry in report["top"][:3])
+        logger.info(f"Job {job.job_id} stage '{stage}': {net / 2**20:+.2f} MB traced ({sites or 'no growth'}).")
+
+    def snapshot(self, jobs: List["JobContext"]) -> dict:
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "resident_bytes": resident_bytes(),
+            "tracing": self.tracing,
+            "traced": {"current_bytes": current, "peak_bytes": peak} if self.tracing else None,
+            "jobs": [
+                {"job_id": job.job_id, "kind": job.kind, "stage": job.stage,
+                 "peak_resident_bytes": job.memory.peak_bytes, "peak_stage": job.memory.peak_stage}
+                for job in jobs
+            ],
+            "stages": list(self.reports),
+        }
+
+def _traced_by_site() -> Dict[tracemalloc.Traceback, int]:
+    snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+    return {stat.traceback: stat.size for stat in snapshot.statistics("traceback")}
+
+def _site(traceback: tracemalloc.Traceback) -> str:
+    # Innermost frame first; deeper frames (frames > 1) show who called it
+    return " <- ".join(f"{os.path.relpath(frame.filename)}:{frame.lineno}" for frame in reversed(traceback))
+
+memory = MemoryAccounting()
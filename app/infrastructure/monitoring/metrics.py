@@ -0,0 +1,67 @@
+import threading
+from typing import Dict, Tuple
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+class MetricsRegistry:
+    """
+    Minimal in-process metrics registry (counters and gauges) with a
+    Prometheus text exposition. Cheap enough to update on hot paths.
+    """
+    def __init__(self, prefix: str = "vanaheim"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelSet, float]] = {}
+        self._gauges: Dict[str, Dict[LabelSet, float]] = {}
+        self._help: Dict[str, str] = {}
+
+    @staticmethod
+    def _labels(labels: Dict[str, str]) -> LabelSet:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = self._labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        key = self._labels(labels)
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+
+    def get(self, name: str, **labels) -> float:
+        key = self._labels(labels)
+        with self._lock:
+            for family in (self._counters, self._gauges):
+                if name in family and key in family[name]:
+                    return family[name][key]
+        return 0
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """JSON-friendly view: {metric: {"label=value,...": value}}."""
+        with self._lock:
+            out = {}
+            for family in (self._counters, self._gauges):
+                for name, series in family.items():
+                    out[name] = {",".join(f"{k}={v}" for k, v in key): val for key, val in series.items()}
+            return out
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for kind, family in (("counter", self._counters), ("gauge", self._gauges)):
+                for name, series in sorted(family.items()):
+                    full_name = f"{self.prefix}_{name}"
+                    if name in self._help:
+                        lines.append(f"# HELP {full_name} {self._help[name]}")
+                    lines.append(f"# TYPE {full_name} {kind}")
+                    for key, value in series.items():
+                        label_str = ",".join(f'{k}="{v}"' for k, v in key)
+                        lines.append(f"{full_name}{{{label_str}}} {value}" if label_str else f"{full_name} {value}")
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
@@ -0,0 +1,195 @@
+"""
+Request-scoped sampling profiler.
+
+A profiled request gets a sampler thread that reads the event loop thread's stack every
+PROFILE_SAMPLE_INTERVAL_SECONDS. A sample counts only when the task running at that instant
+belongs to the request: the request's own task, or any task created from its context (task
+groups of the pipeline, Starlette's call_next), which a loop task factory tags as they are
+created. Samples taken while none of them runs go to an `[awaiting]` frame, so the profile
+also shows how much of the wall time was spent waiting on upstreams (or on other requests).
+
+Profiles are written as folded stacks (`frame;frame;frame count`, for flamegraph.pl or
+speedscope) to PROFILE_DIR, named by request id, with a JSON sidecar. Work offloaded to
+threads (anyio.to_thread) is not sampled.
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import weakref
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+import anyio
+from app.infrastructure.config.settings import settings
+from app.infrastructure.monitoring.logger import logger
+from app.infrastructure.monitoring.metrics import metrics
+
+metrics.describe("profiles_total", "Profiled requests, by outcome (saved, busy).")
+
+_ASYNCIO_DIR = os.path.dirname(asyncio.__file__)
+# Stand-in stacks: the request was waiting, or had more distinct stacks than PROFILE_MAX_STACKS
+AWAITING, TRUNCATED = "[awaiting]", "[truncated]"
+
+_active: ContextVar[Optional["RequestProfile"]] = ContextVar("vanaheim_profile", default=None)
+
+class RequestProfile:
+    """Samples of one request: counts per folded stack, filled by the sampler thread."""
+    def __init__(self, request_id: str, method: str, path: str):
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.tasks: "weakref.WeakSet[asyncio.Task]" = weakref.WeakSet()
+        self.stacks: Dict[str, int] = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._token = None
+
+    def _record(self, stack: str):
+        if stack not in self.stacks and len(self.stacks) >= settings.PROFILE_MAX_STACKS:
+            stack = TRUNCATED
+        self.stacks[stack] = self.stacks.get(stack, 0) + 1
+        self.samples += 1
+
+    def _sample_loop(self, loop: asyncio.AbstractEventLoop, loop_thread_id: int):
+        deadline = time.monotonic() + settings.PROFILE_MAX_SECONDS
+        while not self._stop.wait(settings.PROFILE_SAMPLE_INTERVAL_SECONDS) and time.monotonic() < deadline:
+            # Task and frame are read a moment apart: a sample may land on the neighbour at a task switch
+            task = asyncio.current_task(loop)
+            frame = sys._current_frames().get(loop_thread_id)
+            if task is None or frame is None or task not in self.tasks:
+                self._record(AWAITING)
+            else:
+                self._record(_folded(frame))
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        self._thread = threading.Thread(
+            target=self._sample_loop, args=(loop, threading.get_ident()), name=f"profiler-{self.request_id}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+def _folded(frame) -> str:
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        # Below the task step is the event loop itself, the same for every sample
+        if code.co_name == "_run" and code.co_filename.startswith(_ASYNCIO_DIR):
+            break
+        frames.append(f"{code.co_name} ({os.path.relpath(code.co_filename)}:{code.co_firstlineno})".replace(";", ","))
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+def _task_factory(previous):
+    def factory(loop, coro, **kwargs):
+        task = previous(loop, coro, **kwargs) if previous else asyncio.Task(coro, loop=loop, **kwargs)
+        context = kwargs.get("context")
+        profile = context.get(_active) if context is not None else _active.get()
+        if profile is not None:
+            profile.tasks.add(task)
+        return task
+    factory.vanaheim_profiler = True
+    return factory
+
+class Profiler:
+    """Starts, stores and lists request profiles; one request is profiled at a time per worker."""
+    def __init__(self):
+        self.current: Optional[RequestProfile] = None
+        # Admin toggle: profile the next `armed` requests whose path starts with `armed_prefix`
+        self.armed = 0
+        self.armed_prefix = "/"
+
+    def arm(self, requests: int, path_prefix: str):
+        self.armed, self.armed_prefix = requests, path_prefix
+
+    def wanted(self, path: str, header_requested: bool) -> bool:
+        if header_requested:
+            return True
+        if self.armed > 0 and path.startswith(self.armed_prefix):
+            self.armed -= 1
+            return True
+        return False
+
+    def begin(self, request_id: str, method: str, path: str) -> Optional[RequestProfile]:
+        """Starts profiling the current task and what it spawns; None if another request is being profiled."""
+        if self.current is not None:
+            metrics.inc("profiles_total", outcome="busy")
+            return None
+        loop = asyncio.get_running_loop()
+        previous = loop.get_task_factory()
+        if not getattr(previous, "vanaheim_profiler", False):
+            loop.set_task_factory(_task_factory(previous))
+        profile = RequestProfile(request_id, method, path)
+        profile.tasks.add(asyncio.current_task())
+        profile._token = _active.set(profile)
+        self.current = profile
+        profile.start(loop)
+        return profile
+
+    async def end(self, profile: RequestProfile) -> str:
+        _active.reset(profile._token)
+        self.current = None
+        profile.stop()
+        path = await anyio.to_thread.run_sync(self._save, profile)
+        metrics.inc("profiles_total", outcome="saved")
+        logger.info(f"Profiled {profile.method} {profile.path} ({profile.samples} samples): {path}")
+        return path
+
+    def _save(self, profile: RequestProfile) -> str:
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        path = os.path.join(settings.PROFILE_DIR, f"{profile.request_id}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in sorted(profile.stacks.items(), key=lambda item: item[1], reverse=True):
+                f.write(f"{stack} {count}\n")
+        with open(os.path.join(settings.PROFILE_DIR, f"{profile.request_id}.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "request_id": profile.request_id,
+                "method": profile.method,
+                "path": profile.path,
+                "started_at": profile.started_at,
+                "samples": profile.samples,
+                "interval_seconds": settings.PROFILE_SAMPLE_INTERVAL_SECONDS,
+                "stacks": len(profile.stacks),
+            }, f)
+        self._evict()
+        return path
+
+    def _evict(self):
+        entries = self.profiles()
+        for entry in entries[settings.PROFILE_MAX_FILES:]:
+            for suffix in (".folded", ".json"):
+                try:
+                    os.remove(os.path.join(settings.PROFILE_DIR, entry["request_id"] + suffix))
+                except FileNotFoundError:
+                    pass
+
+    def profiles(self) -> List[dict]:
+        """Stored profiles, newest first."""
+        if not os.path.isdir(settings.PROFILE_DIR):
+            return []
+        entries = []
+        for name in os.listdir(settings.PROFILE_DIR):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(settings.PROFILE_DIR, name), encoding="utf-8") as f:
+                    entry = json.load(f)
+                entry["bytes"] = os.path.getsize(self.path(entry["request_id"]))
+            except (OSError, ValueError, KeyError):
+                continue
+            entries.append(entry)
+        return sorted(entries, key=lambda entry: entry["started_at"], reverse=True)
+
+    @staticmethod
+    def path(request_id: str) -> str:
+        return os.path.join(settings.PROFILE_DIR, f"{request_id}.folded")
+
+profiler = Profiler()
@@ -0,0 +1,195 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from app.application.job_context import job_context
+from app.infrastructure.config.settings import settings
+from app.infrastructure.monitoring.logger import logger
+from app.infrastructure.monitoring.metrics import metrics
+
+metrics.describe("concurrency_limit", "Current adaptive concurrency limit per upstream.")
+metrics.describe("upstream_in_flight", "Upstream calls currently in flight.")
+metrics.describe("limiter_decisions_total", "AIMD limiter decisions (increase/decrease) per upstream and reason.")
+
+def overload_reason(exc: BaseException) -> Optional[str]:
+    """Classifies an upstream failure as an overload signal ('throttled'/'timeout'), or None."""
+    if isinstance(exc, (TimeoutError, asyncio.TimeoutError)) or "Timeout" in type(exc).__name__:
+        return "timeout"
+    status = getattr(exc, "status_code", None) or getattr(exc, "status", None)
+    if status == 429 or "RateLimit" in type(exc).__name__:
+        return "throttled"
+    return None
+
+class LimitedCall:
+    """The call inside `AdaptiveLimiter.acquire`; `work` may be filled in once the reply is known."""
+    def __init__(self, work: Optional[float] = None):
+        self.work = work
+
+class AdaptiveLimiter:
+    """
+    AIMD (additive increase, multiplicative decrease) concurrency limiter.
+
+    Every healthy call grows the limit by `increase / limit`, i.e. roughly +1 per
+    "round" of calls. A 429, a timeout or a latency spike multiplies it by
+    `decrease_factor`, at most once per cooldown so one burst of failures only counts
+    once. Latency is only judged per unit of work (seconds per character or token,
+    reported by the caller) against a healthy baseline of the same: a long text is
+    not a spike. Calls that report no work are judged on errors alone.
+    """
+    def __init__(self, name: str, initial_limit: float = 4, min_limit: float = 1, max_limit: float = 32,
+                 increase: float = 1.0, decrease_factor: float = 0.5, latency_spike_factor: float = 3.0,
+                 cooldown_seconds: float = 1.0, min_samples: int = 10):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_spike_factor = latency_spike_factor
+        self.cooldown_seconds = cooldown_seconds
+        self.min_samples = min_samples
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.baseline_seconds_per_unit: Optional[float] = None
+        self._samples = 0
+        self._last_decrease = 0.0
+        # Heap of (job priority, arrival, future): interactive jobs skip ahead of batch segments
+        self._waiters = []
+        self._seq = itertools.count()
+        self.decisions = deque(maxlen=50)
+        self._publish()
+
+    @property
+    def effective_limit(self) -> int:
+        return max(1, int(self.limit))
+
+    async def _acquire_slot(self):
+        if self.in_flight < self.effective_limit and not self._waiters:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (job_context().priority, next(self._seq), waiter)
+        heapq.heappush(self._waiters, entry)
+        self.waiting += 1
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed to us just as we got cancelled: pass it on
+                self._release_slot()
+            elif entry in self._waiters:
+                # A wake-up may already have popped (and skipped) our cancelled entry
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            raise
+        finally:
+            self.waiting -= 1
+
+    def _release_slot(self):
+        # Synchronous on purpose: it runs in `finally` blocks of cancelled calls
+        self.in_flight -= 1
+        self._wake_waiters()
+
+    def _wake_waiters(self):
+        while self._waiters and self.in_flight < self.effective_limit:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    @asynccontextmanager
+    async def acquire(self, work: Optional[float] = None):
+        """
+        Waits for a free slot, then reports the call's outcome when the block exits. `work` is
+        the size of the call (e.g. characters); set `call.work` in the block if it is only known
+        from the reply (e.g. completion tokens).
+        """
+        await self._acquire_slot()
+        self._publish()
+
+        call = LimitedCall(work)
+        started = time.monotonic()
+        try:
+            yield call
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            reason = overload_reason(e)
+            if reason:
+                self.record_overload(reason)
+            raise
+        else:
+            self.record_success(time.monotonic() - started, call.work)
+        finally:
+            self._release_slot()
+            self._publish()
+
+    def record_success(self, latency: float, work: Optional[float] = None):
+        if work:
+            per_unit = latency / work
+            baseline = self.baseline_seconds_per_unit
+            if self._samples >= self.min_samples and baseline and per_unit > baseline * self.latency_spike_factor:
+                self.record_overload("latency_spike")
+                return
+            self._samples += 1
+            # Slow EWMA: the baseline follows healthy latency without chasing spikes
+            self.baseline_seconds_per_unit = per_unit if baseline is None else 0.9 * baseline + 0.1 * per_unit
+        if self.limit < self.max_limit:
+            self._decide("increase", min(self.max_limit, self.limit + self.increase / self.limit), "healthy")
+
+    def record_overload(self, reason: str):
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown_seconds:
+            return
+        self._last_decrease = now
+        self._decide("decrease", max(self.min_limit, self.limit * self.decrease_factor), reason)
+
+    def _decide(self, action: str, new_limit: float, reason: str):
+        old_limit, self.limit = self.limit, new_limit
+        metrics.inc("limiter_decisions_total", upstream=self.name, action=action, reason=reason)
+        # Healthy increases are frequent and tiny; only record whole-step changes and decreases
+        if action == "decrease" or int(new_limit) != int(old_limit):
+            self.decisions.append({"at": time.time(), "action": action, "reason": reason, "from": round(old_limit, 2), "to": round(new_limit, 2)})
+            if action == "decrease":
+                logger.warning(f"Limiter {self.name}: {reason}, concurrency {old_limit:.1f} -> {new_limit:.1f}")
+        if action == "increase":
+            self._wake_waiters()
+        self._publish()
+
+    def _publish(self):
+        metrics.set("concurrency_limit", round(self.limit, 2), upstream=self.name)
+        metrics.set("upstream_in_flight", self.in_flight, upstream=self.name)
+
+    def snapshot(self) -> dict:
+        return {
+            "upstream": self.name,
+            "limit": round(self.limit, 2),
+            "effective_limit": self.effective_limit,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "baseline_seconds_per_unit": round(self.baseline_seconds_per_unit, 6) if self.baseline_seconds_per_unit else None,
+            "recent_decisions": list(self.decisions),
+        }
+
+_limiters: Dict[str, AdaptiveLimiter] = {}
+
+def get_limiter(name: str) -> AdaptiveLimiter:
+    """Process-wide limiter per upstream, shared by every adapter instance that calls it."""
+    if name not in _limiters:
+        prefix = name.upper()
+        _limiters[name] = AdaptiveLimiter(
+            name,
+            initial_limit=getattr(settings, f"{prefix}_CONCURRENCY_INITIAL", 4),
+            min_limit=getattr(settings, f"{prefix}_CONCURRENCY_MIN", 1),
+            max_limit=getattr(settings, f"{prefix}_CONCURRENCY_MAX", 32),
+            decrease_factor=settings.LIMITER_DECREASE_FACTOR,
+            latency_spike_factor=settings.LIMITER_LATENCY_SPIKE_FACTOR
+        )
+    return _limiters[name]
+
+def all_limiters() -> Dict[str, AdaptiveLimiter]:
+    return dict(_limiters)
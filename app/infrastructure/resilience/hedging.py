@@ -0,0 +1,120 @@
+import time
+from collections import deque
+from typing import Awaitable, Callable, List, Optional, TypeVar
+import anyio
+from app.infrastructure.monitoring.logger import logger
+from app.infrastructure.monitoring.metrics import metrics
+
+T = TypeVar("T")
+
+metrics.describe("hedged_requests_total", "Duplicate (hedge) requests launched for slow upstream calls.")
+metrics.describe("hedge_wins_total", "Hedged calls where the duplicate finished first.")
+
+class LatencyTracker:
+    """Sliding window of recent call latencies (seconds) with quantile lookup."""
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+class Hedger:
+    """
+    Hedged requests for idempotent upstream calls.
+
+    The primary attempt starts immediately. If it has not finished after the observed
+    latency quantile (e.g. p95), a second attempt is launched and the first successful
+    one wins; the other is cancelled. Hedges are capped to `max_extra_ratio` of all calls
+    so a slow upstream is not hit with double load. Calls that pass their `work` (e.g. the
+    text length) are timed per unit, and their delay is the quantile scaled by their own
+    size: a long text is not hedged merely for being long, nor a short one left waiting.
+    """
+    def __init__(self, name: str, quantile: float = 0.95, min_delay: float = 0.5, default_delay: float = 4.0,
+                 max_extra_ratio: float = 0.1, min_samples: int = 20, enabled: bool = True,
+                 guard: Optional[Callable[[], bool]] = None):
+        self.name = name
+        self.quantile = quantile
+        self.min_delay = min_delay
+        self.default_delay = default_delay
+        self.max_extra_ratio = max_extra_ratio
+        self.min_samples = min_samples
+        self.enabled = enabled
+        # Extra veto, e.g. "the upstream limiter has no queue" (a hedge would only wait in line)
+        self.guard = guard
+        self.latencies = LatencyTracker()
+        # Seconds per unit of work, for calls that report their size
+        self.unit_latencies = LatencyTracker()
+        self.calls = 0
+        self.hedges = 0
+
+    def hedge_delay(self, work: Optional[float] = None) -> float:
+        if work:
+            if len(self.unit_latencies) < self.min_samples:
+                return self.default_delay
+            return max(self.min_delay, self.unit_latencies.quantile(self.quantile) * work)
+        if len(self.latencies) < self.min_samples:
+            return self.default_delay
+        return max(self.min_delay, self.latencies.quantile(self.quantile))
+
+    def _may_hedge(self) -> bool:
+        # One hedge of headroom, then at most max_extra_ratio of all calls
+        if not self.enabled or (self.guard and not self.guard()):
+            return False
+        return self.hedges < 1 + self.max_extra_ratio * self.calls
+
+    async def run(self, attempt: Callable[[int], Awaitable[T]], work: Optional[float] = None) -> T:
+        """Runs `attempt(0)` and possibly `attempt(1)`; returns the first successful result."""
+        self.calls += 1
+        outcome = {}
+        errors: List[Exception] = []
+        running = 0
+
+        # The task group only exits once every attempt has unwound, also when the caller's
+        # deadline (anyio.fail_after) cancels it, so a loser's cleanup always runs
+        async with anyio.create_task_group() as tg:
+            async def _attempt(index: int):
+                nonlocal running
+                started = time.monotonic()
+                try:
+                    result = await attempt(index)
+                except Exception as e:
+                    errors.append(e)
+                    running -= 1
+                    if not running:
+                        tg.cancel_scope.cancel()
+                    return
+                elapsed = time.monotonic() - started
+                if work:
+                    self.unit_latencies.record(elapsed / work)
+                else:
+                    self.latencies.record(elapsed)
+                if index > 0:
+                    metrics.inc("hedge_wins_total", upstream=self.name)
+                outcome["result"] = result
+                tg.cancel_scope.cancel()
+
+            running = 1
+            tg.start_soon(_attempt, 0)
+            delay = self.hedge_delay(work)
+            await anyio.sleep(delay)
+            # Still running (a finished or failed primary has cancelled the sleep)
+            if self._may_hedge():
+                self.hedges += 1
+                metrics.inc("hedged_requests_total", upstream=self.name)
+                logger.debug(f"Hedging slow {self.name} call after {delay:.2f}s")
+                running += 1
+                tg.start_soon(_attempt, 1)
+
+        if "result" in outcome:
+            return outcome["result"]
+        raise errors[-1]
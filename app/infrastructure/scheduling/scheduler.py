@@ -0,0 +1,141 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from enum import Enum
+from typing import Dict, Optional
+from app.infrastructure.config.settings import settings
+from app.infrastructure.monitoring.metrics import metrics
+
+metrics.describe("scheduler_queued", "Jobs waiting for a slot, per priority class.")
+metrics.describe("scheduler_running", "Jobs holding a slot, per priority class.")
+metrics.describe("scheduler_wait_seconds_total", "Total time jobs spent queued, per priority class.")
+metrics.describe("scheduler_admitted_total", "Jobs admitted, per priority class.")
+
+class PriorityClass(str, Enum):
+    INTERACTIVE = "interactive"  # /tts/simple: short, latency-sensitive
+    BATCH = "batch"              # LLM scenario/prompt jobs: long-running
+
+    @property
+    def rank(self) -> int:
+        """Lower runs first (also used by the upstream limiters to order their queues)."""
+        return 0 if self is PriorityClass.INTERACTIVE else 1
+
+class _ClassQueue:
+    """
+    Slots and weighted-fair queue of one priority class.
+
+    Start-time fair queuing: each request gets a virtual start tag
+    max(virtual_time, client's last finish tag) and a finish tag start + cost/weight.
+    The lowest start tag is admitted first, so a client that queued many (or large)
+    jobs cannot starve clients with fewer.
+    """
+    def __init__(self, priority: PriorityClass, slots: int):
+        self.priority = priority
+        self.slots = slots
+        self.running = 0
+        self.virtual_time = 0.0
+        self.last_finish: Dict[str, float] = {}
+        self.heap = []
+        self.seq = itertools.count()
+
+    def tag(self, client_id: str, cost: float, weight: float) -> float:
+        start = max(self.virtual_time, self.last_finish.get(client_id, 0.0))
+        self.last_finish[client_id] = start + cost / max(weight, 1e-6)
+        return start
+
+    def untag(self, client_id: str, finish_tag: float, previous: Optional[float]):
+        """Rolls back the tag of a request that left without running, unless a later one chained on it."""
+        if self.last_finish.get(client_id) != finish_tag:
+            return
+        if previous is None:
+            del self.last_finish[client_id]
+        else:
+            self.last_finish[client_id] = previous
+
+    def admit(self, start_tag: float):
+        self.running += 1
+        self.virtual_time = max(self.virtual_time, start_tag)
+        # Clients whose last finish tag is in the past are indistinguishable from new ones
+        if len(self.last_finish) > 1024:
+            self.last_finish = {c: t for c, t in self.last_finish.items() if t > self.virtual_time}
+
+    def publish(self):
+        metrics.set("scheduler_queued", len(self.heap), priority=self.priority.value)
+        metrics.set("scheduler_running", self.running, priority=self.priority.value)
+
+class JobScheduler:
+    """
+    Admission control for generation jobs: separate slot pools per priority class
+    (so interactive requests never wait behind batch jobs) and weighted fair
+    queuing per client inside each class.
+    """
+    def __init__(self, slots: Dict[PriorityClass, int], client_weights: Optional[Dict[str, float]] = None):
+        self.queues = {priority: _ClassQueue(priority, count) for priority, count in slots.items()}
+        self.client_weights = client_weights or {}
+
+    @classmethod
+    def from_settings(cls) -> "JobScheduler":
+        return cls(
+            {
+                PriorityClass.INTERACTIVE: settings.SCHEDULER_INTERACTIVE_SLOTS,
+                PriorityClass.BATCH: settings.SCHEDULER_BATCH_SLOTS,
+            },
+            client_weights=settings.SCHEDULER_CLIENT_WEIGHTS
+        )
+
+    @asynccontextmanager
+    async def slot(self, priority: PriorityClass, client_id: str, cost: float = 1.0):
+        """Holds one slot of `priority` for the duration of the block."""
+        queue = self.queues[priority]
+        previous_finish = queue.last_finish.get(client_id)
+        start_tag = queue.tag(client_id, cost, self.client_weights.get(client_id, 1.0))
+        finish_tag = queue.last_finish[client_id]
+        queued_at = time.monotonic()
+
+        if queue.running < queue.slots and not queue.heap:
+            queue.admit(start_tag)
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            entry = (start_tag, next(queue.seq), waiter)
+            heapq.heappush(queue.heap, entry)
+            queue.publish()
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._release(queue)
+                else:
+                    # A release may already have popped (and skipped) our cancelled entry
+                    if entry in queue.heap:
+                        queue.heap.remove(entry)
+                        heapq.heapify(queue.heap)
+                    # It never ran: its tenant should not be charged for it
+                    queue.untag(client_id, finish_tag, previous_finish)
+                    queue.publish()
+                raise
+
+        metrics.inc("scheduler_admitted_total", priority=priority.value)
+        metrics.inc("scheduler_wait_seconds_total", time.monotonic() - queued_at, priority=priority.value)
+        queue.publish()
+        try:
+            yield
+        finally:
+            self._release(queue)
+
+    def _release(self, queue: _ClassQueue):
+        # Synchronous so it is safe in `finally` blocks of cancelled jobs
+        queue.running -= 1
+        while queue.heap and queue.running < queue.slots:
+            start_tag, _, waiter = heapq.heappop(queue.heap)
+            if not waiter.done():
+                queue.admit(start_tag)
+                waiter.set_result(None)
+        queue.publish()
+
+    def snapshot(self) -> dict:
+        return {
+            priority.value: {"slots": q.slots, "running": q.running, "queued": len(q.heap)}
+            for priority, q in self.queues.items()
+        }
@@ -0,0 +1,67 @@
+"""
+Script persistence format.
+
+A job serializes its script once (compact UTF-8 JSON) and reuses those bytes for the
+script file, the DB record and responses. Optionally compressed with gzip on disk
+(SCRIPT_FILE_COMPRESSION: `.json.gz` files) and at rest in the DB (SCRIPT_DB_COMPRESSION:
+base64 text with a `gzip:` prefix). Readers accept every form, whatever the settings.
+"""
+import base64
+import gzip
+from functools import cached_property
+from typing import Optional
+import pydantic_core
+from app.domain.models import Script
+from app.infrastructure.config.settings import settings
+from app.infrastructure.monitoring.metrics import metrics
+
+metrics.describe("script_stored_bytes_total", "Bytes of scripts written, by target (file, db) and encoding (json, gzip).")
+
+# Marks compressed script_content; plain JSON always starts with "{"
+DB_GZIP_PREFIX = "gzip:"
+
+class EncodedScript:
+    """A script serialized once; each stored form is derived from the same bytes on first use."""
+    def __init__(self, script: Script):
+        self.json_bytes: bytes = pydantic_core.to_json(script)
+
+    @cached_property
+    def text(self) -> str:
+        return self.json_bytes.decode("utf-8")
+
+    @cached_property
+    def gzip_bytes(self) -> bytes:
+        # mtime=0: identical scripts give identical files (stable checksums in the artifact index)
+        return gzip.compress(self.json_bytes, compresslevel=6, mtime=0)
+
+    @property
+    def file_suffix(self) -> str:
+        return ".json.gz" if settings.SCRIPT_FILE_COMPRESSION else ".json"
+
+    def file_content(self) -> bytes:
+        content = self.gzip_bytes if settings.SCRIPT_FILE_COMPRESSION else self.json_bytes
+        metrics.inc("script_stored_bytes_total", len(content), target="file", encoding="gzip" if settings.SCRIPT_FILE_COMPRESSION else "json")
+        return content
+
+    def db_content(self) -> str:
+        """script_content for the DB record."""
+        if not settings.SCRIPT_DB_COMPRESSION:
+            content = self.text
+        else:
+            content = DB_GZIP_PREFIX + base64.b64encode(self.gzip_bytes).decode("ascii")
+        metrics.inc("script_stored_bytes_total", len(content), target="db", encoding="gzip" if settings.SCRIPT_DB_COMPRESSION else "json")
+        return content
+
+def decode_db_content(content: Optional[str]) -> Optional[str]:
+    """The script JSON of a stored script_content (compressed or not)."""
+    if content and content.startswith(DB_GZIP_PREFIX):
+        return gzip.decompress(base64.b64decode(content[len(DB_GZIP_PREFIX):])).decode("utf-8")
+    return content
+
+def read_script_file(path: str) -> Script:
+    with open(path, "rb") as f:
+        data = f.read()
+    # By content, not name: the gzip magic number
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    return Script.model_validate_json(data)
@@ -0,0 +1,199 @@
+"""
+Deterministic, offline stand-ins for the pipeline's ports.
+
+Latencies follow log-normal distributions (seeded, so two runs see the same
+sequence) shaped after production observations, and can be compressed with
+`time_scale` to keep benchmark runs short without changing their shape.
+Audio payloads are real MPEG frames (or Ogg Opus pages) sized like EdgeTTS
+output for the requested format, so file I/O and concatenation cost is realistic.
+"""
+import asyncio
+import json
+import math
+import os
+import random
+import shutil
+from typing import Dict, List, Optional, Tuple
+from app.domain.models import AudioEncoding, AudioFormat, AudioQuality, SimulationFilter, SimulationRecord
+from app.domain.ports import LLMProvider, SimulationRepository, StorageProvider, TTSProvider
+from app.infrastructure.config.settings import settings
+from app.infrastructure.serialization.script_codec import decode_db_content
+from app.infrastructure.audio.mp3 import SILENT_FRAME, silent_frame
+from app.infrastructure.audio.ogg_opus import FLAG_BOS, FLAG_EOS, OPUS_GRANULE_RATE, build_page
+
+# --- MPEG audio -------------------------------------------------------------
+
+# SILENT_FRAME: MPEG-2 Layer III, 48 kbit/s, 24 kHz, mono -> 144-byte frames of 24 ms
+SPEECH_WORDS_PER_SECOND = 2.5
+
+# MPEG-2 Layer III bitrate and sample-rate indexes (frame header, byte 2)
+_MPEG2_BITRATE_INDEX = {8: 1, 16: 2, 24: 3, 32: 4, 40: 5, 48: 6, 56: 7, 64: 8, 80: 9, 96: 10}
+_MPEG2_SAMPLE_RATE_INDEX = {22050: 0, 24000: 1, 16000: 2}
+
+def mp3_payload(seconds: float, kbps: int = 48, sample_rate: int = 24000) -> bytes:
+    """Valid (silent) MP3 data of the size EdgeTTS would return for `seconds` of speech."""
+    frame = SILENT_FRAME
+    if (kbps, sample_rate) != (48, 24000):
+        header = (_MPEG2_BITRATE_INDEX[kbps] << 4) | (_MPEG2_SAMPLE_RATE_INDEX[sample_rate] << 2)
+        frame = silent_frame(bytes([0xFF, 0xF3, header, 0xC4]))
+    frames = max(1, math.ceil(seconds * kbps * 1000 / 8 / len(frame)))
+    return frame * frames
+
+# Opus at the bitrates EdgeTTS uses for speech (kbit/s per sample rate)
+OPUS_KBPS = {16000: 16, 24000: 24, 48000: 32}
+OPUS_FRAME_SECONDS = 0.02
+
+def _silent_opus_packet(size: int) -> bytes:
+    # CELT fullband 20 ms silence (TOC 0xF8 + FF FE), as a code-3 packet padded to `size` bytes
+    padding = size - 5
+    return bytes([0xFB, 0x41, padding, 0xFF, 0xFE]) + bytes(padding)
+
+def ogg_opus_payload(seconds: float, sample_rate: int = 24000, serial: int = 0x5EED) -> bytes:
+    """A complete, valid (silent) Ogg Opus stream as EdgeTTS returns one per request."""
+    head = b"OpusHead" + bytes([1, 1]) + (312).to_bytes(2, "little") + sample_rate.to_bytes(4, "little") + bytes(3)
+    tags = b"OpusTags" + (8).to_bytes(4, "little") + b"vanaheim" + bytes(4)
+    packet = _silent_opus_packet(max(8, round(OPUS_KBPS[sample_rate] * 1000 / 8 * OPUS_FRAME_SECONDS)))
+    packets = max(1, math.ceil(seconds / OPUS_FRAME_SECONDS))
+    pages = [build_page([head], serial, 0, 0, FLAG_BOS), build_page([tags], serial, 1, 0)]
+    granule = 312
+    for start in range(0, packets, 50):
+        count = min(50, packets - start)
+        granule += count * int(OPUS_GRANULE_RATE * OPUS_FRAME_SECONDS)
+        last = start + count >= packets
+        pages.append(build_page([packet] * count, serial, len(pages), granule, FLAG_EOS if last else 0))
+    return b"".join(page.encode() for page in pages)
+
+# Payload for each (format, quality), as EdgeTTS encodes it
+def audio_payload(seconds: float, encoding: Optional[AudioEncoding] = None) -> bytes:
+    encoding = encoding or AudioEncoding()
+    sample_rate = {AudioQuality.LOW: 16000, AudioQuality.STANDARD: 24000, AudioQuality.HIGH: 48000}[encoding.quality]
+    if encoding.format == AudioFormat.OPUS:
+        return ogg_opus_payload(seconds, sample_rate)
+    if encoding.quality == AudioQuality.LOW:
+        return mp3_payload(seconds, 32, 16000)
+    return mp3_payload(seconds, 96 if encoding.quality == AudioQuality.HIGH else 48)
+
+# --- Latency model ----------------------------------------------------------
+
+class LatencyModel:
+    """Log-normal latency: `median` seconds with a `sigma`-wide tail, scaled by `time_scale`."""
+    def __init__(self, median: float, sigma: float = 0.5, time_scale: float = 1.0, seed: int = 7):
+        self.mu = math.log(median)
+        self.sigma = sigma
+        self.time_scale = time_scale
+        self.rng = random.Random(seed)
+
+    def sample(self, extra: float = 0.0) -> float:
+        return (self.rng.lognormvariate(self.mu, self.sigma) + extra) * self.time_scale
+
+    async def wait(self, extra: float = 0.0):
+        await asyncio.sleep(self.sample(extra))
+
+# --- Ports ------------------------------------------------------------------
+
+WORDS = (
+    "sprint backlog migración servidor equipo cliente despliegue latencia base datos riesgo "
+    "prioridad entrega pruebas revisión arquitectura incidente métricas calidad presupuesto "
+    "plan alcance dependencia soporte producción usuario versión integración deuda técnica"
+).split()
+VOICES = ["es-AR-ElenaNeural", "es-ES-AlvaroNeural", "es-MX-DaliaNeural", "es-CO-GonzaloNeural"]
+
+def script_json(rng: random.Random, segments: int, words_per_segment: int) -> str:
+    """A well-formed script batch, in the JSON shape the script generator asks the LLM for."""
+    batch = [
+        {
+            "voice": VOICES[i % len(VOICES)],
+            "role": f"Rol {i % len(VOICES)}",
+            "name": f"Persona {i % len(VOICES)}",
+            "text": " ".join(rng.choice(WORDS) for _ in range(words_per_segment)),
+        }
+        for i in range(segments)
+    ]
+    return json.dumps({"segments": batch}, ensure_ascii=False)
+
+class FakeLLMProvider(LLMProvider):
+    """Returns well-formed JSON scripts; latency grows with the completion length."""
+    def __init__(self, segments_per_batch: int = 20, words_per_segment: int = 40, time_scale: float = 1.0, seed: int = 11):
+        self.segments_per_batch = segments_per_batch
+        self.words_per_segment = words_per_segment
+        self.latency = LatencyModel(median=2.0, sigma=0.4, time_scale=time_scale, seed=seed)
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    async def generate_text(self, messages: List[Dict[str, str]], response_format: str = "json", api_key: str = None, model: str = None,
+                            cache_key: Optional[str] = None) -> str:
+        self.calls += 1
+        words = self.segments_per_batch * self.words_per_segment
+        # ~1.3 tokens per word at ~60 tokens/s of generation
+        await self.latency.wait(extra=words * 1.3 / 60)
+        return script_json(self.rng, self.segments_per_batch, self.words_per_segment)
+
+class FakeTTSProvider(TTSProvider):
+    """Writes MP3 frames sized for the text's spoken duration, after a realistic delay."""
+    def __init__(self, time_scale: float = 1.0, seed: int = 13):
+        self.latency = LatencyModel(median=0.6, sigma=0.6, time_scale=time_scale, seed=seed)
+        self.calls = 0
+
+    async def generate_audio(self, text: str, voice: str, output_path: str, encoding: Optional[AudioEncoding] = None) -> str:
+        self.calls += 1
+        words = len(text.split())
+        # Connection setup plus roughly 20 ms of synthesis per word
+        await self.latency.wait(extra=words * 0.02)
+        with open(output_path, "wb") as f:
+            f.write(audio_payload(words / SPEECH_WORDS_PER_SECOND, encoding))
+        return output_path
+
+class FakeCloudStorage(StorageProvider):
+    """Accepts uploads at a fixed bandwidth and drops them."""
+    def __init__(self, megabytes_per_second: float = 20.0, time_scale: float = 1.0):
+        self.bytes_per_second = megabytes_per_second * 1024 * 1024
+        self.time_scale = time_scale
+        self.uploaded_bytes = 0
+
+    async def save_file(self, content: bytes, path: str) -> str:
+        await asyncio.sleep(0.05 + len(content) / self.bytes_per_second * self.time_scale)
+        self.uploaded_bytes += len(content)
+        return path
+
+    async def concatenate_files(self, file_paths: List[str], output_path: str, pauses: Optional[List[float]] = None) -> str:
+        return ""
+
+    def create_temp_dir(self, identifier: str) -> str:
+        # Local scratch space, like the Supabase adapter
+        path = os.path.join(settings.TEMP_DIR, identifier)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def cleanup_temp_dir(self, path: str):
+        shutil.rmtree(path, ignore_errors=True)
+
+class FakeSimulationRepository(SimulationRepository):
+    def __init__(self, time_scale: float = 1.0):
+        self.latency = LatencyModel(median=0.08, sigma=0.3, time_scale=time_scale, seed=17)
+        self.records: List[SimulationRecord] = []
+
+    async def save_simulation(self, record: SimulationRecord) -> SimulationRecord:
+        await self.latency.wait()
+        self.records.append(record)
+        return record
+
+    async def get_script_content(self, simulation_id: str) -> Optional[str]:
+        await self.latency.wait()
+        return decode_db_content(next((r.script_content for r in self.records if r.id == simulation_id), None))
+
+    async def get_audio_path(self, simulation_id: str) -> Optional[str]:
+        await self.latency.wait()
+        return next((r.audio_path for r in self.records if r.id == simulation_id), None)
+
+    async def list_simulations(self, filters: SimulationFilter, limit: int, after: Optional[Tuple[str, str]] = None,
+                               include_script: bool = False) -> List[SimulationRecord]:
+        await self.latency.wait()
+        match = filters.configuration_match()
+        records = sorted(
+            (r for r in self.records
+             if (not filters.topic or filters.topic.lower() in r.topic.lower())
+             and all((r.configuration or {}).get(k) == v for k, v in match.items())
+             and (after is None or (r.created_at, r.id) < after)),
+            key=lambda r: (r.created_at, r.id), reverse=True
+        )
+        return [r if include_script else r.model_copy(update={"script_content": None}) for r in records[:limit]]
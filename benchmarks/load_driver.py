@@ -0,0 +1,275 @@
+"""
+End-to-end load driver.
+
+Starts the upstream simulators (`benchmarks.simulators.serve`) and the service
+under uvicorn as separate processes, with the service's real adapters pointed
+at the simulators, then replays a traffic mix and reports throughput and
+latency per endpoint. Nothing leaves localhost.
+
+    python -m benchmarks.load_driver --mix mixed --rate 4 --duration 60
+    python -m benchmarks.load_driver --mix simple=8,prompt=2 --concurrency 16 --requests 200
+    python -m benchmarks.load_driver --app-url http://127.0.0.1:8000 --mix interactive --rate 20
+
+With --rate, arrivals are open-loop (Poisson), so a saturated service shows up
+as growing latency instead of a silently lower offered load; with --concurrency
+a fixed number of clients send back-to-back requests.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+import httpx
+from benchmarks.pipeline_bench import SCENARIOS, git_revision, percentile
+from benchmarks.simulators.serve import SimulatorPorts, add_arguments, upstream_env
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MIXES = {
+    "interactive": {"simple": 1},
+    "mixed": {"simple": 7, "prompt": 2, "scenario": 1},
+    "batch": {"prompt": 1, "scenario": 1},
+}
+
+def parse_mix(value: str) -> Dict[str, float]:
+    if value in MIXES:
+        return MIXES[value]
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint '{name}' (choose from {', '.join(sorted(SCENARIOS))})")
+        mix[name] = float(weight or 1)
+    return mix
+
+def free_port(host: str) -> int:
+    with socket.socket() as s:
+        s.bind((host, 0))
+        return s.getsockname()[1]
+
+class Stack:
+    """The simulators and the service, each in its own process."""
+    def __init__(self, args, workdir: str):
+        self.args = args
+        self.workdir = workdir
+        self.processes: List[subprocess.Popen] = []
+        self.ports = SimulatorPorts(*(free_port(args.host) for _ in range(3)))
+        self.app_url = f"http://{args.host}:{free_port(args.host)}"
+
+    def _spawn(self, name: str, command: List[str], env: Dict[str, str]) -> subprocess.Popen:
+        log = open(os.path.join(self.workdir, f"{name}.log"), "wb")
+        process = subprocess.Popen(command, cwd=self.workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        self.processes.append(process)
+        return process
+
+    def start(self):
+        env = {**os.environ, "PYTHONPATH": REPO_ROOT}
+        self._spawn("simulators", [
+            sys.executable, "-m", "benchmarks.simulators.serve", "--host", self.args.host,
+            "--openai-port", str(self.ports.openai), "--edge-tts-port", str(self.ports.edge_tts),
+            "--supabase-port", str(self.ports.supabase), "--time-scale", str(self.args.time_scale),
+            "--throttle-rate", str(self.args.throttle_rate), "--malformed-rate", str(self.args.malformed_rate),
+            "--drop-rate", str(self.args.drop_rate), "--openai-max-concurrency", str(self.args.openai_max_concurrency),
+        ], env)
+
+        data_dir = os.path.join(self.workdir, "data")
+        env.update(upstream_env(self.args.host, self.ports))
+        env.update({
+            "DATA_DIR": data_dir,
+            "SCRIPTS_DIR": os.path.join(data_dir, "scripts"),
+            "OUTPUT_DIR": os.path.join(data_dir, "output"),
+            "CHECKPOINT_DIR": os.path.join(data_dir, "checkpoints"),
+            "TEMP_DIR": os.path.join(data_dir, "temp"),
+            "ARTIFACT_INDEX_PATH": os.path.join(data_dir, "artifacts.db"),
+        })
+        port = self.app_url.rsplit(":", 1)[1]
+        self._spawn("service", [
+            sys.executable, "-m", "uvicorn", "app.main:app", "--host", self.args.host, "--port", port,
+            "--log-level", "warning", "--no-access-log",
+        ], env)
+
+    async def wait_ready(self, timeout: float = 30.0):
+        urls = [f"{self.app_url}/api/v1/health"] + [f"{url}/_sim/stats" for url in self.simulator_urls().values()]
+        deadline = time.monotonic() + timeout
+        async with httpx.AsyncClient(timeout=1.0) as client:
+            for url in urls:
+                while True:
+                    try:
+                        if (await client.get(url)).status_code == 200:
+                            break
+                    except httpx.TransportError:
+                        pass
+                    if time.monotonic() > deadline or any(p.poll() is not None for p in self.processes):
+                        raise RuntimeError(f"{url} did not come up; see logs in {self.workdir}")
+                    await asyncio.sleep(0.2)
+
+    def simulator_urls(self) -> Dict[str, str]:
+        host = self.args.host
+        return {
+            "openai": f"http://{host}:{self.ports.openai}",
+            "edge_tts": f"http://{host}:{self.ports.edge_tts}",
+            "supabase": f"http://{host}:{self.ports.supabase}",
+        }
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+
+    async def send(self, client: httpx.AsyncClient, name: str):
+        path, payload = SCENARIOS[name]
+        started = time.perf_counter()
+        try:
+            response = await client.post(path, json=payload)
+            status = str(response.status_code)
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        self.latencies[name].append(time.perf_counter() - started)
+        self.statuses[name][status] += 1
+
+    def report(self, elapsed: float) -> Dict:
+        endpoints = {}
+        for name, latencies in sorted(self.latencies.items()):
+            ok = self.statuses[name].get("200", 0)
+            endpoints[name] = {
+                "requests": len(latencies),
+                "ok": ok,
+                "statuses": dict(self.statuses[name]),
+                "ok_per_second": round(ok / elapsed, 3),
+                "latency_p50_seconds": round(percentile(latencies, 0.50), 4),
+                "latency_p90_seconds": round(percentile(latencies, 0.90), 4),
+                "latency_p99_seconds": round(percentile(latencies, 0.99), 4),
+                "latency_max_seconds": round(max(latencies), 4),
+            }
+        total = sum(e["requests"] for e in endpoints.values())
+        ok = sum(e["ok"] for e in endpoints.values())
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "requests": total,
+            "ok": ok,
+            "requests_per_second": round(total / elapsed, 3),
+            "ok_per_second": round(ok / elapsed, 3),
+            "endpoints": endpoints,
+        }
+
+async def open_loop(client: httpx.AsyncClient, recorder: Recorder, mix: Dict[str, float], rate: float, duration: float, rng: random.Random):
+    names, weights = list(mix), list(mix.values())
+    tasks = []
+    deadline = time.monotonic() + duration
+    next_at = time.monotonic()
+    while next_at < deadline:
+        await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+        tasks.append(asyncio.ensure_future(recorder.send(client, rng.choices(names, weights)[0])))
+        next_at += rng.expovariate(rate)
+    await asyncio.gather(*tasks)
+
+async def closed_loop(client: httpx.AsyncClient, recorder: Recorder, mix: Dict[str, float], concurrency: int,
+                      requests: int, duration: float, rng: random.Random):
+    names, weights = list(mix), list(mix.values())
+    remaining = requests
+    deadline = time.monotonic() + duration
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0 and time.monotonic() < deadline:
+            remaining -= 1
+            await recorder.send(client, rng.choices(names, weights)[0])
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+async def fetch_json(client: httpx.AsyncClient, url: str) -> Optional[Dict]:
+    try:
+        response = await client.get(url)
+        return response.json() if response.status_code == 200 else None
+    except (httpx.HTTPError, ValueError):
+        return None
+
+async def run(args) -> Dict:
+    with tempfile.TemporaryDirectory(prefix="vanaheim-load-") as workdir:
+        stack = None
+        app_url = args.app_url
+        if not app_url:
+            stack = Stack(args, workdir)
+            stack.start()
+        try:
+            if stack:
+                await stack.wait_ready()
+                app_url = stack.app_url
+            recorder = Recorder()
+            rng = random.Random(args.seed)
+            headers = {"X-OpenAI-Key": "sk-simulator"}
+            async with httpx.AsyncClient(base_url=app_url, timeout=args.timeout, headers=headers,
+                                         limits=httpx.Limits(max_connections=None)) as client:
+                started = time.perf_counter()
+                if args.rate:
+                    await open_loop(client, recorder, args.mix, args.rate, args.duration, rng)
+                else:
+                    await closed_loop(client, recorder, args.mix, args.concurrency, args.requests, args.duration, rng)
+                report = recorder.report(time.perf_counter() - started)
+                report["limiters"] = await fetch_json(client, "/api/v1/limiters")
+                if stack:
+                    report["upstreams"] = {
+                        name: await fetch_json(client, f"{url}/_sim/stats") for name, url in stack.simulator_urls().items()
+                    }
+        finally:
+            if stack:
+                stack.stop()
+
+    report.update({
+        "revision": git_revision(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "mix": args.mix,
+        "rate": args.rate,
+        "concurrency": None if args.rate else args.concurrency,
+        "time_scale": args.time_scale,
+        "throttle_rate": args.throttle_rate,
+        "malformed_rate": args.malformed_rate,
+        "drop_rate": args.drop_rate,
+    })
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end Vanaheim load test against local upstream simulators.")
+    parser.add_argument("--mix", type=parse_mix, default=MIXES["mixed"],
+                        help=f"Preset ({', '.join(MIXES)}) or weights like simple=7,prompt=2,scenario=1.")
+    parser.add_argument("--rate", type=float, help="Open-loop arrival rate (requests/s). Overrides --concurrency.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Closed-loop clients.")
+    parser.add_argument("--requests", type=int, default=100, help="Closed-loop request count.")
+    parser.add_argument("--duration", type=float, default=60.0, help="Max seconds of traffic.")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Client timeout per request.")
+    parser.add_argument("--app-url", help="Target an already running service (its upstreams are up to you).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="load_report.json")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    for name, result in report["endpoints"].items():
+        print(f"{name:>9} {result['requests']:>5} req  {result['ok_per_second']:>7.2f} ok/s  "
+              f"p50={result['latency_p50_seconds']:.3f}s p90={result['latency_p90_seconds']:.3f}s "
+              f"p99={result['latency_p99_seconds']:.3f}s  {result['statuses']}")
+    print(f"{'total':>9} {report['requests']:>5} req  {report['ok_per_second']:>7.2f} ok/s")
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+"""
+Offline pipeline benchmark.
+
+Drives /tts/simple, /ai/prompt and /simulation/scenario in-process (httpx ASGI
+transport, no network) with the fake ports from `benchmarks.fakes`, at several
+concurrency levels, and writes a machine-readable JSON report.
+
+    python -m benchmarks.pipeline_bench --output bench.json
+    python -m benchmarks.pipeline_bench --output new.json --compare bench.json
+
+Reported per (endpoint, concurrency): jobs/sec, p50/p99 latency, errors,
+peak RSS during the run and event-loop lag (p99/max of a 10 ms ticker).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+
+SCENARIOS = {
+    "simple": ("/api/v1/tts/simple", {"text": "Bienvenidos a Hlid Systems. " * 8, "voice": "es-MX-DaliaNeural"}),
+    "prompt": ("/api/v1/ai/prompt", {"prompt": "Una discusión breve entre dos ingenieros.", "topic": "Bench"}),
+    "scenario": ("/api/v1/simulation/scenario", {
+        "participants": 3, "duration_minutes": 2, "topic": "Bench", "context": "Benchmark run", "scenario": "CORPORATE"
+    }),
+}
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def current_rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        # ru_maxrss is KiB on Linux, bytes on macOS; only a fallback
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+class Sampler:
+    """Background task sampling RSS and event-loop lag while a level runs."""
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lags: List[float] = []
+        self.peak_rss = 0
+        self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, time.perf_counter() - started - self.interval))
+            self.peak_rss = max(self.peak_rss, current_rss_bytes())
+
+    def __enter__(self):
+        self._task = asyncio.ensure_future(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+def install_fakes(data_dir: str, time_scale: float):
+    """Points settings at a scratch directory and returns a container whose adapters are fakes."""
+    from app.infrastructure.config.settings import settings
+    settings.DATA_DIR = data_dir
+    settings.SCRIPTS_DIR = os.path.join(data_dir, "scripts")
+    settings.OUTPUT_DIR = os.path.join(data_dir, "output")
+    settings.CHECKPOINT_DIR = os.path.join(data_dir, "checkpoints")
+    settings.TEMP_DIR = os.path.join(data_dir, "temp")
+    settings.ARTIFACT_INDEX_PATH = os.path.join(data_dir, "artifacts.db")
+    for path in (settings.SCRIPTS_DIR, settings.OUTPUT_DIR, settings.CHECKPOINT_DIR, settings.TEMP_DIR):
+        os.makedirs(path, exist_ok=True)
+
+    from app.infrastructure.container import Container
+    from benchmarks.fakes import FakeCloudStorage, FakeLLMProvider, FakeSimulationRepository, FakeTTSProvider
+
+    # The real file storage and checkpoint store stay; upstream-facing ports are faked
+    container = Container()
+    container.llm_provider = FakeLLMProvider(time_scale=time_scale)
+    container.tts_provider = FakeTTSProvider(time_scale=time_scale)
+    container.cloud_storage = FakeCloudStorage(time_scale=time_scale)
+    container.db_repository = FakeSimulationRepository(time_scale=time_scale)
+    return container
+
+async def run_level(client: httpx.AsyncClient, name: str, concurrency: int, requests: int, audio_options: Dict) -> Dict:
+    path, payload = SCENARIOS[name]
+    payload = {**payload, **audio_options}
+    latencies: List[float] = []
+    response_bytes: List[int] = []
+    errors = 0
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(None)
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            queue.get_nowait()
+            started = time.perf_counter()
+            response = await client.post(path, json=payload, headers={"X-OpenAI-Key": "sk-bench"})
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+            else:
+                response_bytes.append(len(response.content))
+
+    with Sampler() as sampler:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "endpoint": name,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "jobs_per_second": round(requests / elapsed, 3),
+        "latency_p50_seconds": round(percentile(latencies, 0.50), 4),
+        "latency_p99_seconds": round(percentile(latencies, 0.99), 4),
+        "peak_rss_bytes": sampler.peak_rss,
+        "loop_lag_p99_seconds": round(percentile(sampler.lags, 0.99), 4),
+        "loop_lag_max_seconds": round(max(sampler.lags, default=0.0), 4),
+        "audio_bytes_per_job": round(statistics.mean(response_bytes)) if response_bytes else 0,
+    }
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+async def run(args) -> Dict:
+    with tempfile.TemporaryDirectory(prefix="vanaheim-bench-") as data_dir:
+        container = install_fakes(data_dir, args.time_scale)
+        from app.infrastructure.api.main import app
+        # The ASGI transport does not run the lifespan, so install the container directly
+        app.state.container = container
+
+        results = []
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for name in args.endpoints:
+                for concurrency in args.concurrency:
+                    result = await run_level(client, name, concurrency, max(args.requests, concurrency),
+                                             {"output_format": args.output_format, "quality": args.quality})
+                    results.append(result)
+                    print(f"{name:>9} c={concurrency:<3} {result['jobs_per_second']:>8.2f} jobs/s  "
+                          f"p50={result['latency_p50_seconds']:.3f}s p99={result['latency_p99_seconds']:.3f}s  "
+                          f"lag_p99={result['loop_lag_p99_seconds'] * 1000:.1f}ms  errors={result['errors']}")
+
+    return {
+        "revision": git_revision(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "time_scale": args.time_scale,
+        "output_format": args.output_format,
+        "quality": args.quality,
+        "results": results,
+    }
+
+def compare(current: Dict, baseline: Dict):
+    """Prints relative changes against a previous report (positive = better)."""
+    previous = {(r["endpoint"], r["concurrency"]): r for r in baseline["results"]}
+    print(f"\nCompared with {baseline.get('revision', '?')}:")
+    for result in current["results"]:
+        before = previous.get((result["endpoint"], result["concurrency"]))
+        if not before:
+            continue
+        throughput = (result["jobs_per_second"] / before["jobs_per_second"] - 1) * 100 if before["jobs_per_second"] else 0.0
+        p99 = (1 - result["latency_p99_seconds"] / before["latency_p99_seconds"]) * 100 if before["latency_p99_seconds"] else 0.0
+        print(f"{result['endpoint']:>9} c={result['concurrency']:<3} throughput {throughput:+6.1f}%  p99 {p99:+6.1f}%")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline Vanaheim pipeline benchmark (fake upstreams).")
+    parser.add_argument("--endpoints", nargs="+", choices=sorted(SCENARIOS), default=["simple", "prompt", "scenario"])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=16, help="Requests per (endpoint, concurrency) level.")
+    parser.add_argument("--time-scale", type=float, default=0.05, help="Multiplier for fake upstream latencies.")
+    parser.add_argument("--output-format", choices=["mp3", "opus"], default="mp3", help="Audio format requested from every endpoint.")
+    parser.add_argument("--quality", choices=["low", "standard", "high"], default="standard")
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--compare", help="Previous report to compare against.")
+    parser.add_argument("--log-level", default="WARNING", help="Service log level during the run.")
+    args = parser.parse_args(argv)
+
+    # Import (and so configure) the service logger first, then override its level
+    from app.infrastructure.monitoring.logger import logger
+    logger.setLevel(args.log_level)
+
+    report = asyncio.run(run(args))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Fake EdgeTTS websocket server.
+
+Speaks the subset of the Edge "readaloud" protocol that the `edge_tts` client
+uses: it reads the `speech.config` and `ssml` messages, answers `turn.start`,
+streams the audio as binary `Path:audio` frames (2-byte header length + headers
++ data) and closes the turn with `turn.end`. The audio is valid MP3 (or Ogg Opus,
+following the `outputFormat` of `speech.config`) sized for the spoken duration of
+the text (see `benchmarks.fakes.audio_payload`).
+Knobs: latency, streaming speed, a share of handshakes rejected with 429 and a
+share of connections dropped before any audio. Counters at GET /_sim/stats.
+"""
+import asyncio
+import html
+import json
+import random
+import re
+import uuid
+from dataclasses import dataclass
+from aiohttp import WSMsgType, web
+from app.domain.models import AudioEncoding, AudioFormat, AudioQuality
+from benchmarks.fakes import SPEECH_WORDS_PER_SECOND, LatencyModel, audio_payload
+
+SYNTHESIZE_PATH = "/consumer/speech/synthesize/readaloud/edge/v1"
+AUDIO_CHUNK_BYTES = 4096
+_PROSODY = re.compile(r"<prosody[^>]*>(.*?)</prosody>", re.S)
+_OUTPUT_FORMAT = re.compile(r'"outputFormat":"([^"]+)"')
+_QUALITY_BY_RATE = {"16khz": AudioQuality.LOW, "24khz": AudioQuality.STANDARD, "48khz": AudioQuality.HIGH}
+
+def encoding_for(output_format: str) -> AudioEncoding:
+    """The payload to fake for an Edge output format name."""
+    rate = output_format.split("-")[1]
+    if output_format.startswith("ogg-"):
+        return AudioEncoding(format=AudioFormat.OPUS, quality=_QUALITY_BY_RATE[rate])
+    if "96kbitrate" in output_format:
+        return AudioEncoding(quality=AudioQuality.HIGH)
+    return AudioEncoding(quality=_QUALITY_BY_RATE[rate])
+
+@dataclass
+class EdgeTTSSimConfig:
+    time_scale: float = 1.0
+    # Audio is streamed this many times faster than real time
+    realtime_factor: float = 20.0
+    throttle_rate: float = 0.0
+    drop_rate: float = 0.0
+    seed: int = 13
+
+def wss_url(host: str, port: int) -> str:
+    """Value for EDGE_TTS_WSS_URL (the client appends `&ConnectionId=...`)."""
+    return f"ws://{host}:{port}{SYNTHESIZE_PATH}?TrustedClientToken=simulator"
+
+def _parse_text_message(message: str):
+    head, _, body = message.partition("\r\n\r\n")
+    headers = dict(line.split(":", 1) for line in head.split("\r\n") if ":" in line)
+    return headers, body
+
+def _text_message(request_id: str, path: str, body: dict) -> str:
+    return (
+        f"X-RequestId:{request_id}\r\n"
+        "Content-Type:application/json; charset=utf-8\r\n"
+        f"Path:{path}\r\n\r\n"
+        f"{json.dumps(body)}"
+    )
+
+def _audio_message(request_id: str, data: bytes, content_type: str = "audio/mpeg") -> bytes:
+    headers = f"X-RequestId:{request_id}\r\n"
+    if data:
+        headers += f"Content-Type:{content_type}\r\n"
+    headers += "Path:audio\r\n"
+    encoded = headers.encode("utf-8")
+    return len(encoded).to_bytes(2, "big") + encoded + data
+
+class EdgeTTSSimulator:
+    def __init__(self, config: EdgeTTSSimConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.first_byte = LatencyModel(median=0.35, sigma=0.6, time_scale=config.time_scale, seed=config.seed)
+        self.stats = {"connections": 0, "turns": 0, "throttled": 0, "dropped": 0, "audio_bytes": 0, "open": 0}
+
+    async def synthesize(self, request: web.Request) -> web.StreamResponse:
+        if self.rng.random() < self.config.throttle_rate:
+            self.stats["throttled"] += 1
+            return web.Response(status=429, text="Too Many Requests")
+
+        ws = web.WebSocketResponse(compress=True)
+        await ws.prepare(request)
+        self.stats["connections"] += 1
+        self.stats["open"] += 1
+        encoding = AudioEncoding()
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                headers, body = _parse_text_message(message.data)
+                if headers.get("Path") == "speech.config":
+                    match = _OUTPUT_FORMAT.search(body)
+                    encoding = encoding_for(match.group(1)) if match else encoding
+                if headers.get("Path") != "ssml":
+                    continue
+                if self.rng.random() < self.config.drop_rate:
+                    self.stats["dropped"] += 1
+                    await ws.close()
+                    break
+                await self._turn(ws, headers.get("X-RequestId", uuid.uuid4().hex), body, encoding)
+        finally:
+            self.stats["open"] -= 1
+        return ws
+
+    async def _turn(self, ws: web.WebSocketResponse, request_id: str, ssml: str, encoding: AudioEncoding):
+        match = _PROSODY.search(ssml)
+        text = html.unescape(match.group(1)) if match else ""
+        audio = audio_payload(len(text.split()) / SPEECH_WORDS_PER_SECOND, encoding)
+        chunk_delay = (AUDIO_CHUNK_BYTES / len(audio)) * (len(text.split()) / SPEECH_WORDS_PER_SECOND)
+        chunk_delay = chunk_delay / self.config.realtime_factor * self.config.time_scale
+
+        await ws.send_str(_text_message(request_id, "turn.start", {"context": {"serviceTag": request_id}}))
+        await self.first_byte.wait()
+        await ws.send_str(_text_message(request_id, "response", {"context": {"serviceTag": request_id}}))
+        for start in range(0, len(audio), AUDIO_CHUNK_BYTES):
+            await ws.send_bytes(_audio_message(request_id, audio[start:start + AUDIO_CHUNK_BYTES], encoding.media_type))
+            await asyncio.sleep(chunk_delay)
+        await ws.send_bytes(_audio_message(request_id, b""))
+        await ws.send_str(_text_message(request_id, "turn.end", {}))
+        self.stats["turns"] += 1
+        self.stats["audio_bytes"] += len(audio)
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+def create_app(config: EdgeTTSSimConfig) -> web.Application:
+    simulator = EdgeTTSSimulator(config)
+    app = web.Application()
+    app.router.add_get(SYNTHESIZE_PATH, simulator.synthesize)
+    app.router.add_get("/_sim/stats", simulator.get_stats)
+    return app
@@ -0,0 +1,160 @@
+"""
+Fake OpenAI-compatible chat-completions server.
+
+POST /v1/chat/completions answers with a script batch in the JSON shape the
+script generator asks for, as one response or as an SSE stream (`stream: true`).
+Knobs: latency (time to first token + ~60 tokens/s, scaled by `time_scale`),
+a concurrency cap and a random share of 429s (both with Retry-After), and a
+share of malformed completions (truncated JSON or markdown fences) to exercise
+the parser's error paths. Prompt caching is modelled like OpenAI's: prompts that
+repeat the leading messages of an earlier request (1024+ tokens) report those
+tokens, in 128-token steps, as `cached_tokens`. Counters are exposed at GET /_sim/stats.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from aiohttp import web
+from benchmarks.fakes import LatencyModel, script_json
+
+TOKENS_PER_SECOND = 60
+# Prompt caching: minimum cacheable prefix and granularity (tokens)
+CACHE_MIN_TOKENS = 1024
+CACHE_STEP_TOKENS = 128
+
+@dataclass
+class OpenAISimConfig:
+    time_scale: float = 1.0
+    max_concurrency: int = 16
+    throttle_rate: float = 0.0
+    malformed_rate: float = 0.0
+    segments_per_batch: int = 20
+    words_per_segment: int = 40
+    seed: int = 11
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for Spanish prose and JSON
+    return max(1, len(text) // 4)
+
+def _error(status: int, message: str, code: str, retry_after: float = None) -> web.Response:
+    headers = {"Retry-After": f"{retry_after:g}"} if retry_after is not None else None
+    body = {"error": {"message": message, "type": "requests", "param": None, "code": code}}
+    return web.json_response(body, status=status, headers=headers)
+
+class OpenAISimulator:
+    def __init__(self, config: OpenAISimConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.first_token = LatencyModel(median=0.6, sigma=0.4, time_scale=config.time_scale, seed=config.seed)
+        self.in_flight = 0
+        self.stats = {"requests": 0, "completed": 0, "streamed": 0, "throttled": 0, "malformed": 0, "tokens": 0, "cached_tokens": 0}
+        # Digests of message prefixes seen so far
+        self.prefixes = set()
+
+    def _cached_tokens(self, messages: list) -> int:
+        """Tokens of the longest message prefix already seen, as the prompt cache would serve them."""
+        digest, tokens, cached = hashlib.sha256(), 0, 0
+        for message in messages:
+            digest.update(json.dumps(message, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+            tokens += estimate_tokens(str(message.get("content", "")))
+            key = digest.copy().hexdigest()
+            if key in self.prefixes:
+                cached = tokens
+            self.prefixes.add(key)
+        if cached < CACHE_MIN_TOKENS:
+            return 0
+        return cached - cached % CACHE_STEP_TOKENS
+
+    def _completion(self) -> str:
+        content = script_json(self.rng, self.config.segments_per_batch, self.config.words_per_segment)
+        if self.rng.random() >= self.config.malformed_rate:
+            return content
+        self.stats["malformed"] += 1
+        if self.rng.random() < 0.5:
+            # Cut off mid-generation, as with a length limit or dropped stream
+            return content[: self.rng.randint(len(content) // 3, len(content) - 2)]
+        return f"```json\n{content}\n```"
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        if not request.headers.get("Authorization", "").startswith("Bearer "):
+            return _error(401, "Missing API key.", "invalid_api_key")
+        payload = await request.json()
+        self.stats["requests"] += 1
+
+        if self.in_flight >= self.config.max_concurrency or self.rng.random() < self.config.throttle_rate:
+            self.stats["throttled"] += 1
+            return _error(429, "Rate limit reached for requests.", "rate_limit_exceeded", retry_after=0.5 * self.config.time_scale)
+
+        self.in_flight += 1
+        try:
+            content = self._completion()
+            prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in payload.get("messages", []))
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": estimate_tokens(content),
+                "total_tokens": prompt_tokens + estimate_tokens(content),
+                "prompt_tokens_details": {"cached_tokens": self._cached_tokens(payload.get("messages", []))},
+            }
+            self.stats["tokens"] += usage["total_tokens"]
+            self.stats["cached_tokens"] += usage["prompt_tokens_details"]["cached_tokens"]
+            await self.first_token.wait()
+            if payload.get("stream"):
+                self.stats["streamed"] += 1
+                return await self._stream(request, payload, content, usage)
+            await self._generate(usage["completion_tokens"])
+            self.stats["completed"] += 1
+            return web.json_response({
+                "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model", "gpt-4-turbo-preview"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+        finally:
+            self.in_flight -= 1
+
+    async def _generate(self, tokens: int):
+        await asyncio.sleep(tokens / TOKENS_PER_SECOND * self.config.time_scale)
+
+    async def _stream(self, request: web.Request, payload: dict, content: str, usage: dict) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        base = {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": payload.get("model", "gpt-4-turbo-preview"),
+        }
+
+        async def send(choices: list, **extra):
+            chunk = {**base, "choices": choices, **extra}
+            await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+        await send([{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+        # ~8 tokens per chunk, paced at the generation rate
+        step = 32
+        for start in range(0, len(content), step):
+            piece = content[start:start + step]
+            await self._generate(estimate_tokens(piece))
+            await send([{"index": 0, "delta": {"content": piece}, "finish_reason": None}])
+        await send([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if (payload.get("stream_options") or {}).get("include_usage"):
+            await send([], usage=usage)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        self.stats["completed"] += 1
+        return response
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response({**self.stats, "in_flight": self.in_flight})
+
+def create_app(config: OpenAISimConfig) -> web.Application:
+    simulator = OpenAISimulator(config)
+    app = web.Application(client_max_size=16 * 1024 * 1024)
+    app.router.add_post("/v1/chat/completions", simulator.chat_completions)
+    app.router.add_get("/_sim/stats", simulator.get_stats)
+    return app
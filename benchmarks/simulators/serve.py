@@ -0,0 +1,85 @@
+"""
+Runs the fake OpenAI, EdgeTTS and Supabase servers on localhost.
+
+    python -m benchmarks.simulators.serve --time-scale 0.1 --malformed-rate 0.05
+
+Prints the environment that points the service at them (OPENAI_BASE_URL,
+EDGE_TTS_WSS_URL, SUPABASE_URL/KEY), so `uvicorn app.main:app` started with it
+exercises its real adapters without network access.
+"""
+import argparse
+import asyncio
+import signal
+import sys
+from dataclasses import dataclass
+from typing import Dict, List
+from aiohttp import web
+from benchmarks.simulators import edge_tts_server, openai_server, supabase_server
+
+@dataclass
+class SimulatorPorts:
+    openai: int = 8101
+    edge_tts: int = 8102
+    supabase: int = 8103
+
+def upstream_env(host: str, ports: SimulatorPorts) -> Dict[str, str]:
+    """Settings overrides that send the service's adapters to the simulators."""
+    return {
+        "OPENAI_API_KEY": "sk-simulator",
+        "OPENAI_BASE_URL": f"http://{host}:{ports.openai}/v1",
+        "EDGE_TTS_WSS_URL": edge_tts_server.wss_url(host, ports.edge_tts),
+        "SUPABASE_URL": f"http://{host}:{ports.supabase}",
+        "SUPABASE_KEY": supabase_server.SERVICE_KEY,
+        "NO_PROXY": f"{host},localhost",
+    }
+
+async def start(host: str, ports: SimulatorPorts, args) -> List[web.AppRunner]:
+    apps = [
+        (ports.openai, openai_server.create_app(openai_server.OpenAISimConfig(
+            time_scale=args.time_scale, max_concurrency=args.openai_max_concurrency,
+            throttle_rate=args.throttle_rate, malformed_rate=args.malformed_rate))),
+        (ports.edge_tts, edge_tts_server.create_app(edge_tts_server.EdgeTTSSimConfig(
+            time_scale=args.time_scale, throttle_rate=args.throttle_rate, drop_rate=args.drop_rate))),
+        (ports.supabase, supabase_server.create_app(supabase_server.SupabaseSimConfig(time_scale=args.time_scale))),
+    ]
+    runners = []
+    for port, app in apps:
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        runners.append(runner)
+    return runners
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--time-scale", type=float, default=0.1, help="Multiplier for simulated upstream latencies.")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of OpenAI/EdgeTTS requests answered with 429.")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Share of LLM completions with broken JSON.")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Share of EdgeTTS connections dropped before audio.")
+    parser.add_argument("--openai-max-concurrency", type=int, default=16)
+
+async def serve(args):
+    ports = SimulatorPorts(args.openai_port, args.edge_tts_port, args.supabase_port)
+    runners = await start(args.host, ports, args)
+    for key, value in upstream_env(args.host, ports).items():
+        print(f"{key}={value}", flush=True)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+    for runner in runners:
+        await runner.cleanup()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local OpenAI/EdgeTTS/Supabase simulators for load testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--openai-port", type=int, default=8101)
+    parser.add_argument("--edge-tts-port", type=int, default=8102)
+    parser.add_argument("--supabase-port", type=int, default=8103)
+    add_arguments(parser)
+    asyncio.run(serve(parser.parse_args(argv)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
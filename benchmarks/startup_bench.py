@@ -0,0 +1,115 @@
+"""
+Worker startup benchmark.
+
+Each sample runs in a fresh interpreter (nothing cached in sys.modules) and measures:
+importing `app.main`, running the lifespan startup, answering the first
+/api/v1/health request, and building the adapters and services on first use.
+It also records which upstream SDKs were imported before the first request and
+whether importing created files.
+
+    python -m benchmarks.startup_bench --output startup.json
+    python -m benchmarks.startup_bench --output new.json --compare startup.json
+
+Run it as a module from the repository root (it imports `benchmarks` and `app`).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+from benchmarks.pipeline_bench import git_revision
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside the child interpreter; prints one JSON line.
+PROBE = r"""
+import asyncio, json, os, sys, time
+import httpx  # the probe's own client; imported before timing starts
+t0 = time.perf_counter()
+from app.infrastructure.api.main import app
+t1 = time.perf_counter()
+sdks = sorted(m for m in ("openai", "supabase", "edge_tts") if m in sys.modules)
+files_after_import = sorted(os.listdir("."))
+
+async def main():
+    async with app.router.lifespan_context(app):
+        t2 = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+            await client.get("/api/v1/health")
+            t3 = time.perf_counter()
+            # Older revisions built everything at import time and have no container
+            container = getattr(app.state, "container", None)
+            if container is not None:
+                container.audio_service, container.script_service
+            t4 = time.perf_counter()
+    return t2, t3, t4
+
+t2, t3, t4 = asyncio.run(main())
+print(json.dumps({
+    "import_seconds": t1 - t0,
+    "lifespan_seconds": t2 - t1,
+    "first_request_seconds": t3 - t0,
+    "build_adapters_seconds": t4 - t3,
+    "sdks_imported_at_startup": sdks,
+    "files_created_by_import": files_after_import,
+}))
+"""
+
+def sample(workdir: str) -> Dict:
+    env = {
+        **os.environ,
+        "PYTHONPATH": REPO_ROOT,
+        "DATA_DIR": os.path.join(workdir, "data"),
+        "SCRIPTS_DIR": os.path.join(workdir, "data", "scripts"),
+        "OUTPUT_DIR": os.path.join(workdir, "data", "output"),
+        "CHECKPOINT_DIR": os.path.join(workdir, "data", "checkpoints"),
+        "TEMP_DIR": os.path.join(workdir, "data", "temp"),
+    }
+    cwd = tempfile.mkdtemp(dir=workdir)
+    output = subprocess.run([sys.executable, "-c", PROBE], cwd=cwd, env=env, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def summarize(samples: List[Dict]) -> Dict:
+    keys = ["import_seconds", "lifespan_seconds", "first_request_seconds", "build_adapters_seconds"]
+    summary = {key: round(statistics.median(s[key] for s in samples), 4) for key in keys}
+    summary["sdks_imported_at_startup"] = samples[-1]["sdks_imported_at_startup"]
+    summary["files_created_by_import"] = samples[-1]["files_created_by_import"]
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vanaheim worker import/startup benchmark.")
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--output", default="startup_output.json")
+    parser.add_argument("--compare", help="Previous report to compare against.")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="vanaheim-startup-") as workdir:
+        samples = [sample(workdir) for _ in range(args.runs)]
+    report = {
+        "revision": git_revision(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "runs": args.runs,
+        **summarize(samples),
+    }
+    for key, value in report.items():
+        print(f"{key:>26}: {value}")
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {baseline.get('revision', '?')}:")
+        for key in ("import_seconds", "first_request_seconds"):
+            if baseline.get(key):
+                print(f"{key:>26}: {report[key]:.3f}s vs {baseline[key]:.3f}s ({(1 - report[key] / baseline[key]) * 100:+.1f}% faster)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -41,6 +41,7 @@ async def test_audio_generation_flow_v2():
     mock_storage.create_temp_dir = MagicMock(return_value="/tmp/test_dir")
     mock_storage.concatenate_files = AsyncMock(return_value="/out/final.mp3")
     mock_storage.cleanup_temp_dir = MagicMock()
+    mock_storage.artifact_path = MagicMock(side_effect=os.path.join)
 
     # AudioService now accepts cloud_storage (optional). pass None.
     service = AudioGenerationService(mock_tts, mock_storage, cloud_storage=None)
@@ -55,4 +56,165 @@ async def test_audio_generation_flow_v2():
         expected_path = os.path.join("/mock/output", "final.mp3")
         assert result_path == expected_path
         mock_tts.generate_audio.assert_called_once()
-        mock_storage.concatenate_files.assert_called_once()
\ No newline at end of file
+        mock_storage.concatenate_files.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_script_generation_resumes_from_checkpoint(tmp_path):
+    from app.domain.models import ScriptBatch
+    from app.infrastructure.adapters.file_checkpoint_adapter import FileCheckpointAdapter
+
+    checkpoints = FileCheckpointAdapter(base_dir=str(tmp_path))
+    # A previous attempt already paid for a batch that covers the whole 1-minute target
+    long_text = " ".join(["word"] * 150)
+    checkpoints.save_batch("job-1", ScriptBatch(
+        content="{}",
+        segments=[ScriptSegment(voice="v1", role="r1", name="n1", text=long_text)]
+    ))
+
+    mock_llm = MagicMock()
+    mock_llm.generate_text = AsyncMock()
+    service = ScriptGenerationService(mock_llm, checkpoints)
+    req = SimulationRequest(participants=2, duration_minutes=1, topic="T", context="C")
+
+    script = await service.generate_script(req, job_id="job-1")
+
+    assert script.segments[0].text == long_text
+    mock_llm.generate_text.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_audio_generation_reuses_checkpointed_segments(tmp_path):
+    from app.infrastructure.adapters.file_checkpoint_adapter import FileCheckpointAdapter
+
+    checkpoints = FileCheckpointAdapter(base_dir=str(tmp_path / "checkpoints"))
+    segments = [
+        ScriptSegment(voice="v1", role="r1", name="n1", text="first"),
+        ScriptSegment(voice="v2", role="r2", name="n2", text="second"),
+    ]
+    # Segment 0 survived the failed attempt
+    with open(checkpoints.segment_path("job-2", 0, segments[0]), "wb") as f:
+        f.write(b"audio-0")
+
+    async def fake_tts(text, voice, output_path, encoding=None):
+        with open(output_path, "wb") as f:
+            f.write(b"audio-1")
+        return output_path
+
+    mock_tts = MagicMock()
+    mock_tts.generate_audio = AsyncMock(side_effect=fake_tts)
+    mock_storage = MagicMock()
+    mock_storage.create_temp_dir = MagicMock(return_value=str(tmp_path / "temp"))
+    mock_storage.concatenate_files = AsyncMock()
+
+    service = AudioGenerationService(mock_tts, mock_storage, checkpoints=checkpoints)
+    with unittest.mock.patch("app.application.services.audio_generator.settings") as mock_settings:
+        mock_settings.OUTPUT_DIR = str(tmp_path)
+        await service.generate_script_audio(Script(segments=segments), "final.mp3", job_id="job-2")
+
+    mock_tts.generate_audio.assert_called_once()
+    assert mock_tts.generate_audio.call_args.args[0] == "second"
+    concatenated = mock_storage.concatenate_files.call_args.args[0]
+    assert concatenated == [checkpoints.segment_path("job-2", i, s) for i, s in enumerate(segments)]
+
+def test_job_context_clamps_call_timeouts_to_stage_budget():
+    from app.application.job_context import JobContext, Deadline
+    from app.domain.exceptions import DeadlineExceededError
+
+    job = JobContext(job_id="j", deadline=Deadline.after(10), stage_shares={"script": 0.5})
+    job.enter_stage("script")
+    assert job.call_timeout(120) <= 5
+    assert job.call_timeout(1) == 1
+
+    job.deadline = Deadline.after(-1)
+    job.enter_stage("audio")
+    with pytest.raises(DeadlineExceededError):
+        job.call_timeout(30)
+
+@pytest.mark.asyncio
+async def test_signed_urls_are_batched_cached_and_single_flight():
+    import asyncio
+    from app.application.services.signed_urls import SignedUrlService
+
+    calls = []
+    async def create_signed_urls(paths, expires_in):
+        calls.append(list(paths))
+        await asyncio.sleep(0.05)
+        return {p: f"https://storage/{p}?e={expires_in}" for p in paths if p != "missing.mp3"}
+
+    provider = MagicMock()
+    provider.create_signed_urls = create_signed_urls
+    service = SignedUrlService(provider, expires_in=600, refresh_margin=60)
+
+    first, second = await asyncio.gather(service.get_urls(["a.mp3", "b.mp3", "a.mp3"]), service.get_url("b.mp3"))
+    assert calls == [["a.mp3", "b.mp3"]]
+    assert first == {"a.mp3": "https://storage/a.mp3?e=600", "b.mp3": "https://storage/b.mp3?e=600"}
+    assert second == first["b.mp3"]
+
+    # Cached hits stay local; unsignable paths are not cached
+    assert await service.get_urls(["a.mp3", "missing.mp3"]) == {"a.mp3": first["a.mp3"]}
+    assert calls == [["a.mp3", "b.mp3"], ["missing.mp3"]]
+
+    # Inside the refresh margin the URL is signed again
+    url, expires_at = service._entries["a.mp3"]
+    service._entries["a.mp3"] = (url, expires_at - 545)
+    await service.get_url("a.mp3")
+    assert calls[-1] == ["a.mp3"]
+
+@pytest.mark.asyncio
+async def test_voice_preflight_fixes_scripts_before_any_tts_call():
+    from app.application.services.voice_preflight import VoicePreflight
+    from app.domain.exceptions import InvalidVoiceError
+    from app.infrastructure.adapters.edge_voice_catalog import BUNDLED_SNAPSHOT, EdgeVoiceCatalog
+    catalog = EdgeVoiceCatalog(BUNDLED_SNAPSHOT)
+    assert {v.gender for v in catalog.voices(locale="es-MX")} == {"Female", "Male"}
+
+    script = Script(segments=[
+        ScriptSegment(role="Host", name="Ana", text="Hola.", voice="es-MX-DaliaNeural"),
+        ScriptSegment(role="Guest", name="Luis", text="Hola.", voice="es-mx-jorge"),
+        ScriptSegment(role="Guest", name="Eva", text="Hola.", voice="es-AR-ElenaNeurl"),
+        # Hallucinated: replaced by a voice of its locale that no other speaker uses
+        ScriptSegment(role="Guest", name="Pedro", text="Hola.", voice="es-MX-PedroNeural"),
+        ScriptSegment(role="Guest", name="Pedro", text="Adiós.", voice="es-MX-PedroNeural"),
+    ])
+    voices = [s.voice for s in VoicePreflight(catalog).check(script).segments]
+    assert voices[:3] == ["es-MX-DaliaNeural", "es-MX-JorgeNeural", "es-AR-ElenaNeural"]
+    assert voices[3] == voices[4] and voices[3] not in voices[:3] and voices[3].startswith("es-")
+
+    # Rejected before the TTS provider is ever called
+    mock_tts = MagicMock()
+    mock_tts.generate_audio = AsyncMock()
+    service = AudioGenerationService(mock_tts, MagicMock(), voices=catalog)
+    bad = Script(segments=[ScriptSegment(role="Narrator", name="N", text="Hi.", voice="Narrator")])
+    with pytest.raises(InvalidVoiceError):
+        await service.generate_script_audio(bad, "out.mp3")
+    mock_tts.generate_audio.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_malformed_llm_replies_are_salvaged_and_generation_continues():
+    import json
+    from app.application.segment_parser import parse_segment_reply
+    from app.infrastructure.monitoring.metrics import metrics
+
+    segment = '{"voice": "v1", "role": "r1", "name": "n1", "text": "%s"}'
+    replies = [
+        # Cut off mid-object, with a trailing comma and brackets/escapes inside strings
+        '{"segments": [' + segment % 'uno, \\"dos\\" [x]}' + ', {"voice": "v1", "role": "r1", "name": "n1", "text": "tr',
+        "Sorry, I cannot help with that.",
+        '```json\n{"segments": [' + segment % "tres" + ",]}\n```",
+        '{"segments": [' + segment % "cuatro" + ", " + segment % "cinco",
+    ]
+    mock_llm = MagicMock()
+    mock_llm.generate_text = AsyncMock(side_effect=replies)
+    service = ScriptGenerationService(mock_llm)
+    req = SimulationRequest(participants=2, duration_minutes=4, topic="T", context="C")
+    salvaged_before = metrics.get("llm_segments_salvaged_total")
+
+    script = await service.generate_script(req)
+
+    assert [s.text for s in script.segments] == ['uno, "dos" [x]}', "tres", "cuatro", "cinco"]
+    assert metrics.get("llm_segments_salvaged_total") - salvaged_before == 3
+    # The conversation continues from the salvaged segments, as valid JSON
+    messages = mock_llm.generate_text.call_args.args[0]
+    assistant = [m["content"] for m in messages if m["role"] == "assistant"]
+    assert [len(json.loads(content)["segments"]) for content in assistant] == [1, 1, 2]
+    assert parse_segment_reply("[" + segment % "a" + ",").outcome == "salvaged"
+    assert parse_segment_reply("no json here").outcome == "failed"
@@ -2,4 +2,11 @@ import pytest
 
 @pytest.fixture
 def anyio_backend():
-    return 'asyncio'
\ No newline at end of file
+    return 'asyncio'
+
+@pytest.fixture(autouse=True)
+def reset_lifecycle():
+    # A lifespan shutdown (or a drain test) leaves the process-wide lifecycle draining
+    from app.infrastructure.api.lifecycle import lifecycle
+    yield
+    lifecycle.reset()
@@ -1,19 +1,40 @@
+import os
+import subprocess
+import sys
+import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from fastapi import Response
+from app.infrastructure.adapters.file_checkpoint_adapter import FileCheckpointAdapter
+from app.infrastructure.adapters.sqlite_artifact_index import SQLiteArtifactIndex
+from app.infrastructure.adapters.sqlite_simulation_repository import SQLiteSimulationRepository
 from app.infrastructure.api.main import app
+from app.infrastructure.api.v1 import router as router_module
+from app.infrastructure.container import Container, get_container
 
 client = TestClient(app)
 
+@pytest.fixture
+def container(tmp_path):
+    container = Container()
+    container.checkpoint_store = FileCheckpointAdapter(str(tmp_path))
+    container.artifact_index = SQLiteArtifactIndex(str(tmp_path / "artifacts.db"))
+    container.db_repository = SQLiteSimulationRepository(str(tmp_path / "simulations.db"))
+    app.dependency_overrides[get_container] = lambda: container
+    yield container
+    app.dependency_overrides.clear()
+    container.artifact_index.close()
+    container.db_repository.close()
+
 def test_health_check():
     response = client.get("/api/v1/health")
     assert response.status_code == 200
     assert response.json()["status"] == "operational"
 
-@patch("app.infrastructure.api.v1.router.audio_service")
-def test_simple_tts_endpoint(mock_audio_service):
+def test_simple_tts_endpoint(container):
     # Mock service to return a path
-    mock_audio_service.generate_script_audio = AsyncMock(return_value="dummy.mp3")
+    container.audio_service = MagicMock()
+    container.audio_service.generate_script_audio = AsyncMock(return_value="dummy.mp3")
     
     # Mock FileResponse to return a simple Response object with audio content
     with patch("app.infrastructure.api.v1.router.FileResponse") as mock_file_response:
@@ -28,4 +49,278 @@ def test_simple_tts_endpoint(mock_audio_service):
         
         assert response.status_code == 200
         assert response.content == b"fake-audio-bytes"
-        assert response.headers["content-type"] == "audio/mpeg"
\ No newline at end of file
+        assert response.headers["content-type"] == "audio/mpeg"
+
+def test_batch_tts_dedupes_items_and_returns_zip(container, tmp_path, monkeypatch):
+    import io
+    import json
+    import zipfile
+    from app.infrastructure.config.settings import settings
+    monkeypatch.setattr(settings, "TEMP_DIR", str(tmp_path / "temp"))
+
+    synthesized = []
+    async def fake_tts(text, voice, output_path, encoding=None):
+        synthesized.append(text)
+        with open(output_path, "wb") as f:
+            f.write(text.encode("utf-8"))
+        return output_path
+    container.tts_provider = MagicMock(supported_encoding=lambda encoding: encoding)
+    container.tts_provider.generate_audio = AsyncMock(side_effect=fake_tts)
+    container.cloud_storage = None
+
+    payload = {"items": [
+        {"text": "Uno", "voice": "es-MX-DaliaNeural"},
+        {"text": "Dos", "voice": "es-MX-DaliaNeural"},
+        {"text": "Uno", "voice": "es-MX-DaliaNeural"},
+    ]}
+    response = client.post("/api/v1/tts/batch", json=payload)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    assert sorted(synthesized) == ["Dos", "Uno"]
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    manifest = json.loads(archive.read("manifest.json"))
+    assert manifest["unique"] == 2 and manifest["items"][2]["duplicate_of"] == 0
+    assert archive.read(manifest["items"][1]["filename"]) == b"Dos"
+    # The per-batch temp directory is removed once the archive is sent
+    assert os.listdir(settings.TEMP_DIR) == []
+
+def test_multipart_batch_part_headers_encode_user_filenames(tmp_path):
+    from app.domain.models import BatchItemResult
+    from app.infrastructure.api.v1.router import _multipart_batch
+    audio = tmp_path / "item.mp3"
+    audio.write_bytes(b"ID3")
+    result = BatchItemResult(index=0, item_id="abc", status="ok", filename='a"b\r\nX-Evil: 1.mp3', path=str(audio))
+
+    body = b"".join(_multipart_batch("vanaheim-b", {"items": []}, [result], "audio/mpeg"))
+
+    headers = body.split(b"\r\n\r\n", 1)[0].split(b"\r\n")
+    assert b"Content-Disposition: attachment; filename*=utf-8''a%22b%0D%0AX-Evil%3A%201.mp3" in headers
+    assert not any(line.startswith(b"X-Evil") for line in headers)
+
+def test_render_stored_script_reuses_the_finished_job_segments(container, tmp_path, monkeypatch):
+    from app.domain.models import Script, ScriptSegment
+    from app.infrastructure.config.settings import settings
+    for name in ("SCRIPTS_DIR", "OUTPUT_DIR", "TEMP_DIR"):
+        os.makedirs(tmp_path / name, exist_ok=True)
+        monkeypatch.setattr(settings, name, str(tmp_path / name))
+    script = Script(segments=[
+        ScriptSegment(voice="es-MX-DaliaNeural", role="Host", name="Ana", text="Hola"),
+        ScriptSegment(voice="es-MX-JorgeNeural", role="Guest", name="Luis", text="Buenas"),
+    ])
+    (tmp_path / "SCRIPTS_DIR" / "job42_prompt.json").write_text(script.model_dump_json(), encoding="utf-8")
+    container.artifact_index.record_file("job42", "script", str(tmp_path / "SCRIPTS_DIR" / "job42_prompt.json"))
+
+    synthesized = []
+    async def fake_tts(text, voice, output_path, encoding=None):
+        synthesized.append((voice, text))
+        with open(output_path, "wb") as f:
+            f.write(f"{voice}:{text}|".encode("utf-8"))
+        return output_path
+    container.tts_provider = MagicMock(supported_encoding=lambda encoding: encoding)
+    container.tts_provider.generate_audio = AsyncMock(side_effect=fake_tts)
+    container.cloud_storage = None
+
+    # The job that wrote the script finished with its segments in its checkpoint
+    for index, segment in enumerate(script.segments):
+        with open(container.checkpoint_store.segment_path("job42", index, segment), "wb") as f:
+            f.write(f"{segment.voice}:{segment.text}|".encode("utf-8"))
+    router_module._retire_checkpoint(container, "job42")
+
+    first = client.post("/api/v1/scripts/render", json={"script_id": "job42"})
+    second = client.post("/api/v1/scripts/render", json={"script_id": "job42", "voice_overrides": {"Luis": "es-ES-AlvaroNeural"}})
+
+    assert first.status_code == 200 and second.status_code == 200
+    assert first.headers["X-Vanaheim-Segments-Synthesized"] == "0"
+    assert first.content == b"es-MX-DaliaNeural:Hola|es-MX-JorgeNeural:Buenas|"
+    assert second.headers["X-Vanaheim-Segments-Synthesized"] == "1"
+    assert synthesized[-1] == ("es-ES-AlvaroNeural", "Buenas")
+    assert second.content == b"es-MX-DaliaNeural:Hola|es-ES-AlvaroNeural:Buenas|"
+    assert client.post("/api/v1/scripts/render", json={"script_id": "unknown"}).status_code == 404
+
+def test_simple_tts_in_opus_is_served_as_ogg(container, tmp_path, monkeypatch):
+    from benchmarks.fakes import FakeTTSProvider
+    from app.infrastructure.config.settings import settings
+    for name in ("OUTPUT_DIR", "TEMP_DIR"):
+        os.makedirs(tmp_path / name, exist_ok=True)
+        monkeypatch.setattr(settings, name, str(tmp_path / name))
+    container.tts_provider = FakeTTSProvider(time_scale=0)
+
+    response = client.post("/api/v1/tts/simple", json={"text": "Hola mundo", "output_format": "opus", "quality": "low"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "audio/ogg"
+    assert response.content[:4] == b"OggS"
+    assert 'filename="simple_tts_' in response.headers["content-disposition"] and ".ogg" in response.headers["content-disposition"]
+
+def test_resume_unknown_job_returns_404(container):
+    response = client.post("/api/v1/jobs/does-not-exist/resume")
+    assert response.status_code == 404
+
+def test_retry_with_another_request_body_is_refused(container):
+    scenario = {"participants": 2, "duration_minutes": 1, "topic": "Sprint", "context": "Daily"}
+    headers = {"X-Vanaheim-Job-Id": "retry-job", "X-OpenAI-Key": "sk-test"}
+    with patch("app.infrastructure.api.v1.router._run_scenario_job", AsyncMock(return_value=Response(content=b"ok"))):
+        assert client.post("/api/v1/simulation/scenario", json=scenario, headers=headers).status_code == 200
+        # Same id, other topic: the checkpointed batches belong to the first body
+        response = client.post("/api/v1/simulation/scenario", json={**scenario, "topic": "Retro"}, headers=headers)
+
+    assert response.status_code == 409
+    assert container.checkpoint_store.load_job("retry-job").request["topic"] == "Sprint"
+
+def test_resume_by_another_client_is_refused(container):
+    scenario = {"participants": 2, "duration_minutes": 1, "topic": "Sprint", "context": "Daily"}
+    with patch("app.infrastructure.api.v1.router._run_scenario_job", AsyncMock(return_value=Response(content=b"ok"))) as run:
+        client.post("/api/v1/simulation/scenario", json=scenario, headers={"X-Vanaheim-Job-Id": "owned-job", "X-OpenAI-Key": "sk-owner"})
+        stolen = client.post("/api/v1/jobs/owned-job/resume", headers={"X-OpenAI-Key": "sk-other"})
+        resumed = client.post("/api/v1/jobs/owned-job/resume", headers={"X-OpenAI-Key": "sk-owner"})
+
+    assert stolen.status_code == 409
+    assert resumed.status_code == 200 and run.await_count == 2
+
+@pytest.mark.asyncio
+async def test_simulation_history_is_filtered_and_keyset_paginated(container):
+    from app.domain.models import SimulationRecord
+    for i in range(5):
+        await container.db_repository.save_simulation(SimulationRecord(
+            id=f"job-{i}", created_at=f"2026-01-0{i + 1}T00:00:00+00:00", topic=f"Sprint {i}" if i % 2 else f"Incident {i}",
+            context="c", duration_minutes=1, participants_count=2, script_path="s.json", audio_path="a.mp3",
+            configuration={"model": "gpt-4.1", "scenario": "PODCAST" if i == 3 else "CORPORATE"}, script_content='{"segments": []}'
+        ))
+
+    first = client.get("/api/v1/simulations", params={"limit": 2}).json()
+    assert [r["id"] for r in first["items"]] == ["job-4", "job-3"]
+    assert "script_content" not in first["items"][0]
+    second = client.get("/api/v1/simulations", params={"limit": 2, "cursor": first["next_cursor"], "include_script": True}).json()
+    assert [r["id"] for r in second["items"]] == ["job-2", "job-1"] and second["items"][0]["script_content"]
+    last = client.get("/api/v1/simulations", params={"limit": 2, "cursor": second["next_cursor"]}).json()
+    assert [r["id"] for r in last["items"]] == ["job-0"] and "next_cursor" not in last
+
+    sprints = client.get("/api/v1/simulations", params={"topic": "sprint", "scenario": "CORPORATE", "model": "gpt-4.1"}).json()
+    assert [r["id"] for r in sprints["items"]] == ["job-1"]
+    assert client.get("/api/v1/simulations", params={"cursor": "not-a-cursor"}).status_code == 422
+
+def test_app_import_defers_upstream_sdks():
+    # Worker startup must not pay for the OpenAI/Supabase/EdgeTTS SDKs before a request needs them
+    code = "import sys, app.main; print(sorted(m for m in ('openai', 'supabase', 'edge_tts') if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip().splitlines()[-1] == "[]"
+
+def test_lifespan_builds_adapters_lazily():
+    with TestClient(app) as lifespan_client:
+        container = app.state.container
+        assert lifespan_client.get("/api/v1/limiters").status_code == 200
+        assert "scheduler" in container.__dict__ and "llm_provider" not in container.__dict__
+
+@pytest.mark.asyncio
+async def test_run_job_cancels_work_when_client_disconnects():
+    import asyncio
+    from app.application.job_context import JobContext, job_context
+    from app.infrastructure.api.cancellation import run_job
+    from app.infrastructure.monitoring.metrics import metrics
+
+    class DisconnectedRequest:
+        async def receive(self):
+            return {"type": "http.disconnect"}
+
+    finished = []
+
+    async def slow_job():
+        ctx = job_context()
+        ctx.enter_stage("audio")
+        ctx.tts_calls_planned = 5
+        await asyncio.sleep(10)
+        finished.append(True)
+
+    before = metrics.get("jobs_cancelled_total", kind="scenario", stage="audio")
+    job = JobContext(job_id="j1", kind="scenario")
+    response = await run_job(DisconnectedRequest(), job, slow_job)
+
+    assert response.status_code == 499
+    assert job.cancelled and not finished
+    assert metrics.get("jobs_cancelled_total", kind="scenario", stage="audio") == before + 1
+
+def test_admin_memory_tracing_reports_allocations_per_stage(monkeypatch):
+    from app.application.job_context import JobContext
+    from app.infrastructure.config.settings import settings
+
+    client = TestClient(app)
+    assert client.get("/api/v1/admin/memory").status_code == 404
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+    assert client.get("/api/v1/admin/memory", headers={"X-Vanaheim-Admin-Token": "guess"}).status_code == 403
+
+    admin = {"X-Vanaheim-Admin-Token": "s3cret"}
+    assert client.post("/api/v1/admin/memory/tracing", json={"enabled": True}, headers=admin).json() == {"tracing": True}
+    try:
+        job = JobContext(job_id="memory-job", kind="scenario")
+        job.enter_stage("script")
+        held = [bytearray(1024) for _ in range(2048)]
+        job.enter_stage("audio")
+        report = client.get("/api/v1/admin/memory", headers=admin).json()
+    finally:
+        client.post("/api/v1/admin/memory/tracing", json={"enabled": False}, headers=admin)
+
+    assert report["tracing"] and report["resident_bytes"] > 0
+    stage = next(r for r in report["stages"] if r["job_id"] == "memory-job" and r["stage"] == "script")
+    assert stage["traced_growth_bytes"] >= len(held) * 1024
+    assert "test_api.py" in stage["top"][0]["site"]
+    assert job.memory.peak_bytes > 0
+
+def test_progress_events_sample_memory_at_most_once_per_interval(monkeypatch):
+    from app.application.job_context import JobContext
+    from app.infrastructure.config.settings import settings
+    from app.infrastructure.monitoring import memory as memory_module
+
+    reads = []
+    monkeypatch.setattr(memory_module, "resident_bytes", lambda: reads.append(1) or 1024)
+    monkeypatch.setattr(settings, "MEMORY_SAMPLE_INTERVAL_SECONDS", 60)
+    job = JobContext(job_id="sampled-job", kind="scenario")
+    job.enter_stage("audio")
+    for synthesized in range(100):
+        job.report("segments", synthesized=synthesized, total=100)
+    # The stage change samples; the progress events right after it do not
+    assert len(reads) == 1 and job.memory.peak_bytes == 1024
+
+    monkeypatch.setattr(settings, "MEMORY_SAMPLE_INTERVAL_SECONDS", 0)
+    job.report("segments", synthesized=100, total=100)
+    assert len(reads) == 1
+
+def test_profiled_request_samples_its_background_tasks(container, tmp_path, monkeypatch):
+    import time
+    import anyio
+    from app.infrastructure.config.settings import settings
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+    monkeypatch.setattr(settings, "PROFILE_DIR", str(tmp_path / "profiles"))
+    admin = {"X-Vanaheim-Admin-Token": "s3cret"}
+
+    async def busy_segment():
+        end = time.perf_counter() + 0.2
+        while time.perf_counter() < end:
+            pass
+
+    async def generate(*args, **kwargs):
+        # CPU work in a task spawned by the pipeline, not in the request task itself
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(busy_segment)
+        return "dummy.mp3"
+
+    container.audio_service = MagicMock()
+    container.audio_service.generate_script_audio = generate
+    payload = {"text": "Hola", "voice": "es-MX-DaliaNeural"}
+    with patch("app.infrastructure.api.v1.router.FileResponse") as mock_file_response:
+        mock_file_response.side_effect = lambda path, **kwargs: Response(content=b"audio", media_type="audio/mpeg")
+        unprivileged = client.post("/api/v1/tts/simple", json=payload, headers={"X-Vanaheim-Profile": "true"})
+        profiled = client.post("/api/v1/tts/simple", json=payload, headers={"X-Vanaheim-Profile": "true", **admin})
+
+    assert profiled.status_code == 200, profiled.text
+    assert "X-Vanaheim-Profile-Id" not in unprivileged.headers
+    request_id = profiled.headers["X-Vanaheim-Profile-Id"]
+    assert request_id == profiled.headers["X-Request-ID"]
+    listed = client.get("/api/v1/admin/profiles", headers=admin).json()
+    assert [entry["request_id"] for entry in listed] == [request_id] and listed[0]["samples"] > 0
+
+    folded = client.get(f"/api/v1/admin/profiles/{request_id}", headers=admin).text
+    stacks = dict(line.rsplit(" ", 1) for line in folded.splitlines())
+    busy = sum(int(count) for stack, count in stacks.items() if stack.split(";")[-1].startswith("busy_segment"))
+    assert busy >= 10
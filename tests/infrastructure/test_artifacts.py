@@ -0,0 +1,119 @@
+import pytest
+import os
+from app.infrastructure.adapters.file_storage_adapter import FileStorageAdapter
+from app.infrastructure.adapters.sqlite_artifact_index import SQLiteArtifactIndex, migrate_flat_layout
+from app.infrastructure.config.settings import settings
+from benchmarks.fakes import mp3_payload, ogg_opus_payload
+
+def test_index_records_sharded_artifacts_with_duration(tmp_path):
+    storage = FileStorageAdapter(shard_levels=2)
+    index = SQLiteArtifactIndex(str(tmp_path / "artifacts.db"))
+
+    path = storage.artifact_path(str(tmp_path), "job-1_prompt.mp3")
+    assert os.path.dirname(os.path.dirname(os.path.dirname(path))) == str(tmp_path)
+    with open(path, "wb") as f:
+        f.write(mp3_payload(3.0))
+    ogg_path = storage.artifact_path(str(tmp_path), "job-2_simple.ogg")
+    with open(ogg_path, "wb") as f:
+        f.write(ogg_opus_payload(1.5))
+
+    index.record_file("job-1", "audio", path, cloud_path="job-1_prompt.mp3")
+    index.record_file("job-2", "audio", ogg_path)
+
+    record = index.find("job-1", "audio")
+    assert record.path == path and record.bytes == os.path.getsize(path) and len(record.sha256) == 64
+    assert record.duration_seconds == 3.0 and record.cloud_path == "job-1_prompt.mp3"
+    assert index.find("job-2", "audio").duration_seconds == 1.5
+    assert index.find("job-1", "script") is None
+
+    index.remove(path)
+    assert index.list("job-1") == []
+    index.close()
+
+def test_flat_layout_is_migrated_into_shards(tmp_path, monkeypatch):
+    for name in ("OUTPUT_DIR", "SCRIPTS_DIR"):
+        os.makedirs(tmp_path / name)
+        monkeypatch.setattr(settings, name, str(tmp_path / name))
+    (tmp_path / "OUTPUT_DIR" / "job-1_ScenarioType.CORPORATE.mp3").write_bytes(mp3_payload(1.0))
+    (tmp_path / "OUTPUT_DIR" / "batch-1_0002.mp3").write_bytes(mp3_payload(1.0))
+    (tmp_path / "SCRIPTS_DIR" / "job-1_ScenarioType.CORPORATE.json").write_text("{}")
+    index = SQLiteArtifactIndex(str(tmp_path / "artifacts.db"))
+
+    assert migrate_flat_layout(index, FileStorageAdapter()) == 3
+
+    assert not any(entry.is_file() for entry in os.scandir(tmp_path / "OUTPUT_DIR"))
+    assert {r.kind for r in index.list("job-1")} == {"audio", "script"}
+    assert os.path.exists(index.find("batch-1_0002", "audio").path)
+    index.close()
+
+@pytest.mark.asyncio
+async def test_janitor_evicts_least_recently_downloaded_with_a_cloud_copy(tmp_path, monkeypatch):
+    from unittest.mock import AsyncMock, MagicMock
+    from app.infrastructure.maintenance.janitor import ArtifactJanitor
+    for name in ("DATA_DIR", "TEMP_DIR"):
+        os.makedirs(tmp_path / name)
+        monkeypatch.setattr(settings, name, str(tmp_path / name))
+    monkeypatch.setattr(settings, "ARTIFACT_QUOTA_MB", 1)
+    monkeypatch.setattr(settings, "ARTIFACT_QUOTA_LOW_WATERMARK", 0.9)
+    index = SQLiteArtifactIndex(str(tmp_path / "artifacts.db"))
+    paths = {}
+    for name in ("old", "unsynced", "downloaded", "new"):
+        paths[name] = str(tmp_path / f"{name}.mp3")
+        with open(paths[name], "wb") as f:
+            f.write(bytes(400 * 1024))
+        index.record_file(name, "audio", paths[name], cloud_path=None if name == "unsynced" else f"{name}.mp3")
+    index.touch(paths["downloaded"])
+    # A crashed job's segments, and a live job's
+    stale = tmp_path / "TEMP_DIR" / "crashed"
+    stale.mkdir()
+    (stale / "0000.mp3").write_bytes(bytes(1000))
+    os.utime(stale / "0000.mp3", (0, 0))
+    os.utime(stale, (0, 0))
+    (tmp_path / "TEMP_DIR" / "live").mkdir()
+    # An abandoned render cache past retention, and a fresh checkpoint
+    from app.infrastructure.adapters.file_checkpoint_adapter import FileCheckpointAdapter
+    checkpoints = FileCheckpointAdapter(base_dir=str(tmp_path / "checkpoints"))
+    for job_id in ("render-abandoned", "job-fresh"):
+        (tmp_path / "checkpoints" / job_id).mkdir(parents=True)
+    os.utime(tmp_path / "checkpoints" / "render-abandoned", (0, 0))
+
+    cloud = MagicMock()
+    cloud.exists = AsyncMock(return_value=True)
+    reclaimed = await ArtifactJanitor(index, cloud=cloud, checkpoints=checkpoints).run_once()
+
+    # 1.6 MB over a 1 MB quota: down to 0.9 MB, least recently used first, keeping the file with no cloud copy
+    assert not os.path.exists(paths["old"]) and not os.path.exists(paths["new"])
+    assert os.path.exists(paths["unsynced"]) and os.path.exists(paths["downloaded"])
+    assert reclaimed == 2 * 400 * 1024 + 1000
+    assert sorted(os.listdir(tmp_path / "TEMP_DIR")) == ["live"]
+    assert os.listdir(tmp_path / "checkpoints") == ["job-fresh"]
+    assert index.total_bytes() == 800 * 1024
+    index.close()
+
+@pytest.mark.asyncio
+async def test_scripts_are_serialized_once_and_read_back_compressed_or_not(tmp_path, monkeypatch):
+    from app.domain.models import Script, ScriptSegment, SimulationFilter, SimulationRecord
+    from app.infrastructure.adapters.sqlite_simulation_repository import SQLiteSimulationRepository
+    from app.infrastructure.serialization.script_codec import EncodedScript, read_script_file
+    script = Script(segments=[ScriptSegment(role="Host", name="Ana", text="Buenos días " * 200, voice="es-MX-DaliaNeural")])
+    repository = SQLiteSimulationRepository(str(tmp_path / "simulations.db"))
+
+    for compressed in (False, True):
+        monkeypatch.setattr(settings, "SCRIPT_FILE_COMPRESSION", compressed)
+        monkeypatch.setattr(settings, "SCRIPT_DB_COMPRESSION", compressed)
+        encoded = EncodedScript(script)
+        path = tmp_path / f"job-{compressed:d}_prompt{encoded.file_suffix}"
+        path.write_bytes(encoded.file_content())
+        await repository.save_simulation(SimulationRecord(
+            id=f"job-{compressed:d}", topic="t", context="c", duration_minutes=1, participants_count=1,
+            script_path=str(path), audio_path="a.mp3", script_content=encoded.db_content()
+        ))
+
+        assert read_script_file(str(path)) == script
+        assert Script.model_validate_json(await repository.get_script_content(f"job-{compressed:d}")) == script
+    assert path.name.endswith(".json.gz") and path.stat().st_size < len(encoded.json_bytes) / 10
+
+    # Compressed at rest, plain JSON for readers
+    records = await repository.list_simulations(SimulationFilter(), 10, include_script=True)
+    assert all(r.script_content == encoded.text for r in records)
+    repository.close()
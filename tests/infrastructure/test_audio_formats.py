@@ -0,0 +1,87 @@
+import io
+import pytest
+from app.infrastructure.adapters.file_storage_adapter import FileStorageAdapter
+from app.infrastructure.audio.ogg_opus import FLAG_BOS, FLAG_EOS, read_pages
+from benchmarks.fakes import SILENT_FRAME, mp3_payload, ogg_opus_payload
+
+@pytest.mark.asyncio
+async def test_concatenating_ogg_segments_yields_one_continuous_stream(tmp_path):
+    segments = []
+    for i, (seconds, serial) in enumerate([(1.5, 11), (2.0, 22), (0.5, 33)]):
+        path = tmp_path / f"segment_{i}.ogg"
+        path.write_bytes(ogg_opus_payload(seconds, serial=serial))
+        segments.append(str(path))
+
+    output = tmp_path / "final.ogg"
+    await FileStorageAdapter().concatenate_files(segments, str(output))
+
+    raw = output.read_bytes()
+    pages = list(read_pages(io.BytesIO(raw)))
+    assert b"".join(page.encode() for page in pages) == raw  # every CRC is valid
+    assert raw.count(b"OpusHead") == 1 and raw.count(b"OpusTags") == 1
+    assert {page.serial for page in pages} == {11}
+    assert [page.sequence for page in pages] == list(range(len(pages)))
+    assert [bool(page.flags & FLAG_BOS) for page in pages].count(True) == 1 and pages[0].flags & FLAG_BOS
+    assert [bool(page.flags & FLAG_EOS) for page in pages].count(True) == 1 and pages[-1].flags & FLAG_EOS
+    granules = [page.granule for page in pages]
+    assert granules == sorted(granules)
+    # 4 s of 20 ms packets at 48 kHz, plus the pre-skip of each of the three streams
+    assert granules[-1] == 200 * 960 + 3 * 312
+
+@pytest.mark.asyncio
+async def test_concatenating_mp3_segments_appends_frames(tmp_path):
+    segments = []
+    for i in range(2):
+        path = tmp_path / f"segment_{i}.mp3"
+        path.write_bytes(mp3_payload(1.0))
+        segments.append(str(path))
+
+    output = tmp_path / "final.mp3"
+    await FileStorageAdapter().concatenate_files(segments, str(output))
+
+    assert output.read_bytes() == mp3_payload(1.0) * 2
+    assert len(output.read_bytes()) % len(SILENT_FRAME) == 0
+
+@pytest.mark.asyncio
+async def test_pauses_are_spliced_as_silent_frames_in_the_segments_format(tmp_path):
+    from app.application.services.audio_generator import AudioGenerationService
+    from app.domain.models import Script, ScriptSegment
+    from app.infrastructure.audio.mp3 import mp3_duration_seconds, parse_frame_header
+    from app.infrastructure.audio.ogg_opus import opus_duration_seconds
+
+    lines = [("Ana", "Host"), ("Ana", "Host"), ("Luis", "Guest")]
+    script = Script(segments=[ScriptSegment(voice="v", role=role, name=name, text="hola") for name, role in lines])
+    pauses = AudioGenerationService.pauses(script, scenario="STORY")
+    assert pauses == [0.15, 0.7]
+
+    # High quality MP3 (MPEG-2, 96 kbit/s): 288-byte frames of 24 ms
+    segments = []
+    for i in range(3):
+        path = tmp_path / f"segment_{i}.mp3"
+        path.write_bytes(mp3_payload(1.0, kbps=96))
+        segments.append(str(path))
+    output = tmp_path / "final.mp3"
+    await FileStorageAdapter().concatenate_files(segments, str(output), pauses=pauses)
+
+    raw = output.read_bytes()
+    frame = len(mp3_payload(0.01, kbps=96))
+    assert len(raw) % frame == 0
+    headers = {parse_frame_header(raw[i:i + 4]) for i in range(0, len(raw), frame)}
+    assert headers == {parse_frame_header(raw[:4])}
+    assert mp3_duration_seconds(str(output)) == pytest.approx(3 * mp3_duration_seconds(segments[0]) + 0.85, abs=0.03)
+
+    segments = []
+    for i in range(3):
+        path = tmp_path / f"segment_{i}.ogg"
+        path.write_bytes(ogg_opus_payload(1.0, serial=i + 1))
+        segments.append(str(path))
+    output = tmp_path / "final.ogg"
+    await FileStorageAdapter().concatenate_files(segments, str(output), pauses=pauses)
+
+    raw = output.read_bytes()
+    pages = list(read_pages(io.BytesIO(raw)))
+    assert b"".join(page.encode() for page in pages) == raw
+    assert [page.sequence for page in pages] == list(range(len(pages)))
+    assert [page.granule for page in pages] == sorted(page.granule for page in pages)
+    # Opus pauses are whole 20 ms packets
+    assert opus_duration_seconds(str(output)) == pytest.approx(3.0 + 0.85 + 2 * 312 / 48000, abs=0.011)
@@ -0,0 +1,65 @@
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, MagicMock
+from app.domain.ports import SignedUrlProvider
+from app.infrastructure.adapters.sqlite_artifact_index import SQLiteArtifactIndex
+from app.infrastructure.api.main import app
+from app.infrastructure.config.settings import settings
+from app.infrastructure.container import Container, get_container
+
+client = TestClient(app)
+AUDIO = bytes(range(256)) * 40
+
+@pytest.fixture
+def output_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "OUTPUT_DIR", str(tmp_path))
+    (tmp_path / "job-1_scenario.mp3").write_bytes(AUDIO)
+    container = Container()
+    container.artifact_index = SQLiteArtifactIndex(str(tmp_path / "artifacts.db"))
+    container.artifact_index.record_file("job-1", "audio", str(tmp_path / "job-1_scenario.mp3"))
+    app.dependency_overrides[get_container] = lambda: container
+    yield tmp_path
+    app.dependency_overrides.clear()
+    container.artifact_index.close()
+
+def test_job_audio_supports_etag_and_ranges(output_dir):
+    full = client.get("/api/v1/jobs/job-1/audio")
+    assert full.status_code == 200 and full.content == AUDIO
+    assert full.headers["content-type"] == "audio/mpeg" and full.headers["accept-ranges"] == "bytes"
+    etag = full.headers["etag"]
+
+    assert client.get("/api/v1/jobs/job-1/audio", headers={"If-None-Match": etag}).status_code == 304
+
+    partial = client.get("/api/v1/jobs/job-1/audio", headers={"Range": "bytes=100-199"})
+    assert partial.status_code == 206 and partial.content == AUDIO[100:200]
+    assert partial.headers["content-range"] == f"bytes 100-199/{len(AUDIO)}"
+
+    assert client.get("/api/v1/jobs/job-1/audio", headers={"Range": "bytes=-10"}).content == AUDIO[-10:]
+    # A stale If-Range sends the whole (changed) file
+    stale = client.get("/api/v1/jobs/job-1/audio", headers={"Range": "bytes=0-9", "If-Range": '"old"'})
+    assert stale.status_code == 200 and len(stale.content) == len(AUDIO)
+
+    unsatisfiable = client.get("/api/v1/jobs/job-1/audio", headers={"Range": f"bytes={len(AUDIO)}-"})
+    assert unsatisfiable.status_code == 416 and unsatisfiable.headers["content-range"] == f"bytes */{len(AUDIO)}"
+
+    head = client.head("/api/v1/jobs/job-1/audio")
+    assert head.status_code == 200 and head.content == b"" and head.headers["content-length"] == str(len(AUDIO))
+
+def test_job_audio_offloads_to_proxy_or_redirects_to_cloud(output_dir, monkeypatch):
+    monkeypatch.setattr(settings, "DOWNLOAD_OFFLOAD", "x-accel")
+    offloaded = client.get("/api/v1/jobs/job-1/audio")
+    assert offloaded.status_code == 200 and offloaded.content == b""
+    assert offloaded.headers["x-accel-redirect"] == "/protected-audio/job-1_scenario.mp3"
+
+    # Not on local disk any more: the cloud copy is served through a signed URL
+    container = app.dependency_overrides[get_container]()
+    container.cloud_storage = MagicMock(spec=SignedUrlProvider)
+    container.cloud_storage.create_signed_urls = AsyncMock(return_value={"job-2_prompt.mp3": "https://storage.example/signed"})
+    container.db_repository = MagicMock()
+    container.db_repository.get_audio_path = AsyncMock(return_value="data/output/job-2_prompt.mp3")
+
+    redirect = client.get("/api/v1/jobs/job-2/audio", follow_redirects=False)
+    assert redirect.status_code == 307 and redirect.headers["location"] == "https://storage.example/signed"
+
+    container.db_repository.get_audio_path = AsyncMock(return_value=None)
+    assert client.get("/api/v1/jobs/job-3/audio").status_code == 404
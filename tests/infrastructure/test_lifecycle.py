@@ -0,0 +1,127 @@
+import asyncio
+import json
+import pytest
+from fastapi import Response
+from fastapi.testclient import TestClient
+from app.application.job_context import JobContext, job_context
+from app.infrastructure.api.cancellation import run_job
+from app.infrastructure.api.lifecycle import lifecycle
+from app.infrastructure.api.main import app
+
+class ConnectedRequest:
+    async def receive(self):
+        await asyncio.sleep(3600)
+
+@pytest.mark.asyncio
+async def test_drain_interrupts_generating_jobs_and_lets_writers_finish():
+    async def generating():
+        job_context().enter_stage("audio")
+        await asyncio.sleep(10)
+
+    async def writing():
+        job_context().enter_stage("persist")
+        await asyncio.sleep(0.3)
+        return Response(content=b"done")
+
+    generating_job, writing_job = JobContext(job_id="gen", kind="scenario"), JobContext(job_id="write", kind="scenario")
+    tasks = [
+        asyncio.ensure_future(run_job(ConnectedRequest(), generating_job, generating)),
+        asyncio.ensure_future(run_job(ConnectedRequest(), writing_job, writing, finish_in_background=True)),
+    ]
+    await asyncio.sleep(0.05)
+    assert lifecycle.in_flight == 2
+
+    await lifecycle.drain(timeout=0.1, flush_timeout=2)
+    interrupted, finished = await asyncio.gather(*tasks)
+
+    assert interrupted.status_code == 503 and interrupted.headers["X-Vanaheim-Job-Id"] == "gen"
+    assert generating_job.drained and not writing_job.drained
+    assert finished.body == b"done"
+    assert lifecycle.in_flight == 0
+
+def test_restarted_app_accepts_jobs_again():
+    with TestClient(app):
+        pass
+    # The shutdown drained the worker; a new startup in the same process must not inherit it
+    assert lifecycle.draining
+    with TestClient(app) as client:
+        assert not lifecycle.draining
+        assert client.post("/api/v1/tts/simple", json={"text": ""}).status_code != 503
+
+def test_health_reports_draining_but_stays_alive():
+    client = TestClient(app)
+    lifecycle.begin_drain()
+
+    assert client.get("/api/v1/health").status_code == 503
+    assert client.get("/api/v1/health/ready").status_code == 503
+    assert client.get("/api/v1/health/live").status_code == 200
+    assert client.post("/api/v1/tts/simple", json={"text": "Hola", "voice": "es-MX-DaliaNeural"}).status_code == 503
+
+@pytest.mark.asyncio
+async def test_progress_is_streamed_and_slow_subscribers_only_lose_old_events(monkeypatch):
+    import httpx
+    from app.infrastructure.api.progress import progress
+    from app.infrastructure.config.settings import settings
+
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def scripting():
+        job = job_context()
+        job.enter_stage("script")
+        started.set()
+        await release.wait()
+        for words in range(100, 1100, 100):
+            job.report("script", iteration=words // 100, words=words, target_words=1000)
+        job.enter_stage("audio")
+        return Response(content=b"done")
+
+    task = asyncio.ensure_future(run_job(ConnectedRequest(), JobContext(job_id="followed", kind="scenario"), scripting))
+    await started.wait()
+    monkeypatch.setattr(settings, "PROGRESS_BUFFER_EVENTS", 4)
+    slow = progress.subscribe("followed")  # never read while the job runs
+    monkeypatch.setattr(settings, "PROGRESS_BUFFER_EVENTS", 64)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        assert (await client.get("/api/v1/jobs/unknown/events")).status_code == 404
+        stream = asyncio.ensure_future(client.get("/api/v1/jobs/followed/events"))
+        await asyncio.sleep(0.05)
+        release.set()
+        response = await stream
+    assert (await task).body == b"done"
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [
+        (lines[1].removeprefix("event: "), json.loads(lines[2].removeprefix("data: ")))
+        for lines in (block.split("\n") for block in response.text.strip().split("\n\n"))
+    ]
+    assert events[0] == ("stage", {"stage": "script"})
+    assert [data["words"] for name, data in events if name == "script"] == list(range(100, 1100, 100))
+    assert events[-2:] == [("stage", {"stage": "audio"}), ("end", {"outcome": "done"})]
+
+    # The slow subscriber kept the newest events within its buffer; the job never waited for it
+    kept = [event async for event in slow.events(heartbeat=0.01)]
+    assert slow.dropped == 9 and len(kept) == 4
+    assert [e.event for e in kept] == ["script", "script", "stage", "end"]
+    # Late subscribers still get the final state
+    assert [e.event for e in progress.subscribe("followed")._events][-1] == "end"
+
+@pytest.mark.asyncio
+async def test_second_run_of_an_in_flight_job_id_is_refused():
+    from fastapi import HTTPException
+
+    release = asyncio.Event()
+
+    async def work():
+        await release.wait()
+        return Response(content=b"done")
+
+    first = asyncio.ensure_future(run_job(ConnectedRequest(), JobContext(job_id="dup", kind="scenario"), work))
+    await asyncio.sleep(0.05)
+
+    with pytest.raises(HTTPException) as refused:
+        await run_job(ConnectedRequest(), JobContext(job_id="dup", kind="scenario"), work)
+    assert refused.value.status_code == 409
+
+    release.set()
+    assert (await first).body == b"done"
+    assert lifecycle.in_flight == 0
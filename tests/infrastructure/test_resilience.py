@@ -0,0 +1,156 @@
+import asyncio
+import pytest
+from app.infrastructure.resilience.hedging import Hedger
+
+@pytest.mark.asyncio
+async def test_hedger_returns_first_finisher_and_cancels_the_other():
+    cancelled = []
+
+    async def attempt(index):
+        try:
+            # The primary is stuck, the hedge is fast
+            await asyncio.sleep(5 if index == 0 else 0.01)
+            return f"attempt-{index}"
+        except asyncio.CancelledError:
+            cancelled.append(index)
+            raise
+
+    hedger = Hedger("fake", default_delay=0.05, min_samples=100)
+    result = await hedger.run(attempt)
+
+    assert result == "attempt-1"
+    assert cancelled == [0]
+    assert hedger.hedges == 1
+
+@pytest.mark.asyncio
+async def test_hedger_caps_extra_load():
+    async def attempt(index):
+        await asyncio.sleep(0.02)
+        return index
+
+    hedger = Hedger("fake", default_delay=0.001, min_samples=1000, max_extra_ratio=0.1)
+    for _ in range(20):
+        await hedger.run(attempt)
+
+    # One hedge of headroom plus 10% of the calls
+    assert hedger.hedges <= 1 + 0.1 * 20
+
+def test_hedge_delay_scales_with_the_size_of_the_call():
+    hedger = Hedger("fake", quantile=0.95, min_delay=0.1, default_delay=4.0, min_samples=10)
+    assert hedger.hedge_delay(work=500) == 4.0
+    for _ in range(20):
+        hedger.unit_latencies.record(0.01)
+
+    # 10 ms per character: a 500-character text gets 5 s, a short one the floor
+    assert hedger.hedge_delay(work=500) == pytest.approx(5.0)
+    assert hedger.hedge_delay(work=5) == 0.1
+    assert hedger.hedge_delay() == 4.0
+
+class FakeThrottlingUpstream:
+    """Local stand-in for an upstream that answers 429 above `capacity` concurrent calls."""
+    class RateLimitError(Exception):
+        status_code = 429
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.active = 0
+        self.throttled = 0
+
+    async def call(self):
+        self.active += 1
+        try:
+            if self.active > self.capacity:
+                self.throttled += 1
+                raise self.RateLimitError("Too Many Requests")
+            await asyncio.sleep(0.005)
+        finally:
+            self.active -= 1
+
+@pytest.mark.asyncio
+async def test_adaptive_limiter_backs_off_on_throttling_and_recovers():
+    from app.infrastructure.resilience.adaptive_limiter import AdaptiveLimiter
+
+    upstream = FakeThrottlingUpstream(capacity=2)
+    limiter = AdaptiveLimiter("fake", initial_limit=16, max_limit=16, cooldown_seconds=0)
+
+    async def call():
+        try:
+            async with limiter.acquire():
+                await upstream.call()
+        except FakeThrottlingUpstream.RateLimitError:
+            pass
+
+    await asyncio.gather(*(call() for _ in range(40)))
+    assert upstream.throttled > 0
+    assert limiter.limit < 16
+    assert any(d["action"] == "decrease" and d["reason"] == "throttled" for d in limiter.decisions)
+
+    # Upstream recovers: sequential healthy calls grow the limit again (additive increase)
+    upstream.capacity = 100
+    throttled_limit = limiter.limit
+    for _ in range(20):
+        await call()
+    assert limiter.limit > throttled_limit
+    assert limiter.in_flight == 0
+
+def test_adaptive_limiter_judges_latency_per_unit_of_work():
+    from app.infrastructure.resilience.adaptive_limiter import AdaptiveLimiter
+
+    limiter = AdaptiveLimiter("fake-work", initial_limit=8, max_limit=8, cooldown_seconds=0, min_samples=5)
+    for _ in range(10):
+        limiter.record_success(0.5, work=100)
+
+    # Ten times the text in ten times the time is not a spike, nor is a call that reports no work
+    limiter.record_success(5.0, work=1000)
+    limiter.record_success(30.0)
+    assert limiter.limit == 8 and not limiter.decisions
+
+    # The same text taking five times as long is
+    limiter.record_success(2.5, work=100)
+    assert limiter.limit == 4 and limiter.decisions[-1]["reason"] == "latency_spike"
+
+@pytest.mark.asyncio
+async def test_adaptive_limiter_cancelled_waiter_during_handoff():
+    from app.infrastructure.resilience.adaptive_limiter import AdaptiveLimiter
+
+    limiter = AdaptiveLimiter("fake-cancel", initial_limit=1, max_limit=1)
+    release = asyncio.Event()
+
+    async def call(gate=None):
+        async with limiter.acquire():
+            if gate:
+                await gate.wait()
+
+    holder = asyncio.create_task(call(release))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(call())
+    await asyncio.sleep(0)
+
+    # The holder's release pops the waiter's entry before the cancelled waiter resumes
+    release.set()
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    await holder
+
+    assert limiter.in_flight == 0 and limiter.waiting == 0 and not limiter._waiters
+    await call()
+
+@pytest.mark.asyncio
+async def test_hedger_unwinds_both_attempts_when_the_caller_times_out():
+    import anyio
+    unwound = []
+
+    async def attempt(index):
+        try:
+            await asyncio.sleep(5)
+        finally:
+            unwound.append(index)
+
+    hedger = Hedger("fake", default_delay=0.01, min_samples=100)
+    with pytest.raises(TimeoutError):
+        with anyio.fail_after(0.1):
+            await hedger.run(attempt)
+
+    # Both attempts were cancelled and had unwound before run() returned
+    assert sorted(unwound) == [0, 1]
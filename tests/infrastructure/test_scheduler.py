@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+from app.infrastructure.scheduling.scheduler import JobScheduler, PriorityClass
+
+@pytest.mark.asyncio
+async def test_interactive_jobs_do_not_wait_behind_batch_jobs():
+    scheduler = JobScheduler({PriorityClass.INTERACTIVE: 2, PriorityClass.BATCH: 1})
+    release_batch = asyncio.Event()
+
+    async def batch_job():
+        async with scheduler.slot(PriorityClass.BATCH, "heavy", cost=120):
+            await release_batch.wait()
+
+    batch = asyncio.create_task(batch_job())
+    await asyncio.sleep(0)
+
+    # The only batch slot is busy, yet an interactive request is admitted right away
+    async with scheduler.slot(PriorityClass.INTERACTIVE, "light"):
+        assert scheduler.snapshot()["batch"]["running"] == 1
+
+    release_batch.set()
+    await batch
+
+@pytest.mark.asyncio
+async def test_fair_queuing_interleaves_clients():
+    scheduler = JobScheduler({PriorityClass.BATCH: 1})
+    order = []
+    gate = asyncio.Event()
+
+    async def job(client, name):
+        async with scheduler.slot(PriorityClass.BATCH, client):
+            order.append(name)
+            await gate.wait()
+
+    # "hog" queues four jobs before "light" queues one
+    tasks = [asyncio.create_task(job("hog", f"hog-{i}")) for i in range(4)]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.create_task(job("light", "light-0")))
+    await asyncio.sleep(0)
+
+    gate.set()
+    await asyncio.gather(*tasks)
+
+    # light is served right after hog's first (already running) job, not after all of them
+    assert order.index("light-0") <= 2
+
+@pytest.mark.asyncio
+async def test_client_cancelled_during_handoff_is_not_charged():
+    scheduler = JobScheduler({PriorityClass.BATCH: 1})
+    queue = scheduler.queues[PriorityClass.BATCH]
+    release = asyncio.Event()
+
+    async def job(client, gate=None):
+        async with scheduler.slot(PriorityClass.BATCH, client):
+            if gate:
+                await gate.wait()
+
+    holder = asyncio.create_task(job("a", release))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(job("b"))
+    await asyncio.sleep(0)
+
+    # The holder releases (popping the waiter's entry) before the cancelled waiter resumes
+    release.set()
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    await holder
+
+    assert queue.running == 0 and not queue.heap
+    assert "b" not in queue.last_finish
+    await job("c")
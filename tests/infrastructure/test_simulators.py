@@ -0,0 +1,109 @@
+import json
+import pytest
+from aiohttp.test_utils import TestServer
+from app.infrastructure.config.settings import settings
+from benchmarks.fakes import SILENT_FRAME
+from benchmarks.simulators import edge_tts_server, openai_server
+
+@pytest.mark.anyio
+async def test_edge_tts_adapter_against_simulator(tmp_path, monkeypatch):
+    import edge_tts
+    from app.infrastructure.adapters.edge_tts_adapter import EdgeTTSAdapter
+
+    server = TestServer(edge_tts_server.create_app(edge_tts_server.EdgeTTSSimConfig(time_scale=0.01)))
+    await server.start_server()
+    try:
+        monkeypatch.setattr(settings, "EDGE_TTS_WSS_URL", edge_tts_server.wss_url(server.host, server.port))
+        monkeypatch.setattr(edge_tts.communicate, "WSS_URL", edge_tts.communicate.WSS_URL)
+        output = tmp_path / "hola.mp3"
+
+        await EdgeTTSAdapter().generate_audio("Hola desde el simulador local", "es-MX-DaliaNeural", str(output))
+
+        data = output.read_bytes()
+        assert data and len(data) % len(SILENT_FRAME) == 0
+        assert data[:4] == SILENT_FRAME[:4]
+    finally:
+        await server.close()
+
+@pytest.mark.anyio
+async def test_edge_tts_adapter_requests_native_opus(tmp_path, monkeypatch):
+    import edge_tts
+    from app.domain.models import AudioEncoding, AudioFormat, AudioQuality
+    from app.infrastructure.adapters.edge_tts_adapter import EdgeTTSAdapter
+
+    server = TestServer(edge_tts_server.create_app(edge_tts_server.EdgeTTSSimConfig(time_scale=0.01)))
+    await server.start_server()
+    try:
+        monkeypatch.setattr(settings, "EDGE_TTS_WSS_URL", edge_tts_server.wss_url(server.host, server.port))
+        monkeypatch.setattr(edge_tts.communicate, "WSS_URL", edge_tts.communicate.WSS_URL)
+        mp3, opus = tmp_path / "hola.mp3", tmp_path / "hola.ogg"
+        text = "Hola desde el simulador local con una frase algo más larga"
+
+        await EdgeTTSAdapter().generate_audio(text, "es-MX-DaliaNeural", str(mp3))
+        await EdgeTTSAdapter().generate_audio(text, "es-MX-DaliaNeural", str(opus), AudioEncoding(format=AudioFormat.OPUS, quality=AudioQuality.LOW))
+
+        assert opus.read_bytes()[:4] == b"OggS" and b"OpusHead" in opus.read_bytes()[:64]
+        assert opus.stat().st_size * 2 < mp3.stat().st_size
+    finally:
+        await server.close()
+
+def test_edge_tts_native_formats_fall_back_to_mp3_without_the_internals(monkeypatch):
+    from app.domain.models import AudioEncoding, AudioFormat, AudioQuality
+    from app.infrastructure.adapters import edge_tts_formats
+    from app.infrastructure.adapters.edge_tts_adapter import EdgeTTSAdapter
+    opus = AudioEncoding(format=AudioFormat.OPUS, quality=AudioQuality.LOW)
+
+    # The installed edge-tts still has every internal save_in_format uses
+    assert edge_tts_formats._wire() is not None
+    assert EdgeTTSAdapter().supported_encoding(opus) == opus
+
+    monkeypatch.setattr(edge_tts_formats, "_native", None)
+    monkeypatch.delattr("edge_tts.communicate.mkssml")
+    assert EdgeTTSAdapter().supported_encoding(opus) == AudioEncoding()
+    assert EdgeTTSAdapter().supported_encoding(AudioEncoding()) == AudioEncoding()
+
+@pytest.mark.anyio
+async def test_openai_simulator_streams_and_injects_malformed_json():
+    from openai import AsyncOpenAI
+
+    config = openai_server.OpenAISimConfig(time_scale=0.001, malformed_rate=1.0, segments_per_batch=2, words_per_segment=5)
+    server = TestServer(openai_server.create_app(config))
+    await server.start_server()
+    try:
+        client = AsyncOpenAI(api_key="sk-test", base_url=f"http://{server.host}:{server.port}/v1")
+        stream = await client.chat.completions.create(model="gpt-4o", messages=[{"role": "user", "content": "hola"}], stream=True)
+        content = "".join([chunk.choices[0].delta.content or "" async for chunk in stream if chunk.choices])
+
+        with pytest.raises(json.JSONDecodeError):
+            json.loads(content)
+        await client.close()
+    finally:
+        await server.close()
+
+@pytest.mark.anyio
+async def test_script_iterations_extend_a_cached_prefix_and_count_tokens(monkeypatch):
+    from app.application.job_context import JobContext, bind_job, unbind_job
+    from app.application.services.script_generator import ScriptGenerationService
+    from app.domain.models import ScenarioType, SimulationRequest
+    from app.infrastructure.adapters.openai_adapter import OpenAIAdapter
+
+    config = openai_server.OpenAISimConfig(time_scale=0.001, segments_per_batch=4, words_per_segment=100)
+    server = TestServer(openai_server.create_app(config))
+    await server.start_server()
+    monkeypatch.setattr(settings, "OPENAI_BASE_URL", f"http://{server.host}:{server.port}/v1")
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+    adapter = OpenAIAdapter()
+    job = JobContext(job_id="tokens")
+    token = bind_job(job)
+    try:
+        request = SimulationRequest(participants=2, duration_minutes=6, topic="T", context="C", scenario=ScenarioType.PODCAST)
+        await ScriptGenerationService(adapter).generate_script(request)
+    finally:
+        unbind_job(token)
+        await adapter.aclose()
+        await server.close()
+
+    # 3 iterations; the third resends the first two exchanges, which the prompt cache serves
+    assert job.llm_calls == 3
+    assert job.llm_prompt_tokens > job.llm_cached_tokens >= 1024 and job.llm_completion_tokens > 0
+    assert job.llm_usage() == {"prompt": job.llm_prompt_tokens, "completion": job.llm_completion_tokens, "cached": job.llm_cached_tokens}